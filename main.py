@@ -9,6 +9,11 @@ import logging
 from src.routes import crawler_routes, user_query_routes, nlp_routes, reranking_routes, workflow_routes
 from src.database import db
 from src.services.nlp_service import get_nlp_service
+from src.services.http_client import fermer_clients_http
+from src.services.model_registry import obtenir_empreinte_modeles
+from src.services.reranking_service import attendre_ecritures_inferences
+from src.services.crawl_job_service import get_crawl_job_service
+from src.services.compute_executor import arreter_executeur_calcul
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -41,16 +46,40 @@ async def lifespan(app: FastAPI):
             result = await nlp_service.reconstruire_index_depuis_bd()
             logger.info(f"📊 Résultat reconstruction: {result}")
         
+        # Appliquer les snapshots et journaux publiés par les workers de crawl (worker.py)
+        nlp_service.demarrer_surveillance_disque()
+        
         # Afficher les statistiques
         stats = nlp_service.obtenir_statistiques_index()
         logger.info(f"📈 Statistiques index FAISS: {stats}")
+        logger.info(f"🧠 Modèles d'embedding chargés: {obtenir_empreinte_modeles()}")
         
     except Exception as e:
         logger.error(f"❌ Erreur initialisation service NLP: {e}")
     
+    # Workers de crawling intégrés à l'API (0 = jobs traités par worker.py uniquement)
+    crawl_job_service = get_crawl_job_service(
+        os.getenv("MONGODB_URL", "mongodb://localhost:27017"),
+        os.getenv("MONGODB_DB_NAME", "eduranker_db")
+    )
+    nb_workers_integres = int(os.getenv("CRAWL_JOBS_WORKERS_INTEGRES", "0"))
+    if nb_workers_integres > 0:
+        crawl_job_service.demarrer_workers(nb_workers_integres)
+    
     yield
     
-    # Arrêt : fermeture de la connexion MongoDB
+    # Arrêt : workers de crawling, écritures différées (inférences, index FAISS), pools HTTP et MongoDB
+    await crawl_job_service.arreter_workers()
+    await attendre_ecritures_inferences()
+    nlp_service = get_nlp_service(
+        os.getenv("MONGODB_URL", "mongodb://localhost:27017"),
+        os.getenv("MONGODB_DB_NAME", "eduranker_db"),
+        os.getenv("FAISS_INDEX_PATH", "data/faiss_index")
+    )
+    await nlp_service.arreter_surveillance_disque()
+    await nlp_service.persister_index_en_attente()
+    await fermer_clients_http()
+    arreter_executeur_calcul()
     await db.close_db()
     logger.info("👋 Application arrêtée")
 
@@ -10,9 +10,11 @@ from src.models.crawler_model import (
     CrawlRequestModel,
     CrawlResponseModel,
     SearchRequestModel,
-    RessourceEducativeModel
+    RessourceEducativeModel,
+    CrawlJobModel
 )
 from src.services.crawler_service import get_simple_crawler_service
+from src.services.crawl_job_service import get_crawl_job_service, STATUT_ERREUR, STATUT_TERMINE
 
 
 class CrawlerController:
@@ -23,10 +25,15 @@ class CrawlerController:
         mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
         mongodb_db = os.getenv("MONGODB_DB_NAME", "eduranker_db")
         self.crawler_service = get_simple_crawler_service(mongodb_url, mongodb_db)
+        self.crawl_job_service = get_crawl_job_service(mongodb_url, mongodb_db)
+        # Collecte confiée à la file de jobs (workers de crawling) plutôt que faite dans la requête
+        self.collecte_via_jobs = os.getenv("CRAWLER_COLLECTE_VIA_JOBS", "True") == "True"
     
     async def collecter_ressources(self, request: CrawlRequestModel) -> CrawlResponseModel:
         """
         Lance la collecte de ressources éducatives basée sur la question de l'utilisateur.
+        Avec CRAWLER_COLLECTE_VIA_JOBS, la collecte est enfilée dans la file de jobs et
+        la réponse attend sa fin (CRAWL_JOBS_ATTENTE_MAX) ; sinon elle est faite dans la requête.
         
         Args:
             request: Requête de crawling contenant la question et les paramètres
@@ -35,6 +42,9 @@ class CrawlerController:
             Réponse contenant les résultats de la collecte
         """
         try:
+            if self.collecte_via_jobs:
+                return await self._collecter_via_job(request)
+            
             # Lancer la collecte
             resultats = await self.crawler_service.collecter_ressources(
                 question=request.question,
@@ -55,11 +65,49 @@ class CrawlerController:
             
             return response
             
+        except HTTPException:
+            raise
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Erreur lors de la collecte: {str(e)}")
     
+    async def _collecter_via_job(self, request: CrawlRequestModel) -> CrawlResponseModel:
+        """
+        Enfile la collecte puis attend que les workers de crawling la terminent
+        
+        Args:
+            request: Requête de crawling contenant la question et les paramètres
+            
+        Returns:
+            Réponse construite à partir du résultat du job
+        """
+        job = await self.crawl_job_service.soumettre(
+            question=request.question,
+            max_par_site=request.max_par_site,
+            sources=request.sources,
+            langues=request.langues
+        )
+        job = await self.crawl_job_service.attendre(job["id"])
+        
+        if job["statut"] == STATUT_ERREUR:
+            raise HTTPException(status_code=502, detail=f"Collecte échouée (job {job['id']}): {job['erreur']}")
+        if job["statut"] != STATUT_TERMINE:
+            raise HTTPException(
+                status_code=504,
+                detail=f"Collecte toujours {job['statut']} : suivre le job via /api/crawler/jobs/{job['id']}"
+            )
+        
+        resultat = job["resultat"]
+        return CrawlResponseModel(
+            requete=job["question"],
+            total_collecte=resultat["total_collecte"],
+            duree_collecte_secondes=resultat["duree_collecte_secondes"],
+            sources_utilisees=resultat["sources_utilisees"],
+            resultats=[RessourceEducativeModel(**ressource) for ressource in resultat.get("ressources", [])],
+            erreurs=resultat.get("erreurs", [])
+        )
+    
     async def rechercher_ressources(self, request: SearchRequestModel) -> List[RessourceEducativeModel]:
         """
         Recherche dans les ressources déjà collectées.
@@ -97,6 +145,46 @@ class CrawlerController:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des statistiques: {str(e)}")
 
+    
+    async def soumettre_job(self, request: CrawlRequestModel) -> CrawlJobModel:
+        """
+        Enfile une collecte dans la file de jobs (traitée par les workers de crawling).
+        
+        Args:
+            request: Requête de crawling contenant la question et les paramètres
+            
+        Returns:
+            Job enfilé (ou job identique déjà en attente/en cours)
+        """
+        try:
+            job = await self.crawl_job_service.soumettre(
+                question=request.question,
+                max_par_site=request.max_par_site,
+                sources=request.sources,
+                langues=request.langues
+            )
+            return CrawlJobModel(**job)
+            
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Erreur lors de l'enfilement du job: {str(e)}")
+    
+    async def obtenir_job(self, job_id: str) -> CrawlJobModel:
+        """
+        Retourne le statut, la progression et le résultat d'un job de crawling.
+        
+        Args:
+            job_id: ID du job
+            
+        Returns:
+            État du job
+        """
+        job = await self.crawl_job_service.obtenir(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} introuvable")
+        return CrawlJobModel(**job)
+
 
 # Instance unique du contrôleur
 crawler_controller = CrawlerController()
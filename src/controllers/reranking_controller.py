@@ -95,23 +95,28 @@ class RerankingController:
                     # Récupérer le score FAISS (peut être 'score_faiss' ou 'score_similarite')
                     res['final_score'] = res.get('score_faiss', res.get('score_similarite', 0.0))
             
-            # Étape 3: Formater les résultats et sauvegarder les inférences
+            # Étape 3: Sauvegarder toutes les inférences en un seul insert_many
+            inference_result = await self.reranking_service.sauvegarder_inferences(
+                user_query_id=user_query_id,
+                inferences=[
+                    {
+                        "resource_id": res.get('_id', ''),
+                        "faiss_score": res.get('faiss_score', res.get('score_similarite', 0.0)),
+                        "reranking_score": res.get('reranking_score'),
+                        "final_score": res.get('final_score', 0.0),
+                        "rank": res.get('rank', 0)
+                    }
+                    for res in resultats_finaux
+                ],
+                session_id=request.session_id
+            )
+            inference_ids = inference_result.get('inference_ids', []) if inference_result.get('status') == 'success' else []
+            
+            # Étape 4: Formater les résultats avec l'ID de l'inférence
             resultats_formates = []
-            for res in resultats_finaux:
-                # Sauvegarder l'inférence dans MongoDB
-                inference_result = await self.reranking_service.sauvegarder_inference(
-                    user_query_id=user_query_id,
-                    resource_id=res.get('_id', ''),
-                    faiss_score=res.get('faiss_score', res.get('score_similarite', 0.0)),
-                    reranking_score=res.get('reranking_score'),
-                    final_score=res.get('final_score', 0.0),
-                    rank=res.get('rank', 0),
-                    session_id=request.session_id
-                )
-                
-                # Formater le résultat avec l'ID de l'inférence
+            for idx, res in enumerate(resultats_finaux):
                 result = RerankingResultModel(
-                    inference_id=inference_result.get('inference_id') if inference_result.get('status') == 'success' else None,
+                    inference_id=inference_ids[idx] if idx < len(inference_ids) else None,
                     resource_id=res.get('_id', ''),
                     titre=res.get('titre', 'Sans titre'),
                     url=res.get('url', ''),
@@ -223,7 +228,7 @@ class RerankingController:
                 detail=f"Erreur: {str(e)}"
             )
     
-    def predire_score_pertinence(self, query: str, document: str) -> Dict[str, Any]:
+    async def predire_score_pertinence(self, query: str, document: str) -> Dict[str, Any]:
         """
         Prédit le score de pertinence pour une paire (query, document).
         Utile pour tester le modèle cross-encoder.
@@ -236,7 +241,7 @@ class RerankingController:
             Score de pertinence et interprétation
         """
         try:
-            score = self.reranking_service.predict_score(query, document)
+            score = await self.reranking_service.predict_score(query, document)
             
             # Normaliser avec sigmoïde pour avoir un score 0-1
             score_normalized = 1 / (1 + np.exp(-score))
@@ -2,10 +2,14 @@
 Contrôleur pour le workflow global de traitement des requêtes.
 """
 
+import asyncio
+import json
 import logging
 import os
+from typing import AsyncIterator
 from src.services.workflow_service import get_workflow_service
-from src.models.workflow_model import WorkflowRequestModel, WorkflowResponseModel
+from fastapi import HTTPException
+from src.models.workflow_model import WorkflowRequestModel, WorkflowResponseModel, CrawlArrierePlanModel
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +49,66 @@ class WorkflowController:
         except Exception as e:
             logger.error(f"❌ Erreur traitement requête: {e}")
             raise
+    
+    async def traiter_requete_en_flux(self, request: WorkflowRequestModel) -> AsyncIterator[str]:
+        """
+        Traite une requête et produit les événements Server-Sent Events de chaque étape,
+        puis un événement final 'termine' (réponse complète) ou 'erreur'
+        
+        Args:
+            request: Paramètres de la requête
+            
+        Yields:
+            Événements SSE formatés ("event: ...\ndata: ...\n\n")
+        """
+        logger.info(f"📥 Nouvelle requête en flux reçue: {request.question}")
+        file_evenements: asyncio.Queue = asyncio.Queue()
+        
+        tache = asyncio.create_task(self.workflow_service.traiter_requete_complete(
+            request,
+            notifier=lambda evenement, donnees: file_evenements.put_nowait((evenement, donnees))
+        ))
+        # Sentinelle : la fin du workflow débloque la lecture de la file
+        tache.add_done_callback(lambda _: file_evenements.put_nowait(None))
+        
+        try:
+            while True:
+                element = await file_evenements.get()
+                if element is None:
+                    break
+                evenement, donnees = element
+                yield self._formater_evenement(evenement, donnees)
+            
+            if tache.exception() is not None:
+                logger.error(f"❌ Erreur traitement requête en flux: {tache.exception()}")
+                yield self._formater_evenement("erreur", {"detail": str(tache.exception())})
+            else:
+                reponse = tache.result()
+                yield self._formater_evenement("termine", reponse.model_dump(mode="json"))
+        finally:
+            # Client déconnecté : le calcul partagé continue (shield), pas cette requête
+            if not tache.done():
+                tache.cancel()
+    
+    @staticmethod
+    def _formater_evenement(evenement: str, donnees: dict) -> str:
+        """Formate un événement au format Server-Sent Events"""
+        return f"event: {evenement}\ndata: {json.dumps(donnees, ensure_ascii=False, default=str)}\n\n"
+    
+    async def obtenir_crawl_arriere_plan(self, id_crawl: str) -> CrawlArrierePlanModel:
+        """
+        Retourne l'état d'un crawl lancé en arrière-plan par le workflow
+        
+        Args:
+            id_crawl: Identifiant du crawl
+            
+        Returns:
+            État du crawl
+        """
+        etat = await self.workflow_service.obtenir_crawl_arriere_plan(id_crawl)
+        if etat is None:
+            raise HTTPException(status_code=404, detail=f"Crawl {id_crawl} introuvable")
+        return CrawlArrierePlanModel(**etat)
 
 
 # Instance singleton du contrôleur
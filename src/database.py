@@ -1,32 +1,54 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class Database:
-    """Gestionnaire de connexion à MongoDB"""
+    """
+    Gestionnaire de connexion à MongoDB
+    Un seul client Motor (et donc un seul pool de connexions) est partagé
+    par tous les services du processus.
+    """
     client: AsyncIOMotorClient = None
     database = None
 
+    @staticmethod
+    def options_pool() -> dict:
+        """Options du pool de connexions MongoDB (configurables par variables d'environnement)"""
+        return {
+            "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+            "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "5")),
+            "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+            "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "10000")),
+            "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        }
+
     @classmethod
     async def connect_db(cls):
-        """Établir la connexion à MongoDB"""
+        """
+        Établir la connexion à MongoDB et la vérifier (ping) : appelée au démarrage
+        de l'API (lifespan) et de worker.py, elle remplace les vérifications faites
+        auparavant dans le constructeur de chaque service. Une URL invalide ou un
+        serveur injoignable fait échouer le démarrage (ConnectionError).
+        """
         try:
             mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
             db_name = os.getenv("MONGODB_DB_NAME", "eduranker_db")
             
             # Connexion à MongoDB local (sans server_api)
-            cls.client = AsyncIOMotorClient(mongodb_url)
+            options = cls.options_pool()
+            cls.client = AsyncIOMotorClient(mongodb_url, **options)
             cls.database = cls.client[db_name]
             
             # Tester la connexion
             await cls.client.admin.command('ping')
-            print(f"✅ Connexion réussie à MongoDB - Base de données: {db_name}")
+            print(f"✅ Connexion réussie à MongoDB - Base de données: {db_name} (pool: {options['minPoolSize']}-{options['maxPoolSize']})")
             
         except Exception as e:
             print(f"❌ Erreur de connexion à MongoDB: {e}")
-            raise e
+            raise ConnectionError(f"Impossible de se connecter à MongoDB: {e}") from e
 
     @classmethod
     async def close_db(cls):
@@ -41,10 +63,18 @@ class Database:
         return cls.database
 
     @classmethod
-    def get_collection(cls, collection_name: str):
-        """Obtenir une collection spécifique"""
+    def get_collection(cls, collection_name: str, db_name: Optional[str] = None):
+        """
+        Obtenir une collection spécifique via le client partagé
+        
+        Args:
+            collection_name: Nom de la collection
+            db_name: Nom de la base (par défaut celle de MONGODB_DB_NAME)
+        """
         if cls.database is None:
             raise Exception("La base de données n'est pas connectée")
+        if db_name:
+            return cls.client[db_name][collection_name]
         return cls.database[collection_name]
 
 # Instance globale
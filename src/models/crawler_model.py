@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 class RessourceEducativeModel(BaseModel):
@@ -95,3 +95,41 @@ class SearchRequestModel(BaseModel):
                 "limite": 50
             }
         }
+
+
+class CrawlJobModel(BaseModel):
+    """Modèle pour un job de crawling de la file asynchrone"""
+    id: str = Field(..., description="ID du job")
+    question: str = Field(..., description="Question ou terme de recherche")
+    max_par_site: int = Field(..., description="Nombre maximum de résultats par site")
+    sources: Optional[List[str]] = Field(None, description="Sources demandées")
+    langues: Optional[List[str]] = Field(None, description="Langues demandées")
+    statut: str = Field(..., description="en_attente, en_cours, termine ou erreur")
+    date_creation: datetime = Field(..., description="Date d'enfilement")
+    date_debut: Optional[datetime] = Field(None, description="Date de prise en charge par un worker")
+    date_fin: Optional[datetime] = Field(None, description="Date de fin de traitement")
+    tentatives: int = Field(0, description="Nombre de prises en charge")
+    worker_id: Optional[str] = Field(None, description="Worker ayant traité le job")
+    progression: Dict[str, Any] = Field(default_factory=dict, description="Tâches (source, langue) planifiées et terminées")
+    resultat: Optional[Dict[str, Any]] = Field(None, description="Résumé de la collecte (total, résultats par source, erreurs)")
+    erreur: Optional[str] = Field(None, description="Dernière erreur du job")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id": "507f1f77bcf86cd799439011",
+                "question": "deep learning en éducation",
+                "max_par_site": 15,
+                "sources": ["wikipedia", "github"],
+                "langues": ["fr", "en"],
+                "statut": "en_cours",
+                "date_creation": "2024-01-20T10:30:00",
+                "date_debut": "2024-01-20T10:30:01",
+                "date_fin": None,
+                "tentatives": 1,
+                "worker_id": "worker-1-4242-a1b2c3",
+                "progression": {"taches_total": 3, "taches_terminees": 1, "par_tache": {}},
+                "resultat": None,
+                "erreur": None
+            }
+        }
@@ -3,7 +3,7 @@ Modèles pour le workflow global de traitement des requêtes.
 """
 
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime
 
 
@@ -15,6 +15,10 @@ class WorkflowRequestModel(BaseModel):
     langues: Optional[List[str]] = Field(default=["fr", "en"], description="Langues pour Wikipedia")
     top_k_faiss: Optional[int] = Field(default=50, ge=1, le=200, description="Nombre de résultats FAISS avant re-ranking")
     top_k_final: Optional[int] = Field(default=10, ge=1, le=50, description="Nombre de résultats finaux après re-ranking")
+    mode_crawl: Optional[Literal["toujours", "si_necessaire", "arriere_plan"]] = Field(
+        default=None,
+        description="'toujours' crawle avant la recherche, 'si_necessaire' ne crawle que si la couverture de l'index est insuffisante, 'arriere_plan' répond depuis l'index et crawle en tâche de fond (défaut: WORKFLOW_MODE_CRAWL)"
+    )
 
     class Config:
         json_schema_extra = {
@@ -24,7 +28,8 @@ class WorkflowRequestModel(BaseModel):
                 "sources": ["wikipedia", "github", "medium"],
                 "langues": ["fr", "en"],
                 "top_k_faiss": 50,
-                "top_k_final": 10
+                "top_k_final": 10,
+                "mode_crawl": "si_necessaire"
             }
         }
 
@@ -61,6 +66,58 @@ class RessourceResultatModel(BaseModel):
         }
 
 
+class CouvertureIndexModel(BaseModel):
+    """Modèle pour la décision de couverture du mode search-first"""
+    crawl_necessaire: bool = Field(..., description="Le crawling a-t-il été déclenché")
+    raison: str = Field(..., description="couverture_suffisante, score_max_insuffisant ou resultats_pertinents_insuffisants")
+    score_max: Optional[float] = Field(None, description="Meilleur score FAISS avant crawling")
+    nb_resultats_pertinents: int = Field(..., description="Nombre de résultats au-dessus du seuil de pertinence")
+    seuil_score_max: float = Field(..., description="Score FAISS minimal attendu pour le meilleur résultat")
+    seuil_score_pertinent: float = Field(..., description="Score FAISS à partir duquel un résultat est jugé pertinent")
+    min_resultats_pertinents: int = Field(..., description="Nombre minimal de résultats pertinents")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "crawl_necessaire": False,
+                "raison": "couverture_suffisante",
+                "score_max": 0.78,
+                "nb_resultats_pertinents": 12,
+                "seuil_score_max": 0.6,
+                "seuil_score_pertinent": 0.45,
+                "min_resultats_pertinents": 5
+            }
+        }
+
+
+class CrawlArrierePlanModel(BaseModel):
+    """Modèle pour l'état d'un crawl lancé en arrière-plan (mode arriere_plan)"""
+    id_crawl: str = Field(..., description="Identifiant du crawl à interroger via /api/workflow/crawls/{id_crawl}")
+    question: str = Field(..., description="Question crawlée")
+    statut: str = Field(..., description="planifie, en_cours, termine ou erreur")
+    date_debut: datetime = Field(..., description="Date de planification")
+    date_fin: Optional[datetime] = Field(None, description="Date de fin du crawl")
+    total_crawle: int = Field(0, description="Nombre de ressources crawlées")
+    generation_index: Optional[int] = Field(None, description="Génération de l'index FAISS après le crawl")
+    generation_index_courante: Optional[int] = Field(None, description="Génération courante de l'index FAISS")
+    erreurs: List[str] = Field(default_factory=list, description="Erreurs éventuelles du crawl")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "id_crawl": "3f2a9c1d0b7e4a5f6c8d9e0a",
+                "question": "Comment apprendre le machine learning ?",
+                "statut": "termine",
+                "date_debut": "2024-01-20T10:30:00",
+                "date_fin": "2024-01-20T10:30:12",
+                "total_crawle": 45,
+                "generation_index": 43,
+                "generation_index_courante": 43,
+                "erreurs": []
+            }
+        }
+
+
 class WorkflowResponseModel(BaseModel):
     """Modèle pour la réponse du workflow global"""
     question: str = Field(..., description="Question de l'utilisateur")
@@ -74,6 +131,11 @@ class WorkflowResponseModel(BaseModel):
     duree_totale_secondes: float = Field(..., description="Durée totale du traitement")
     resultats: List[RessourceResultatModel] = Field(..., description="Top 10 des meilleures ressources")
     sources_crawlees: List[str] = Field(..., description="Sources qui ont été crawlées")
+    generation_index: Optional[int] = Field(None, description="Génération de l'index FAISS utilisée pour la recherche")
+    calcul_partage: bool = Field(False, description="Résultat mutualisé avec une requête identique simultanée")
+    mode_crawl: Optional[str] = Field(None, description="Mode de crawling appliqué (toujours, si_necessaire, arriere_plan)")
+    couverture: Optional[CouvertureIndexModel] = Field(None, description="Décision de couverture de l'index (mode si_necessaire)")
+    crawl_arriere_plan: Optional[CrawlArrierePlanModel] = Field(None, description="Crawl planifié en tâche de fond (mode arriere_plan)")
     erreurs: Optional[List[str]] = Field(default_factory=list, description="Erreurs éventuelles")
     
     class Config:
@@ -90,6 +152,11 @@ class WorkflowResponseModel(BaseModel):
                 "duree_totale_secondes": 14.0,
                 "resultats": [],
                 "sources_crawlees": ["wikipedia", "github", "medium"],
+                "generation_index": 42,
+                "calcul_partage": False,
+                "mode_crawl": "si_necessaire",
+                "couverture": None,
+                "crawl_arriere_plan": None,
                 "erreurs": []
             }
         }
@@ -2,6 +2,8 @@
 Routes API pour le crawling de ressources éducatives.
 """
 
+import os
+
 from fastapi import APIRouter, status, Query
 from typing import List, Dict, Optional
 
@@ -9,9 +11,12 @@ from src.models.crawler_model import (
     CrawlRequestModel,
     CrawlResponseModel,
     SearchRequestModel,
-    RessourceEducativeModel
+    RessourceEducativeModel,
+    CrawlJobModel
 )
 from src.controllers.crawler_controller import crawler_controller
+from src.services.rate_limiter import obtenir_statistiques_limiteurs
+from src.services.crawl_cache_service import get_crawl_cache_service
 
 # Créer le routeur
 router = APIRouter(
@@ -27,7 +32,9 @@ async def collecter_ressources(request: CrawlRequestModel):
     Lance la collecte de ressources éducatives basée sur la question de l'utilisateur.
     
     La route collecte des articles depuis différentes sources (Wikipedia, GitHub, Medium)
-    et retourne la liste des articles trouvés.
+    et retourne la liste des articles trouvés. La collecte est enfilée dans la file de
+    jobs et traitée par les workers de crawling ; la réponse attend la fin du job
+    (504 avec l'id du job si CRAWL_JOBS_ATTENTE_MAX est dépassé).
     
     **Exemple de requête:**
     ```json
@@ -52,6 +59,34 @@ async def collecter_ressources(request: CrawlRequestModel):
     return await crawler_controller.collecter_ressources(request)
 
 
+@router.post("/jobs", response_model=CrawlJobModel, status_code=status.HTTP_202_ACCEPTED)
+async def soumettre_job_collecte(request: CrawlRequestModel):
+    """
+    Enfile une collecte dans la file de jobs persistée (MongoDB) au lieu de crawler
+    pendant la requête HTTP. Les jobs sont traités par les workers de crawling
+    (`python worker.py`, ou CRAWL_JOBS_WORKERS_INTEGRES dans l'API).
+    
+    Une demande identique déjà en attente ou en cours retourne le job existant.
+    
+    **Retourne:**
+    - Le job (id à interroger via /api/crawler/jobs/{id})
+    """
+    return await crawler_controller.soumettre_job(request)
+
+
+@router.get("/jobs/{job_id}", response_model=CrawlJobModel, status_code=status.HTTP_200_OK)
+async def obtenir_job_collecte(job_id: str):
+    """
+    Retourne le statut, la progression et le résultat d'un job de crawling.
+    
+    **Retourne:**
+    - **statut**: en_attente, en_cours, termine ou erreur
+    - **progression**: Tâches (source, langue) planifiées et terminées
+    - **resultat**: Résumé de la collecte une fois le job terminé
+    """
+    return await crawler_controller.obtenir_job(job_id)
+
+
 @router.get("/search", response_model=List[RessourceEducativeModel], status_code=status.HTTP_200_OK)
 async def rechercher_ressources(
     query: str = Query(..., description="Terme de recherche"),
@@ -110,3 +145,25 @@ async def obtenir_sources_disponibles():
     - Liste des sources supportées (wikipedia, github, medium)
     """
     return ["wikipedia", "github", "medium"]
+
+
+@router.get("/limiteurs", response_model=Dict, status_code=status.HTTP_200_OK)
+async def obtenir_etat_limiteurs():
+    """
+    Retourne l'état des limiteurs de débit partagés (un par hôte crawlé).
+    
+    **Retourne:**
+    - Pour chaque hôte : débit, rafale, jetons disponibles et suspension en cours
+    """
+    return obtenir_statistiques_limiteurs()
+
+
+@router.get("/cache", response_model=Dict, status_code=status.HTTP_200_OK)
+async def obtenir_etat_cache():
+    """
+    Retourne l'état du cache de collecte (question normalisée, source, langue, max).
+    
+    **Retourne:**
+    - Succès en mémoire (LRU) et dans MongoDB, échecs, taux de succès et TTL par source
+    """
+    return get_crawl_cache_service(os.getenv("MONGODB_DB_NAME", "eduranker_db")).obtenir_statistiques()
@@ -7,6 +7,9 @@ from typing import Optional, List
 import os
 
 from src.services.nlp_service import get_nlp_service
+from src.services.model_registry import obtenir_empreinte_modeles
+from src.services.compute_executor import obtenir_metriques_calcul
+from src.services.micro_batcher import obtenir_statistiques_batchers
 from src.models.crawler_model import RessourceEducativeModel
 
 router = APIRouter(prefix="/api/nlp", tags=["NLP & Recherche Sémantique"])
@@ -23,17 +26,20 @@ def _get_nlp_service():
 @router.post("/recherche-semantique")
 async def recherche_semantique(
     question: str = Query(..., description="Question pour la recherche sémantique"),
-    top_k: int = Query(default=10, ge=1, le=100, description="Nombre de résultats à retourner")
+    top_k: int = Query(default=10, ge=1, le=100, description="Nombre de résultats à retourner"),
+    nprobe: Optional[int] = Query(default=None, ge=1, description="Listes explorées (index IVF), défaut FAISS_NPROBE"),
+    ef_search: Optional[int] = Query(default=None, ge=1, description="Largeur de recherche (index HNSW), défaut FAISS_EF_SEARCH")
 ):
     """
     Effectue une recherche sémantique dans les ressources éducatives
-    en utilisant l'index FAISS
+    en utilisant l'index FAISS. nprobe/ef_search règlent le compromis
+    rappel/latence des index approximatifs pour cette requête.
     """
     try:
         nlp_service = _get_nlp_service()
         
         # Effectuer la recherche sémantique et récupérer les ressources
-        resultats = await nlp_service.recherche_et_recuperer_ressources(question, top_k)
+        resultats = await nlp_service.recherche_et_recuperer_ressources(question, top_k, nprobe, ef_search)
         
         return {
             "status": "success",
@@ -64,6 +70,40 @@ async def obtenir_statistiques_index():
         raise HTTPException(status_code=500, detail=f"Erreur récupération statistiques: {str(e)}")
 
 
+@router.get("/modeles")
+async def obtenir_modeles_charges():
+    """
+    Retourne les modèles sentence-transformers chargés dans ce processus
+    et leur empreinte mémoire
+    """
+    try:
+        modeles = obtenir_empreinte_modeles()
+        
+        return {
+            "status": "success",
+            "nb_modeles": len(modeles),
+            "taille_totale_mo": round(sum(m["taille_mo"] for m in modeles), 2),
+            "modeles": modeles
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur récupération modèles: {str(e)}")
+
+
+@router.get("/calcul")
+async def obtenir_metriques_executeur_calcul():
+    """
+    Retourne les métriques de l'exécuteur de calcul (embeddings, FAISS, cross-encoder) :
+    profondeur de file, calculs en cours, temps d'attente et durée par type de calcul,
+    ainsi que la taille des lots formés par les micro-batchers
+    """
+    return {
+        "status": "success",
+        **obtenir_metriques_calcul(),
+        "micro_batching": obtenir_statistiques_batchers()
+    }
+
+
 @router.post("/reconstruire-index")
 async def reconstruire_index():
     """
@@ -83,6 +123,46 @@ async def reconstruire_index():
         raise HTTPException(status_code=500, detail=f"Erreur reconstruction index: {str(e)}")
 
 
+@router.get("/snapshots")
+async def lister_snapshots_index():
+    """
+    Liste les snapshots versionnés de l'index FAISS conservés sur disque
+    (manifeste de chacun, snapshot en service marqué)
+    """
+    try:
+        nlp_service = _get_nlp_service()
+        snapshots = nlp_service.lister_snapshots()
+        
+        return {
+            "status": "success",
+            "snapshot_en_memoire": nlp_service.snapshot_courant,
+            "nb_snapshots": len(snapshots),
+            "snapshots": snapshots
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur liste des snapshots: {str(e)}")
+
+
+@router.post("/snapshots/restaurer")
+async def restaurer_snapshot_index(
+    version: Optional[str] = Query(default=None, description="Version à restaurer (défaut : snapshot précédent)")
+):
+    """
+    Revient à un snapshot précédent de l'index FAISS (rollback)
+    """
+    nlp_service = _get_nlp_service()
+    result = await nlp_service.restaurer_snapshot(version)
+    
+    if result["status"] != "success":
+        raise HTTPException(status_code=400, detail=result["message"])
+    
+    return {
+        "status": "success",
+        "resultat": result
+    }
+
+
 @router.post("/ajouter-ressources")
 async def ajouter_ressources_index(
     resource_ids: List[str] = Query(..., description="Liste des IDs MongoDB des ressources à ajouter")
@@ -104,6 +184,48 @@ async def ajouter_ressources_index(
         raise HTTPException(status_code=500, detail=f"Erreur ajout ressources: {str(e)}")
 
 
+@router.post("/supprimer-ressources")
+async def supprimer_ressources_index(
+    resource_ids: List[str] = Query(..., description="Liste des IDs MongoDB des ressources à retirer")
+):
+    """
+    Retire des ressources de l'index FAISS (ressources supprimées),
+    sans reconstruction complète
+    """
+    try:
+        nlp_service = _get_nlp_service()
+        result = await nlp_service.supprimer_ressources_de_index(resource_ids)
+        
+        return {
+            "status": "success",
+            "resultat": result
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur suppression ressources: {str(e)}")
+
+
+@router.post("/remplacer-ressources")
+async def remplacer_ressources_index(
+    resource_ids: List[str] = Query(..., description="Liste des IDs MongoDB des ressources modifiées")
+):
+    """
+    Remplace les vecteurs de ressources modifiées par leur embedding actuel
+    (les ressources sans embedding sont retirées de l'index)
+    """
+    try:
+        nlp_service = _get_nlp_service()
+        result = await nlp_service.remplacer_ressources_dans_index(resource_ids)
+        
+        return {
+            "status": "success",
+            "resultat": result
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur remplacement ressources: {str(e)}")
+
+
 @router.post("/generer-embedding")
 async def generer_embedding(
     texte: str = Query(..., description="Texte à vectoriser")
@@ -114,7 +236,7 @@ async def generer_embedding(
     """
     try:
         nlp_service = _get_nlp_service()
-        embedding = nlp_service.generer_embedding(texte)
+        embedding = await nlp_service.generer_embedding(texte)
         
         if embedding is None:
             raise HTTPException(status_code=400, detail="Impossible de générer l'embedding")
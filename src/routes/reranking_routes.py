@@ -84,7 +84,7 @@ async def predire_score_pertinence(
     Prédit le score de pertinence pour une paire (query, document)
     Utile pour tester le modèle cross-encoder
     """
-    return controller.predire_score_pertinence(query, document)
+    return await controller.predire_score_pertinence(query, document)
 
 
 @router.get("/info-modele")
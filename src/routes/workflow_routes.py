@@ -3,7 +3,8 @@ Routes API pour le workflow global de traitement des requêtes.
 """
 
 from fastapi import APIRouter, status, HTTPException
-from src.models.workflow_model import WorkflowRequestModel, WorkflowResponseModel
+from fastapi.responses import StreamingResponse
+from src.models.workflow_model import WorkflowRequestModel, WorkflowResponseModel, CrawlArrierePlanModel
 from src.controllers.workflow_controller import workflow_controller
 
 # Créer le routeur
@@ -22,7 +23,8 @@ async def traiter_requete_complete(request: WorkflowRequestModel):
     Ce workflow comprend:
     1. Sauvegarde de la question de l'utilisateur
     2. Crawling des sources spécifiées (Wikipedia, GitHub, Medium)
-    3. Reconstruction de l'index FAISS avec les nouvelles données
+       et ajout incrémental des nouvelles ressources à l'index FAISS
+    3. Vérification que l'index FAISS est à jour
     4. Recherche sémantique avec FAISS
     5. Re-ranking des résultats avec un cross-encoder
     6. Sauvegarde des inférences
@@ -47,6 +49,8 @@ async def traiter_requete_complete(request: WorkflowRequestModel):
     - **langues**: Langues pour Wikipedia (optionnel, défaut: ["fr", "en"])
     - **top_k_faiss**: Nombre de résultats FAISS avant re-ranking (optionnel, défaut: 50)
     - **top_k_final**: Nombre de résultats finaux (optionnel, défaut: 10)
+    - **mode_crawl**: "toujours", "si_necessaire" (recherche d'abord, crawling seulement si la couverture de l'index est insuffisante)
+      ou "arriere_plan" (réponse immédiate depuis l'index, crawling en tâche de fond)
     
     **Retourne:**
     - **question**: Question de l'utilisateur
@@ -70,6 +74,11 @@ async def traiter_requete_complete(request: WorkflowRequestModel):
       - **source**: Source (wikipedia, github, medium)
       - **id_inference**: ID de l'inférence sauvegardée
     - **sources_crawlees**: Sources qui ont été crawlées
+    - **generation_index**: Génération de l'index FAISS utilisée pour la recherche
+    - **mode_crawl**: Mode de crawling appliqué
+    - **couverture**: Décision de couverture (scores FAISS et seuils) en mode "si_necessaire"
+    - **crawl_arriere_plan**: Crawl planifié en mode "arriere_plan" (id_crawl à interroger)
+    - **calcul_partage**: Vrai si le résultat a été mutualisé avec une requête identique simultanée
     - **erreurs**: Liste des erreurs éventuelles (si présentes)
     
     **Codes de retour:**
@@ -87,6 +96,44 @@ async def traiter_requete_complete(request: WorkflowRequestModel):
         )
 
 
+@router.post("/process/stream", status_code=status.HTTP_200_OK)
+async def traiter_requete_en_flux(request: WorkflowRequestModel):
+    """
+    Variante en flux (Server-Sent Events) de /api/workflow/process : les résultats
+    sont émis au fil des étapes au lieu d'attendre la fin du crawler le plus lent.
+    
+    **Événements émis (dans l'ordre):**
+    - **requete_sauvegardee**: ID de la requête sauvegardée
+    - **source_collectee**: Résultat de chaque tâche de collecte (source, langue, nombre, erreur)
+    - **couverture** / **crawl_arriere_plan**: Selon le mode de crawling
+    - **candidats_faiss**: Candidats de la recherche FAISS
+    - **resultats_rerankes**: Top-k après re-ranking
+    - **inferences_sauvegardees**: IDs des inférences
+    - **termine**: Réponse complète (même contenu que /api/workflow/process)
+    - **erreur**: Erreur bloquante du workflow
+    """
+    return StreamingResponse(
+        workflow_controller.traiter_requete_en_flux(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/crawls/{id_crawl}", response_model=CrawlArrierePlanModel, status_code=status.HTTP_200_OK)
+async def obtenir_crawl_arriere_plan(id_crawl: str):
+    """
+    Retourne l'état d'un crawl lancé en arrière-plan (mode_crawl = "arriere_plan").
+    
+    Quand le statut est "termine", l'index FAISS contient les nouvelles ressources :
+    une nouvelle requête sur /api/workflow/process retourne le classement rafraîchi.
+    
+    **Codes de retour:**
+    - **200**: Succès
+    - **404**: Crawl inconnu
+    """
+    return await workflow_controller.obtenir_crawl_arriere_plan(id_crawl)
+
+
 # @router.get("/health", status_code=status.HTTP_200_OK)
 # async def verifier_sante_workflow():
 #     """
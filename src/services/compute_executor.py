@@ -0,0 +1,145 @@
+"""
+Exécuteur dédié aux calculs lourds (encodage sentence-transformers, recherche FAISS,
+scoring cross-encoder). Torch et FAISS relâchent le GIL : un pool de threads de taille
+configurable suffit pour sortir ces calculs de la boucle d'événements.
+Profondeur de file et temps d'attente sont mesurés par type de calcul.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Nombre de threads de calcul (défaut : nombre de cœurs, plafonné à 4)
+NB_THREADS_CALCUL = int(os.getenv("COMPUTE_EXECUTOR_THREADS", str(min(4, os.cpu_count() or 1))))
+
+_executeur: Optional[ThreadPoolExecutor] = None
+_verrou = threading.Lock()
+
+# Métriques globales et par type de calcul
+_en_attente = 0
+_en_cours = 0
+_metriques_par_nom: Dict[str, Dict[str, float]] = {}
+
+
+def _obtenir_executeur() -> ThreadPoolExecutor:
+    """Crée le pool de threads de calcul au premier usage"""
+    global _executeur
+    if _executeur is None:
+        with _verrou:
+            if _executeur is None:
+                _executeur = ThreadPoolExecutor(
+                    max_workers=NB_THREADS_CALCUL,
+                    thread_name_prefix="calcul"
+                )
+                logger.info(f"🧮 Exécuteur de calcul démarré ({NB_THREADS_CALCUL} threads)")
+    return _executeur
+
+
+def _enregistrer(nom: str, attente: float, duree: float):
+    """Cumule les mesures d'un calcul terminé"""
+    with _verrou:
+        metriques = _metriques_par_nom.setdefault(nom, {
+            "nb_appels": 0,
+            "attente_totale_ms": 0.0,
+            "attente_max_ms": 0.0,
+            "duree_totale_ms": 0.0,
+            "duree_max_ms": 0.0
+        })
+        metriques["nb_appels"] += 1
+        metriques["attente_totale_ms"] += attente * 1000
+        metriques["attente_max_ms"] = max(metriques["attente_max_ms"], attente * 1000)
+        metriques["duree_totale_ms"] += duree * 1000
+        metriques["duree_max_ms"] = max(metriques["duree_max_ms"], duree * 1000)
+
+
+async def executer_calcul(fonction: Callable[..., Any], *args, nom: str = "calcul", **kwargs) -> Any:
+    """
+    Exécute un calcul bloquant dans le pool de threads de calcul
+
+    Args:
+        fonction: Fonction synchrone à exécuter (encode, search, predict...)
+        *args: Arguments positionnels de la fonction
+        nom: Type de calcul pour les métriques (ex: embedding_requete, faiss_recherche)
+        **kwargs: Arguments nommés de la fonction
+
+    Returns:
+        Résultat de la fonction
+    """
+    global _en_attente
+    soumis_a = time.perf_counter()
+    # Sortie de file comptée une seule fois : au démarrage du calcul, ou par l'appelant
+    # si le calcul n'a jamais démarré (annulation, exécuteur arrêté)
+    demarre = False
+    abandonne = False
+
+    def executer():
+        global _en_attente, _en_cours
+        nonlocal demarre
+        debut = time.perf_counter()
+        with _verrou:
+            if abandonne:
+                return None
+            demarre = True
+            _en_attente -= 1
+            _en_cours += 1
+        try:
+            return fonction(*args, **kwargs)
+        finally:
+            fin = time.perf_counter()
+            with _verrou:
+                _en_cours -= 1
+            _enregistrer(nom, debut - soumis_a, fin - debut)
+
+    with _verrou:
+        _en_attente += 1
+
+    boucle = asyncio.get_running_loop()
+    try:
+        return await boucle.run_in_executor(_obtenir_executeur(), executer)
+    finally:
+        with _verrou:
+            if not demarre:
+                abandonne = True
+                _en_attente -= 1
+
+
+def obtenir_metriques_calcul() -> Dict:
+    """
+    Retourne l'état de l'exécuteur de calcul
+
+    Returns:
+        Profondeur de file, calculs en cours et temps d'attente/de calcul par type
+    """
+    with _verrou:
+        par_type = {}
+        for nom, m in _metriques_par_nom.items():
+            nb = m["nb_appels"] or 1
+            par_type[nom] = {
+                "nb_appels": int(m["nb_appels"]),
+                "attente_moyenne_ms": round(m["attente_totale_ms"] / nb, 2),
+                "attente_max_ms": round(m["attente_max_ms"], 2),
+                "duree_moyenne_ms": round(m["duree_totale_ms"] / nb, 2),
+                "duree_max_ms": round(m["duree_max_ms"], 2)
+            }
+        return {
+            "nb_threads": NB_THREADS_CALCUL,
+            "profondeur_file": _en_attente,
+            "en_cours": _en_cours,
+            "par_type": par_type
+        }
+
+
+def arreter_executeur_calcul():
+    """Arrête le pool de threads de calcul (appelé à l'arrêt de l'application)"""
+    global _executeur
+    if _executeur is not None:
+        _executeur.shutdown(wait=True, cancel_futures=True)
+        _executeur = None
+        logger.info("🔌 Exécuteur de calcul arrêté")
@@ -0,0 +1,227 @@
+"""
+Cache des résultats de collecte placé devant les méthodes _collecter_* du crawler.
+Une entrée associe (question normalisée, source, langue, max résultats) aux IDs
+des ressources déjà sauvegardées : un succès de cache évite tout appel réseau.
+Deux niveaux : un LRU en mémoire du processus et une collection MongoDB
+dont l'expiration (index TTL) dépend de la source. Une collecte sans résultat
+n'est conservée que peu de temps (TTL négatif).
+"""
+
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from src.database import db
+from src.utils import normaliser_question
+
+logger = logging.getLogger(__name__)
+
+
+# Durée de vie par défaut des entrées, en secondes, par source
+TTL_PAR_DEFAUT: Dict[str, int] = {
+    "wikipedia": 7 * 24 * 3600,
+    "github": 24 * 3600,
+    "youtube": 3 * 24 * 3600,  # Préserve le quota de l'API YouTube
+    "medium": 24 * 3600,
+}
+
+
+class CrawlCacheService:
+    """Cache à deux niveaux (LRU mémoire + MongoDB) des résultats de collecte"""
+
+    def __init__(self, mongodb_db: str):
+        """
+        Initialise le cache de collecte
+
+        Args:
+            mongodb_db: Nom de la base MongoDB
+        """
+        self.mongodb_db = mongodb_db
+        self.mongodb_collection = "crawl_cache"
+        self.actif = os.getenv("CRAWL_CACHE_ACTIF", "True") == "True"
+        self.taille_lru = int(os.getenv("CRAWL_CACHE_LRU_TAILLE", "512"))
+        self.ttl_par_source = {
+            source: int(os.getenv(f"CRAWL_CACHE_TTL_{source.upper()}", ttl))
+            for source, ttl in TTL_PAR_DEFAUT.items()
+        }
+        self.ttl_defaut = int(os.getenv("CRAWL_CACHE_TTL_DEFAUT", str(24 * 3600)))
+        self.ttl_negatif = int(os.getenv("CRAWL_CACHE_TTL_NEGATIF", "900"))
+
+        # Niveau 1 : clé -> (IDs des ressources, date d'expiration)
+        self._lru: "OrderedDict[str, tuple]" = OrderedDict()
+        self._index_ttl_cree = False
+
+        self.nb_succes_memoire = 0
+        self.nb_succes_mongodb = 0
+        self.nb_echecs = 0
+
+    @staticmethod
+    def cle_cache(question: str, source: str, langue: Optional[str], max_resultats: int) -> str:
+        """
+        Calcule la clé d'une entrée de cache
+
+        Args:
+            question: Question de l'utilisateur
+            source: Source collectée
+            langue: Langue de la tâche (None pour GitHub/Medium)
+            max_resultats: Nombre maximum de résultats demandés
+
+        Returns:
+            Empreinte SHA-1 de (question normalisée, source, langue, max)
+        """
+        brut = "|".join([normaliser_question(question), source, langue or "", str(max_resultats)])
+        return hashlib.sha1(brut.encode("utf-8")).hexdigest()
+
+    def _ttl_source(self, source: str) -> int:
+        """Durée de vie (secondes) des entrées d'une source"""
+        return self.ttl_par_source.get(source, self.ttl_defaut)
+
+    def _ttl_entree(self, source: str, resource_ids: List[str]) -> int:
+        """Durée de vie (secondes) d'une entrée : courte si la collecte est vide"""
+        if not resource_ids:
+            return self.ttl_negatif
+        return self._ttl_source(source)
+
+    def _memoriser(self, cle: str, resource_ids: List[str], expire_le: datetime):
+        """Ajoute une entrée au LRU en évinçant la plus ancienne si nécessaire"""
+        self._lru[cle] = (resource_ids, expire_le)
+        self._lru.move_to_end(cle)
+        while len(self._lru) > self.taille_lru:
+            self._lru.popitem(last=False)
+
+    async def _assurer_index_ttl(self, collection):
+        """Crée (une seule fois) l'index TTL : chaque document expire à sa date 'expire_le'"""
+        if self._index_ttl_cree:
+            return
+        try:
+            await collection.create_index("expire_le", expireAfterSeconds=0, name="expire_le_ttl")
+        except Exception as e:
+            logger.warning(f"⚠️ Impossible de créer l'index TTL du cache de collecte: {e}")
+        self._index_ttl_cree = True
+
+    async def obtenir(
+        self,
+        question: str,
+        source: str,
+        langue: Optional[str],
+        max_resultats: int
+    ) -> Optional[List[str]]:
+        """
+        Cherche une collecte récente identique
+
+        Args:
+            question: Question de l'utilisateur
+            source: Source collectée
+            langue: Langue de la tâche
+            max_resultats: Nombre maximum de résultats demandés
+
+        Returns:
+            Liste des IDs des ressources en cache, ou None si absente/expirée
+        """
+        if not self.actif:
+            return None
+
+        cle = self.cle_cache(question, source, langue, max_resultats)
+        maintenant = datetime.now()
+
+        # Niveau 1 : LRU du processus
+        entree = self._lru.get(cle)
+        if entree is not None:
+            resource_ids, expire_le = entree
+            if expire_le > maintenant:
+                self._lru.move_to_end(cle)
+                self.nb_succes_memoire += 1
+                return resource_ids
+            del self._lru[cle]
+
+        # Niveau 2 : MongoDB (le moniteur TTL purge avec un léger retard, d'où le filtre)
+        try:
+            collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
+            doc = await collection.find_one({"_id": cle, "expire_le": {"$gt": maintenant}})
+        except Exception as e:
+            logger.warning(f"⚠️ Erreur lecture du cache de collecte: {e}")
+            doc = None
+
+        if doc is None:
+            self.nb_echecs += 1
+            return None
+
+        self._memoriser(cle, doc["resource_ids"], doc["expire_le"])
+        self.nb_succes_mongodb += 1
+        return doc["resource_ids"]
+
+    async def enregistrer(
+        self,
+        question: str,
+        source: str,
+        langue: Optional[str],
+        max_resultats: int,
+        resource_ids: List[str]
+    ):
+        """
+        Enregistre le résultat d'une collecte dans les deux niveaux du cache
+
+        Args:
+            question: Question de l'utilisateur
+            source: Source collectée
+            langue: Langue de la tâche
+            max_resultats: Nombre maximum de résultats demandés
+            resource_ids: IDs MongoDB des ressources collectées (liste vide :
+                entrée négative, expirée après CRAWL_CACHE_TTL_NEGATIF)
+        """
+        if not self.actif:
+            return
+
+        cle = self.cle_cache(question, source, langue, max_resultats)
+        maintenant = datetime.now()
+        expire_le = maintenant + timedelta(seconds=self._ttl_entree(source, resource_ids))
+        self._memoriser(cle, resource_ids, expire_le)
+
+        try:
+            collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
+            await self._assurer_index_ttl(collection)
+            await collection.replace_one(
+                {"_id": cle},
+                {
+                    "question_normalisee": normaliser_question(question),
+                    "source": source,
+                    "langue": langue,
+                    "max_resultats": max_resultats,
+                    "resource_ids": resource_ids,
+                    "date_creation": maintenant,
+                    "expire_le": expire_le
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Erreur écriture du cache de collecte: {e}")
+
+    def obtenir_statistiques(self) -> Dict:
+        """Retourne les compteurs de succès/échecs du cache"""
+        total = self.nb_succes_memoire + self.nb_succes_mongodb + self.nb_echecs
+        succes = self.nb_succes_memoire + self.nb_succes_mongodb
+        return {
+            "actif": self.actif,
+            "entrees_memoire": len(self._lru),
+            "taille_lru": self.taille_lru,
+            "succes_memoire": self.nb_succes_memoire,
+            "succes_mongodb": self.nb_succes_mongodb,
+            "echecs": self.nb_echecs,
+            "taux_succes": round(succes / total * 100, 2) if total > 0 else 0,
+            "ttl_par_source": self.ttl_par_source,
+            "ttl_negatif": self.ttl_negatif
+        }
+
+
+# Instance singleton
+_crawl_cache_instance = None
+
+def get_crawl_cache_service(mongodb_db: str) -> CrawlCacheService:
+    """Obtenir l'instance du cache de collecte"""
+    global _crawl_cache_instance
+    if _crawl_cache_instance is None:
+        _crawl_cache_instance = CrawlCacheService(mongodb_db)
+    return _crawl_cache_instance
@@ -0,0 +1,372 @@
+"""
+File de jobs de crawling persistée dans MongoDB.
+Les demandes de collecte sont enfilées par l'API puis traitées par un pool
+de workers (dans un processus dédié : worker.py, ou intégrés à l'API).
+Chaque job réservé porte un bail renouvelé périodiquement : si un worker
+s'arrête brutalement, le job est repris par un autre worker à l'expiration
+du bail, ce qui permet de survivre aux redémarrages sans perdre de travail.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+
+from src.database import db
+from src.utils import normaliser_question
+
+logger = logging.getLogger(__name__)
+
+
+# Statuts d'un job
+STATUT_EN_ATTENTE = "en_attente"
+STATUT_EN_COURS = "en_cours"
+STATUT_TERMINE = "termine"
+STATUT_ERREUR = "erreur"
+
+
+class CrawlJobService:
+    """File de jobs de crawling (MongoDB) et pool de workers asynchrones"""
+
+    def __init__(self, mongodb_url: str, mongodb_db: str):
+        """
+        Initialise la file de jobs
+
+        Args:
+            mongodb_url: URL de connexion MongoDB
+            mongodb_db: Nom de la base de données
+        """
+        self.mongodb_url = mongodb_url
+        self.mongodb_db = mongodb_db
+        self.mongodb_collection = "crawl_jobs"
+
+        self.duree_bail = float(os.getenv("CRAWL_JOBS_DUREE_BAIL", "120"))
+        self.intervalle_scrutation = float(os.getenv("CRAWL_JOBS_INTERVALLE_SCRUTATION", "1"))
+        self.max_tentatives = int(os.getenv("CRAWL_JOBS_MAX_TENTATIVES", "3"))
+        self.attente_max = float(os.getenv("CRAWL_JOBS_ATTENTE_MAX", "300"))
+
+        self._workers: List[asyncio.Task] = []
+        self._index_crees = False
+
+    def _collection(self):
+        """Collection MongoDB des jobs (client partagé)"""
+        return db.get_collection(self.mongodb_collection, self.mongodb_db)
+
+    async def _assurer_index(self):
+        """Crée (une seule fois) les index de réservation et de déduplication"""
+        if self._index_crees:
+            return
+        try:
+            collection = self._collection()
+            await collection.create_index([("statut", ASCENDING), ("date_creation", ASCENDING)], name="statut_date")
+            await collection.create_index([("cle", ASCENDING), ("statut", ASCENDING)], name="cle_statut")
+        except Exception as e:
+            logger.warning(f"⚠️ Impossible de créer les index de la file de jobs: {e}")
+        self._index_crees = True
+
+    @staticmethod
+    def _cle_job(question: str, max_par_site: int, sources: Optional[List[str]], langues: Optional[List[str]]) -> str:
+        """Clé de déduplication : question normalisée et paramètres de collecte"""
+        return "|".join([
+            normaliser_question(question),
+            ",".join(sorted(sources or [])),
+            ",".join(sorted(langues or [])),
+            str(max_par_site)
+        ])
+
+    @staticmethod
+    def _formater_job(doc: Dict) -> Dict:
+        """Convertit un document MongoDB en dictionnaire de réponse"""
+        job = {k: v for k, v in doc.items() if k not in ("_id", "cle", "bail_expire_le")}
+        job["id"] = str(doc["_id"])
+        return job
+
+    async def soumettre(
+        self,
+        question: str,
+        max_par_site: int = 15,
+        sources: Optional[List[str]] = None,
+        langues: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Enfile une demande de collecte (ou retourne le job identique déjà en attente/en cours)
+
+        Args:
+            question: Question ou terme de recherche
+            max_par_site: Nombre maximum de résultats par site
+            sources: Sources à utiliser
+            langues: Langues pour Wikipedia et YouTube
+
+        Returns:
+            Job enfilé
+        """
+        if not question or not question.strip():
+            raise ValueError("La question ne peut pas être vide")
+
+        await self._assurer_index()
+        collection = self._collection()
+        cle = self._cle_job(question, max_par_site, sources, langues)
+
+        existant = await collection.find_one({"cle": cle, "statut": {"$in": [STATUT_EN_ATTENTE, STATUT_EN_COURS]}})
+        if existant is not None:
+            logger.info(f"🤝 Job de crawling déjà enfilé pour '{question}' ({existant['_id']})")
+            return self._formater_job(existant)
+
+        doc = {
+            "cle": cle,
+            "question": question.strip(),
+            "max_par_site": max_par_site,
+            "sources": sources,
+            "langues": langues,
+            "statut": STATUT_EN_ATTENTE,
+            "date_creation": datetime.now(),
+            "date_debut": None,
+            "date_fin": None,
+            "tentatives": 0,
+            "worker_id": None,
+            "bail_expire_le": None,
+            "progression": {"taches_total": None, "taches_terminees": 0, "par_tache": {}},
+            "resultat": None,
+            "erreur": None
+        }
+        result = await collection.insert_one(doc)
+        doc["_id"] = result.inserted_id
+        logger.info(f"📥 Job de crawling enfilé pour '{question}' ({result.inserted_id})")
+        return self._formater_job(doc)
+
+    async def obtenir(self, job_id: str) -> Optional[Dict]:
+        """
+        Retourne l'état d'un job
+
+        Args:
+            job_id: ID du job
+
+        Returns:
+            Job ou None s'il n'existe pas
+        """
+        if not ObjectId.is_valid(job_id):
+            return None
+        doc = await self._collection().find_one({"_id": ObjectId(job_id)})
+        return self._formater_job(doc) if doc else None
+
+    async def attendre(self, job_id: str, delai_max: Optional[float] = None) -> Optional[Dict]:
+        """
+        Attend la fin d'un job (termine ou erreur) pour les appelants synchrones
+
+        Args:
+            job_id: ID du job
+            delai_max: Attente maximale en secondes (défaut : CRAWL_JOBS_ATTENTE_MAX)
+
+        Returns:
+            Dernier état du job (encore en attente/en cours si le délai est dépassé), None s'il n'existe pas
+        """
+        echeance = asyncio.get_running_loop().time() + (self.attente_max if delai_max is None else delai_max)
+        while True:
+            job = await self.obtenir(job_id)
+            if job is None or job["statut"] in (STATUT_TERMINE, STATUT_ERREUR):
+                return job
+            if asyncio.get_running_loop().time() >= echeance:
+                return job
+            await asyncio.sleep(self.intervalle_scrutation)
+
+    async def _reserver_job(self, worker_id: str) -> Optional[Dict]:
+        """
+        Réserve atomiquement le plus ancien job en attente, ou un job en cours
+        dont le bail a expiré (worker arrêté)
+
+        Args:
+            worker_id: Identifiant du worker
+
+        Returns:
+            Document du job réservé ou None
+        """
+        maintenant = datetime.now()
+        return await self._collection().find_one_and_update(
+            {
+                "$or": [
+                    {"statut": STATUT_EN_ATTENTE},
+                    {"statut": STATUT_EN_COURS, "bail_expire_le": {"$lt": maintenant}}
+                ]
+            },
+            {
+                "$set": {
+                    "statut": STATUT_EN_COURS,
+                    "worker_id": worker_id,
+                    "date_debut": maintenant,
+                    "bail_expire_le": maintenant + timedelta(seconds=self.duree_bail)
+                },
+                "$inc": {"tentatives": 1}
+            },
+            sort=[("date_creation", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _renouveler_bail(self, job_id: ObjectId, worker_id: str):
+        """
+        Prolonge le bail du job tant que le worker le traite. Une erreur MongoDB
+        passagère est journalisée sans arrêter le renouvellement : le bail
+        dure trois intervalles, la tentative suivante peut encore le prolonger.
+        """
+        while True:
+            await asyncio.sleep(self.duree_bail / 3)
+            try:
+                await self._collection().update_one(
+                    {"_id": job_id, "worker_id": worker_id, "statut": STATUT_EN_COURS},
+                    {"$set": {"bail_expire_le": datetime.now() + timedelta(seconds=self.duree_bail)}}
+                )
+            except Exception as e:
+                logger.error(f"❌ Erreur renouvellement du bail du job {job_id} ({worker_id}): {e}")
+
+    def _suivre_progression(self, job_id: ObjectId, ecritures: set):
+        """
+        Construit le callback de suivi du crawler qui met à jour la progression du job
+
+        Args:
+            job_id: ID du job
+            ecritures: Écritures de progression en cours du job (attendues avant son résultat)
+        """
+        collection = self._collection()
+
+        def notifier(evenement: str, donnees: Dict):
+            if evenement == "collecte_planifiee":
+                mise_a_jour = {"$set": {"progression.taches_total": len(donnees["taches"])}}
+            elif evenement == "source_collectee":
+                tache = donnees["source"] + (f"_{donnees['langue']}" if donnees.get("langue") else "")
+                mise_a_jour = {
+                    "$set": {f"progression.par_tache.{tache}": {
+                        "nb_ressources": donnees["nb_ressources"],
+                        "depuis_cache": donnees["depuis_cache"],
+                        "erreur": donnees["erreur"]
+                    }},
+                    "$inc": {"progression.taches_terminees": 1}
+                }
+            else:
+                return
+            ecriture = asyncio.create_task(collection.update_one({"_id": job_id}, mise_a_jour))
+            ecritures.add(ecriture)
+            ecriture.add_done_callback(ecritures.discard)
+
+        return notifier
+
+    def _statut_apres_echec(self, job: Dict) -> str:
+        """Remis en attente tant que le nombre maximal de tentatives n'est pas atteint"""
+        return STATUT_EN_ATTENTE if job["tentatives"] < self.max_tentatives else STATUT_ERREUR
+
+    async def _executer_job(self, job: Dict, worker_id: str):
+        """Exécute la collecte d'un job réservé et enregistre son résultat"""
+        from src.services.crawler_service import get_simple_crawler_service
+
+        collection = self._collection()
+        crawler_service = get_simple_crawler_service(self.mongodb_url, self.mongodb_db)
+        renouvellement = asyncio.create_task(self._renouveler_bail(job["_id"], worker_id))
+        # Propres à ce job : les workers voisins n'attendent pas les écritures des autres jobs
+        ecritures_progression = set()
+
+        try:
+            logger.info(f"🛠️  Worker {worker_id}: job {job['_id']} ('{job['question']}', tentative {job['tentatives']})")
+            resultats = await crawler_service.collecter_ressources(
+                question=job["question"],
+                max_par_site=job["max_par_site"],
+                sources=job.get("sources"),
+                langues=job.get("langues"),
+                notifier=self._suivre_progression(job["_id"], ecritures_progression)
+            )
+            resultat = {
+                "total_collecte": resultats.get("total_collecte", 0),
+                "sources_utilisees": resultats.get("sources_utilisees", []),
+                "resultats_par_source": resultats.get("resultats_par_source", {}),
+                "duree_collecte_secondes": resultats.get("duree_collecte_secondes", 0),
+                "erreurs": resultats.get("erreurs", []),
+                # Ressources collectées (sans embedding) : réponse des appelants synchrones
+                "ressources": [r.dict(exclude={"embedding"}) for r in resultats.get("ressources", [])]
+            }
+            if resultat["total_collecte"] == 0 and resultat["erreurs"]:
+                # Le crawler isole l'erreur de chaque source : aucune n'a abouti (rate limit,
+                # délai, clé manquante...), le job est traité comme un échec
+                erreur = f"Collecte échouée pour toutes les sources: {'; '.join(resultat['erreurs'])}"
+                logger.error(f"❌ Erreur job {job['_id']}: {erreur}")
+                mise_a_jour = {"statut": self._statut_apres_echec(job), "resultat": resultat, "erreur": erreur}
+            else:
+                mise_a_jour = {"statut": STATUT_TERMINE, "resultat": resultat, "erreur": None}
+                logger.info(f"✅ Job {job['_id']} terminé: {resultat['total_collecte']} ressources")
+
+        except Exception as e:
+            logger.error(f"❌ Erreur job {job['_id']}: {e}")
+            mise_a_jour = {"statut": self._statut_apres_echec(job), "erreur": str(e)}
+
+        finally:
+            renouvellement.cancel()
+
+        if ecritures_progression:
+            await asyncio.gather(*ecritures_progression, return_exceptions=True)
+        mise_a_jour.update({"date_fin": datetime.now(), "bail_expire_le": None})
+        await collection.update_one({"_id": job["_id"], "worker_id": worker_id}, {"$set": mise_a_jour})
+
+    async def _boucle_worker(self, worker_id: str):
+        """Boucle d'un worker : réserve et exécute les jobs jusqu'à son arrêt"""
+        logger.info(f"👷 Worker de crawling {worker_id} démarré")
+        while True:
+            try:
+                job = await self._reserver_job(worker_id)
+                if job is None:
+                    await asyncio.sleep(self.intervalle_scrutation)
+                    continue
+                if job["tentatives"] > self.max_tentatives:
+                    # Bail expiré trop de fois : le job fait échouer les workers
+                    await self._collection().update_one(
+                        {"_id": job["_id"]},
+                        {"$set": {"statut": STATUT_ERREUR, "erreur": "Nombre maximal de tentatives atteint", "bail_expire_le": None}}
+                    )
+                    continue
+                await self._executer_job(job, worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Erreur worker {worker_id}: {e}")
+                await asyncio.sleep(self.intervalle_scrutation)
+
+    def demarrer_workers(self, nb_workers: int):
+        """
+        Démarre un pool de workers dans la boucle d'événements courante
+
+        Args:
+            nb_workers: Nombre de jobs traités simultanément
+        """
+        prefixe = f"{socket.gethostname()}-{os.getpid()}"
+        for _ in range(nb_workers):
+            worker_id = f"{prefixe}-{uuid.uuid4().hex[:6]}"
+            self._workers.append(asyncio.create_task(self._boucle_worker(worker_id)))
+        logger.info(f"🚀 {nb_workers} workers de crawling démarrés")
+
+    async def arreter_workers(self):
+        """Arrête les workers ; un job interrompu est repris à l'expiration de son bail"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    async def obtenir_statistiques(self) -> Dict:
+        """Retourne le nombre de jobs par statut"""
+        pipeline = [{"$group": {"_id": "$statut", "count": {"$sum": 1}}}]
+        stats = await self._collection().aggregate(pipeline).to_list(length=None)
+        return {
+            "par_statut": {stat["_id"]: stat["count"] for stat in stats},
+            "workers_locaux": len(self._workers)
+        }
+
+
+# Instance singleton
+_crawl_job_service_instance = None
+
+def get_crawl_job_service(mongodb_url: str, mongodb_db: str) -> CrawlJobService:
+    """Obtenir l'instance de la file de jobs de crawling"""
+    global _crawl_job_service_instance
+    if _crawl_job_service_instance is None:
+        _crawl_job_service_instance = CrawlJobService(mongodb_url, mongodb_db)
+    return _crawl_job_service_instance
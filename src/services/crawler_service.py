@@ -1,33 +1,40 @@
 """
-Service de crawling simplifié sans Scrapy (directement avec requests).
+Service de crawling simplifié sans Scrapy (client HTTP asynchrone httpx).
 Cette version est plus compatible avec FastAPI et ne bloque pas le serveur.
 """
 
+import asyncio
 import logging
 import time
-import requests
 import os
 from datetime import datetime
-from typing import List, Dict, Optional
-import pymongo
+from typing import Callable, List, Dict, Optional, Tuple
 from bs4 import BeautifulSoup
-from sentence_transformers import SentenceTransformer
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
 
+from src.database import db
 from src.models.crawler_model import RessourceEducativeModel
 from src.services.user_query_service import get_user_query_service_simple
+from src.services.http_client import requete_get
+from src.services.model_registry import get_sentence_transformer
+from src.services.crawl_cache_service import get_crawl_cache_service
+from src.services.compute_executor import executer_calcul
 from src.utils import nettoyer_texte_wikipedia, normaliser_texte
 
 logger = logging.getLogger(__name__)
 
 
 class SimpleCrawlerService:
-    """Service de crawling simplifié utilisant requests au lieu de Scrapy"""
+    """Service de crawling simplifié utilisant un client HTTP asynchrone au lieu de Scrapy"""
     
     def __init__(self, mongodb_url: str, mongodb_db: str):
         """Initialise le service de crawling"""
         self.mongodb_url = mongodb_url
         self.mongodb_db = mongodb_db
         self.mongodb_collection = "ressources_educatives"
+        self._index_unicite_cree = False
         
         # Service pour gérer les requêtes utilisateur
         self.user_query_service = get_user_query_service_simple(mongodb_url, mongodb_db)
@@ -37,58 +44,77 @@ class SimpleCrawlerService:
         if not self.youtube_api_key:
             logger.warning("⚠️  YOUTUBE_API_KEY non configurée - YouTube sera désactivé")
         
-        # Charger le modèle sentence-transformers
-        logger.info("📥 Chargement du modèle sentence-transformers/all-MiniLM-L6-v2...")
-        self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-        logger.info("✅ Modèle sentence-transformers chargé (384 dimensions)")
+        # Collecte concurrente des sources avec un délai maximal par source
+        self.collecte_concurrente = os.getenv('CRAWLER_COLLECTE_CONCURRENTE', 'True') == 'True'
+        self.delai_max_source = float(os.getenv('CRAWLER_DELAI_MAX_SOURCE', '20'))
+        self.delais_max_par_source = {
+            source: float(os.getenv(f'CRAWLER_DELAI_MAX_{source.upper()}', self.delai_max_source))
+            for source in ('wikipedia', 'github', 'youtube', 'medium')
+        }
         
-        # Vérifier la connexion MongoDB
-        self._verifier_connexion_mongo()
+        # Modèle sentence-transformers partagé (registre du processus)
+        self.embedding_model = get_sentence_transformer()
         
-    def _verifier_connexion_mongo(self):
-        """Vérifie que la connexion MongoDB est disponible"""
-        try:
-            client = pymongo.MongoClient(self.mongodb_url, serverSelectionTimeoutMS=5000)
-            client.server_info()
-            client.close()
-            logger.info("✅ Connexion MongoDB vérifiée pour le crawler")
-        except Exception as e:
-            error_msg = f"❌ Impossible de se connecter à MongoDB: {e}"
-            logger.error(error_msg)
-            raise ConnectionError(error_msg)
+        # Taille des batchs pour l'encodage groupé des ressources collectées
+        self.embedding_batch_size = int(os.getenv('EMBEDDING_BATCH_SIZE', '32'))
+        
+        # Cache des collectes (question normalisée, source, langue, max)
+        self.crawl_cache = get_crawl_cache_service(mongodb_db)
     
-    def _generer_embedding(self, texte: str) -> Optional[List[float]]:
+    async def _generer_embeddings(self, ressources: List[RessourceEducativeModel]):
         """
-        Génère un embedding de 384 dimensions avec sentence-transformers/all-MiniLM-L6-v2.
-        Ce modèle est optimisé pour la recherche sémantique et produit des embeddings de haute qualité.
+        Génère les embeddings (384 dimensions, sentence-transformers/all-MiniLM-L6-v2)
+        de toutes les ressources en un seul appel batché à encode().
+        L'encodage tourne dans l'exécuteur de calcul pour ne pas bloquer la boucle d'événements.
+        
+        Args:
+            ressources: Ressources collectées sans embedding (modifiées en place)
         """
-        if not texte or not texte.strip():
-            return None
-            
+        a_encoder = [r for r in ressources if r.embedding is None and r.texte and r.texte.strip()]
+        if not a_encoder:
+            return
+        
+        textes = [r.texte.strip() for r in a_encoder]
+        
         try:
-            # Générer l'embedding avec le modèle sentence-transformers
-            embedding = self.embedding_model.encode(texte.strip(), show_progress_bar=False)
+            debut = time.time()
+            embeddings = await executer_calcul(
+                self.embedding_model.encode,
+                textes,
+                batch_size=self.embedding_batch_size,
+                show_progress_bar=False,
+                nom="embedding_ressources"
+            )
             
-            # Convertir numpy array en liste Python
-            embedding_list = embedding.tolist()
+            for ressource, embedding in zip(a_encoder, embeddings):
+                ressource.embedding = embedding.tolist()
             
-            logger.debug(f"✅ Embedding généré: {len(embedding_list)} dimensions")
-            return embedding_list
+            logger.info(f"✅ {len(textes)} embeddings générés en {time.time() - debut:.2f}s (batch: {self.embedding_batch_size})")
             
         except Exception as e:
-            logger.error(f"❌ Erreur génération embedding: {e}")
-            return None
+            logger.error(f"❌ Erreur génération embeddings: {e}")
     
     async def collecter_ressources(
         self,
         question: str,
         max_par_site: int = 15,
         sources: Optional[List[str]] = None,
-        langues: Optional[List[str]] = None
+        langues: Optional[List[str]] = None,
+        concurrent: Optional[bool] = None,
+        notifier: Optional[Callable[[str, Dict], None]] = None
     ) -> Dict:
         """
         Collecte des ressources éducatives depuis plusieurs sources.
-        Version simplifiée utilisant requests.
+        Version simplifiée utilisant un client HTTP asynchrone.
+        
+        Args:
+            question: Question ou terme de recherche
+            max_par_site: Nombre maximum de résultats par site
+            sources: Sources à utiliser
+            langues: Langues pour Wikipedia et YouTube
+            concurrent: Exécuter les sources en parallèle (défaut: CRAWLER_COLLECTE_CONCURRENTE)
+            notifier: Callback optionnel appelé ('collecte_planifiee', tâches) puis
+                ('source_collectee', détails) à la fin de chaque tâche
         """
         if not question or not question.strip():
             raise ValueError("La question ne peut pas être vide")
@@ -127,51 +153,62 @@ class SimpleCrawlerService:
             'erreurs': []
         }
         
-        # Collecter depuis chaque source
-        toutes_ressources = []
+        if concurrent is None:
+            concurrent = self.collecte_concurrente
         
-        for source in sources:
+        # Une tâche par source (et par langue pour Wikipedia/YouTube)
+        taches = self._planifier_taches(sources, langues)
+        if notifier is not None:
             try:
-                logger.info(f"📡 Collecte depuis {source}...")
-                
-                if source == 'wikipedia':
-                    ressources = await self._collecter_wikipedia(question, max_par_site, langues)
-                elif source == 'github':
-                    ressources = await self._collecter_github(question, max_par_site)
-                elif source == 'youtube':
-                    ressources = await self._collecter_youtube(question, max_par_site, langues)
-                elif source == 'medium':
-                    # ressources = await self._collecter_medium(question, max_par_site)
-                    print("collect sur Medium pas encore terminé")
-                else:
-                    continue
-                
-                toutes_ressources.extend(ressources)
-                
-                # Sauvegarder dans MongoDB
-                nb_sauvegardes = await self._sauvegarder_mongodb(ressources, question, source)
-                
-                resultats_collecte['resultats_par_source'][source] = {
-                    'statut': 'succès',
-                    'nb_ressources': len(ressources),
-                    'nb_sauvegardes': nb_sauvegardes,
-                    'timestamp': datetime.now().isoformat()
-                }
-                
-                resultats_collecte['total_collecte'] += len(ressources)
-                logger.info(f"✅ {source}: {len(ressources)} ressources collectées")
-                
+                notifier('collecte_planifiee', {
+                    'taches': [{'source': source, 'langue': langue} for source, langue in taches]
+                })
             except Exception as e:
-                error_msg = f"Erreur avec {source}: {str(e)}"
-                logger.error(f"❌ {error_msg}")
-                
-                resultats_collecte['erreurs'].append(error_msg)
-                resultats_collecte['resultats_par_source'][source] = {
-                    'statut': 'erreur',
-                    'erreur': error_msg,
-                    'nb_ressources': 0,
-                    'timestamp': datetime.now().isoformat()
-                }
+                logger.warning(f"⚠️ Erreur notification de la planification: {e}")
+        toutes_ressources = []
+        # Tâches réellement collectées sur le réseau (à sauvegarder puis mettre en cache)
+        taches_collectees = []
+        
+        if concurrent:
+            # Fan-out : toutes les tâches tournent en parallèle, les résultats
+            # sont fusionnés au fur et à mesure que chaque tâche se termine
+            en_cours = [
+                asyncio.create_task(self._executer_tache_avec_delai(source, langue, question, max_par_site))
+                for source, langue in taches
+            ]
+            for prochaine in asyncio.as_completed(en_cours):
+                source, langue, ressources, erreur, depuis_cache = await prochaine
+                self._fusionner_resultat_tache(
+                    resultats_collecte, toutes_ressources, source, langue, ressources, erreur, depuis_cache
+                )
+                self._notifier_tache(notifier, source, langue, ressources, erreur, depuis_cache)
+                if not erreur and not depuis_cache:
+                    taches_collectees.append((source, langue, ressources))
+        else:
+            for source, langue in taches:
+                source, langue, ressources, erreur, depuis_cache = await self._executer_tache_avec_delai(
+                    source, langue, question, max_par_site
+                )
+                self._fusionner_resultat_tache(
+                    resultats_collecte, toutes_ressources, source, langue, ressources, erreur, depuis_cache
+                )
+                self._notifier_tache(notifier, source, langue, ressources, erreur, depuis_cache)
+                if not erreur and not depuis_cache:
+                    taches_collectees.append((source, langue, ressources))
+        
+        # Un seul encodage batché pour toutes les ressources collectées
+        await self._generer_embeddings(toutes_ressources)
+        
+        # Sauvegarder dans MongoDB, source par source (les ressources du cache y sont déjà)
+        for source, resultat_source in resultats_collecte['resultats_par_source'].items():
+            ressources_source = [r for s, _, ressources in taches_collectees if s == source for r in ressources]
+            if ressources_source:
+                resultat_source['nb_sauvegardes'] = await self._sauvegarder_mongodb(
+                    ressources_source, question, source
+                )
+        
+        # Mémoriser les collectes réseau pour les prochaines questions identiques
+        await self._mettre_en_cache_taches(question, max_par_site, taches_collectees)
         
         # Calculer la durée totale
         duree_collecte = time.time() - debut_collecte
@@ -183,24 +220,253 @@ class SimpleCrawlerService:
         
         return resultats_collecte
     
+    def _planifier_taches(self, sources: List[str], langues: List[str]) -> List[Tuple[str, Optional[str]]]:
+        """
+        Découpe la collecte en tâches indépendantes (source, langue).
+        Wikipedia et YouTube produisent une tâche par langue, les autres sources une seule.
+        """
+        taches = []
+        for source in sources:
+            if source in ('wikipedia', 'youtube'):
+                taches.extend((source, langue) for langue in langues)
+            elif source in ('github', 'medium'):
+                taches.append((source, None))
+            else:
+                logger.warning(f"⚠️  Source inconnue ignorée: {source}")
+        return taches
+    
+    async def _executer_tache(
+        self,
+        source: str,
+        langue: Optional[str],
+        question: str,
+        max_par_site: int
+    ) -> List[RessourceEducativeModel]:
+        """Exécute la collecte d'une seule tâche (source, langue)"""
+        if source == 'wikipedia':
+            return await self._collecter_wikipedia(question, max_par_site, [langue])
+        if source == 'github':
+            return await self._collecter_github(question, max_par_site)
+        if source == 'youtube':
+            return await self._collecter_youtube(question, max_par_site, [langue])
+        if source == 'medium':
+            # return await self._collecter_medium(question, max_par_site)
+            logger.info("ℹ️  Collecte sur Medium pas encore terminée")
+        return []
+    
+    async def _executer_tache_avec_delai(
+        self,
+        source: str,
+        langue: Optional[str],
+        question: str,
+        max_par_site: int
+    ) -> Tuple[str, Optional[str], List[RessourceEducativeModel], Optional[str], bool]:
+        """
+        Exécute une tâche de collecte en respectant le délai maximal de sa source.
+        Le cache de collecte est consulté d'abord : un succès évite tout appel réseau.
+        Ne lève jamais d'exception : l'erreur éventuelle est retournée avec le résultat.
+        
+        Returns:
+            Tuple (source, langue, ressources, message d'erreur ou None, servi par le cache)
+        """
+        libelle = f"{source} ({langue})" if langue else source
+        delai = self.delais_max_par_source.get(source, self.delai_max_source)
+        
+        try:
+            resource_ids = await self.crawl_cache.obtenir(question, source, langue, max_par_site)
+            if resource_ids is not None:
+                ressources = await self._charger_ressources_par_ids(resource_ids)
+                logger.info(f"⚡ {libelle}: {len(ressources)} ressources servies par le cache")
+                return source, langue, ressources, None, True
+        except Exception as e:
+            logger.warning(f"⚠️ Cache de collecte indisponible pour {libelle}: {e}")
+        
+        try:
+            logger.info(f"📡 Collecte depuis {libelle}...")
+            ressources = await asyncio.wait_for(
+                self._executer_tache(source, langue, question, max_par_site),
+                timeout=delai
+            )
+            return source, langue, ressources, None, False
+        except asyncio.TimeoutError:
+            return source, langue, [], f"Erreur avec {libelle}: délai de {delai:.0f}s dépassé", False
+        except Exception as e:
+            return source, langue, [], f"Erreur avec {libelle}: {str(e)}", False
+    
+    async def _charger_ressources_par_ids(self, resource_ids: List[str]) -> List[RessourceEducativeModel]:
+        """
+        Charge depuis MongoDB les ressources référencées par une entrée du cache
+        
+        Args:
+            resource_ids: IDs MongoDB (ordre de la collecte d'origine)
+            
+        Returns:
+            Ressources (avec leurs embeddings) dans l'ordre des IDs
+        """
+        if not resource_ids:
+            return []
+        
+        collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
+        docs = await collection.find(
+            {'_id': {'$in': [ObjectId(rid) for rid in resource_ids]}}
+        ).to_list(length=None)
+        
+        par_id = {str(doc.pop('_id')): doc for doc in docs}
+        ressources = []
+        for rid in resource_ids:
+            doc = par_id.get(rid)
+            if doc is None:
+                continue  # Ressource supprimée depuis la mise en cache
+            try:
+                ressources.append(RessourceEducativeModel(**doc))
+            except Exception as e:
+                logger.warning(f"⚠️ Erreur conversion document {rid}: {e}")
+        return ressources
+    
+    async def _mettre_en_cache_taches(
+        self,
+        question: str,
+        max_par_site: int,
+        taches_collectees: List[Tuple[str, Optional[str], List[RessourceEducativeModel]]]
+    ):
+        """
+        Enregistre dans le cache les IDs des ressources de chaque tâche collectée
+        (une requête MongoDB par source pour retrouver les IDs à partir des URLs).
+        Une tâche dont une ressource est introuvable en base (sauvegarde échouée
+        ou partielle) n'est pas mise en cache : elle sera collectée à nouveau.
+        """
+        if not self.crawl_cache.actif or not taches_collectees:
+            return
+        
+        try:
+            collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
+            
+            for source in {s for s, _, _ in taches_collectees}:
+                taches_source = [(langue, ressources) for s, langue, ressources in taches_collectees if s == source]
+                urls = list({r.url for _, ressources in taches_source for r in ressources})
+                
+                id_par_url = {}
+                if urls:
+                    docs = await collection.find(
+                        {'source': source, 'url': {'$in': urls}},
+                        {'_id': 1, 'url': 1}
+                    ).to_list(length=None)
+                    id_par_url = {doc['url']: str(doc['_id']) for doc in docs}
+                
+                for langue, ressources in taches_source:
+                    manquantes = [r.url for r in ressources if r.url not in id_par_url]
+                    if manquantes:
+                        libelle = f"{source} ({langue})" if langue else source
+                        logger.warning(
+                            f"⚠️ {libelle}: {len(manquantes)} ressources non sauvegardées, collecte non mise en cache"
+                        )
+                        continue
+                    resource_ids = [id_par_url[r.url] for r in ressources]
+                    await self.crawl_cache.enregistrer(question, source, langue, max_par_site, resource_ids)
+                    
+        except Exception as e:
+            logger.warning(f"⚠️ Erreur mise en cache de la collecte: {e}")
+    
+    def _notifier_tache(
+        self,
+        notifier: Optional[Callable[[str, Dict], None]],
+        source: str,
+        langue: Optional[str],
+        ressources: List[RessourceEducativeModel],
+        erreur: Optional[str],
+        depuis_cache: bool
+    ):
+        """Signale la fin d'une tâche (source, langue) au callback de suivi, s'il existe"""
+        if notifier is None:
+            return
+        try:
+            notifier('source_collectee', {
+                'source': source,
+                'langue': langue,
+                'nb_ressources': len(ressources),
+                'depuis_cache': depuis_cache,
+                'erreur': erreur,
+                'titres': [r.titre for r in ressources]
+            })
+        except Exception as e:
+            logger.warning(f"⚠️ Erreur notification de la tâche {source}: {e}")
+    
+    def _fusionner_resultat_tache(
+        self,
+        resultats_collecte: Dict,
+        toutes_ressources: List[RessourceEducativeModel],
+        source: str,
+        langue: Optional[str],
+        ressources: List[RessourceEducativeModel],
+        erreur: Optional[str],
+        depuis_cache: bool = False
+    ):
+        """Fusionne le résultat d'une tâche terminée dans resultats_par_source"""
+        resultat_source = resultats_collecte['resultats_par_source'].setdefault(source, {
+            'statut': 'succès',
+            'nb_ressources': 0,
+            'nb_sauvegardes': 0,
+            'nb_taches_terminees': 0,
+            'nb_taches_en_erreur': 0,
+            'nb_taches_en_cache': 0,
+            'timestamp': datetime.now().isoformat()
+        })
+        resultat_source['nb_taches_terminees'] += 1
+        if depuis_cache:
+            resultat_source['nb_taches_en_cache'] += 1
+        resultat_source['timestamp'] = datetime.now().isoformat()
+        
+        if erreur:
+            logger.error(f"❌ {erreur}")
+            resultats_collecte['erreurs'].append(erreur)
+            resultat_source['nb_taches_en_erreur'] += 1
+            resultat_source['erreur'] = erreur
+            # 'erreur' si aucune tâche de la source n'a abouti, 'partiel' sinon
+            if resultat_source['nb_taches_en_erreur'] == resultat_source['nb_taches_terminees']:
+                resultat_source['statut'] = 'erreur'
+            else:
+                resultat_source['statut'] = 'partiel'
+            return
+        
+        if resultat_source['statut'] == 'erreur':
+            resultat_source['statut'] = 'partiel'
+        
+        toutes_ressources.extend(ressources)
+        
+        resultat_source['nb_ressources'] += len(ressources)
+        if langue:
+            resultat_source.setdefault('par_langue', {})[langue] = len(ressources)
+        
+        resultats_collecte['total_collecte'] += len(ressources)
+        libelle = f"{source} ({langue})" if langue else source
+        logger.info(f"✅ {libelle}: {len(ressources)} ressources collectées")
+    
     async def _collecter_wikipedia(self, question: str, max_results: int, langues: List[str]) -> List[RessourceEducativeModel]:
-        """Collecte depuis Wikipedia API"""
+        """Collecte depuis Wikipedia API (une seule requête par langue) ; lève une exception en cas d'échec"""
         ressources = []
         
         for langue in langues:
             try:
-                # Délai pour éviter le rate limiting
-                time.sleep(1)
-                
                 api_url = f"https://{langue}.wikipedia.org/w/api.php"
                 
-                # Recherche avec headers appropriés
+                # Recherche et extraits en un seul appel : generator=search alimente
+                # prop=extracts|info pour toutes les pages trouvées (batch), list=search
+                # (même recherche) fournit le nombre de mots utilisé comme popularité
                 params = {
                     'action': 'query',
                     'format': 'json',
+                    'generator': 'search',
+                    'gsrsearch': question,
+                    'gsrlimit': min(max_results, 5),  # Limite réduite
                     'list': 'search',
                     'srsearch': question,
-                    'srlimit': min(max_results, 5),  # Limite réduite
+                    'srlimit': min(max_results, 5),
+                    'srprop': 'wordcount',
+                    'prop': 'extracts|info',
+                    'exintro': True,
+                    'explaintext': True,
+                    'exlimit': 'max',
+                    'inprop': 'url',
                     'utf8': 1,
                     'origin': '*'  # Pour CORS
                 }
@@ -208,75 +474,58 @@ class SimpleCrawlerService:
                 headers = {
                     'User-Agent': 'EduRanker-Bot/1.0 (https://eduranker.com/contact; eduranker@example.com)',
                     'Accept': 'application/json, text/plain, */*',
-                    'Accept-Language': 'fr-FR,fr;q=0.9,en;q=0.8',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'Connection': 'keep-alive'
+                    'Accept-Language': 'fr-FR,fr;q=0.9,en;q=0.8'
                 }
                 
-                response = requests.get(api_url, params=params, headers=headers, timeout=15)
+                response = await requete_get(api_url, params=params, headers=headers, timeout=15)
                 response.raise_for_status()
                 data = response.json()
                 
-                if 'query' in data and 'search' in data['query']:
-                    for result in data['query']['search'][:max_results]:
-                        titre = result.get('title', '')
-                        page_id = result.get('pageid', '')
-                        
-                        # Récupérer le contenu de la page avec délai
-                        time.sleep(0.5)  # Délai plus court pour le contenu
-                        
-                        content_params = {
-                            'action': 'query',
-                            'format': 'json',
-                            'prop': 'extracts|info',
-                            'pageids': page_id,
-                            'exintro': True,
-                            'explaintext': True,
-                            'inprop': 'url'
-                        }
+                if 'query' in data and 'pages' in data['query']:
+                    nb_mots = {
+                        result.get('pageid'): result.get('wordcount', 0)
+                        for result in data['query'].get('search', [])
+                    }
+                    # Les pages ne sont pas ordonnées : 'index' donne le rang de la recherche
+                    pages = sorted(
+                        data['query']['pages'].values(),
+                        key=lambda page: page.get('index', 0)
+                    )
+                    
+                    for page_data in pages[:max_results]:
+                        titre = page_data.get('title', '')
+                        page_id = page_data.get('pageid', '')
+                        texte_contenu = page_data.get('extract', '')
                         
-                        content_response = requests.get(api_url, params=content_params, headers=headers, timeout=15)
-                        content_data = content_response.json()
+                        ressource = RessourceEducativeModel(
+                            titre=titre,
+                            url=page_data.get('fullurl', f"https://{langue}.wikipedia.org/?curid={page_id}"),
+                            source='wikipedia',
+                            langue=langue,
+                            auteur='Wikipedia Contributors',
+                            texte=texte_contenu,
+                            resume=texte_contenu,
+                            popularite=nb_mots.get(page_id, 0),
+                            type_ressource='article',
+                            mots_cles=[question],
+                            requete_originale=question,
+                            date_collecte=datetime.now()
+                        )
                         
-                        if 'query' in content_data and 'pages' in content_data['query']:
-                            page_data = content_data['query']['pages'].get(str(page_id), {})
-                            texte_contenu = page_data.get('extract', '')
-                            
-                            # Générer l'embedding du texte
-                            embedding = self._generer_embedding(texte_contenu)
-                            
-                            ressource = RessourceEducativeModel(
-                                titre=titre,
-                                url=page_data.get('fullurl', f"https://{langue}.wikipedia.org/?curid={page_id}"),
-                                source='wikipedia',
-                                langue=langue,
-                                auteur='Wikipedia Contributors',
-                                texte=texte_contenu,
-                                resume=texte_contenu,
-                                embedding=embedding,
-                                popularite=result.get('wordcount', 0),
-                                type_ressource='article',
-                                mots_cles=[question],
-                                requete_originale=question,
-                                date_collecte=datetime.now()
-                            )
-                            
-                            ressources.append(ressource)
+                        ressources.append(ressource)
                 
             except Exception as e:
+                # Propagée : un échec ne doit pas être confondu avec une collecte vide
                 logger.warning(f"⚠️  Erreur Wikipedia ({langue}): {e}")
-                continue
+                raise
         
         return ressources
     
     async def _collecter_github(self, question: str, max_results: int) -> List[RessourceEducativeModel]:
-        """Collecte depuis GitHub API"""
+        """Collecte depuis GitHub API ; lève une exception en cas d'échec (rate limit, délai...)"""
         ressources = []
         
         try:
-            # Délai pour éviter le rate limiting
-            time.sleep(1)
-            
             api_url = "https://api.github.com/search/repositories"
             
             params = {
@@ -292,7 +541,7 @@ class SimpleCrawlerService:
                 'X-GitHub-Api-Version': '2022-11-28'
             }
             
-            response = requests.get(api_url, params=params, headers=headers, timeout=15)
+            response = await requete_get(api_url, params=params, headers=headers, timeout=15)
             response.raise_for_status()
             data = response.json()
             
@@ -305,9 +554,6 @@ class SimpleCrawlerService:
                     texte_complet = description
                     resume = description
                     
-                    # Générer l'embedding du texte
-                    embedding = self._generer_embedding(texte_complet)
-                    
                     ressource = RessourceEducativeModel(
                         titre=repo.get('full_name', ''),
                         url=repo.get('html_url', ''),
@@ -317,7 +563,6 @@ class SimpleCrawlerService:
                         date=repo.get('created_at', ''),
                         texte=texte_complet,
                         resume=resume,
-                        embedding=embedding,
                         popularite=repo.get('stargazers_count', 0),
                         type_ressource='repository',
                         mots_cles=repo.get('topics', []) if repo.get('topics') else [question],
@@ -329,21 +574,19 @@ class SimpleCrawlerService:
         
         except Exception as e:
             logger.warning(f"⚠️  Erreur GitHub: {e}")
+            raise
         
         return ressources
     
     async def _collecter_youtube(self, question: str, max_results: int, langues: List[str]) -> List[RessourceEducativeModel]:
-        """Collecte depuis YouTube Data API v3"""
+        """Collecte depuis YouTube Data API v3 ; lève une exception en cas d'échec (quota, clé manquante...)"""
         ressources = []
         
         if not self.youtube_api_key:
             logger.warning("⚠️  YouTube API key manquante - collecte ignorée")
-            return ressources
+            raise ValueError("YouTube API key manquante")
         
         try:
-            # Délai pour éviter le rate limiting
-            time.sleep(1)
-            
             api_url = "https://www.googleapis.com/youtube/v3/search"
             
             # Recherche de vidéos éducatives
@@ -370,7 +613,7 @@ class SimpleCrawlerService:
                         'User-Agent': 'EduRanker-Bot/1.0 (https://eduranker.com)'
                     }
                     
-                    response = requests.get(api_url, params=params, headers=headers, timeout=15)
+                    response = await requete_get(api_url, params=params, headers=headers, timeout=15)
                     response.raise_for_status()
                     data = response.json()
                     
@@ -379,9 +622,6 @@ class SimpleCrawlerService:
                         video_ids = [item['id']['videoId'] for item in data['items'] if 'videoId' in item['id']]
                         
                         if video_ids:
-                            # Délai avant la requête de détails
-                            time.sleep(0.5)
-                            
                             details_url = "https://www.googleapis.com/youtube/v3/videos"
                             details_params = {
                                 'part': 'statistics,contentDetails,snippet',
@@ -389,7 +629,7 @@ class SimpleCrawlerService:
                                 'key': self.youtube_api_key
                             }
                             
-                            details_response = requests.get(details_url, params=details_params, headers=headers, timeout=15)
+                            details_response = await requete_get(details_url, params=details_params, headers=headers, timeout=15)
                             details_response.raise_for_status()
                             details_data = details_response.json()
                             
@@ -417,9 +657,6 @@ class SimpleCrawlerService:
                             texte_complet = f"{titre}. {description}"
                             resume = description[:500] if len(description) > 500 else description
                             
-                            # Générer l'embedding
-                            embedding = self._generer_embedding(texte_complet)
-                            
                             # URL de la vidéo
                             video_url = f"https://www.youtube.com/watch?v={video_id}"
                             
@@ -437,7 +674,6 @@ class SimpleCrawlerService:
                                 date=snippet.get('publishedAt', ''),
                                 texte=texte_complet,
                                 resume=resume,
-                                embedding=embedding,
                                 popularite=view_count + (like_count * 10),  # Score combiné
                                 type_ressource='video',
                                 mots_cles=tags[:5],  # Limiter à 5 tags
@@ -451,10 +687,11 @@ class SimpleCrawlerService:
                     
                 except Exception as e:
                     logger.warning(f"⚠️  Erreur YouTube ({langue}): {e}")
-                    continue
+                    raise
         
         except Exception as e:
             logger.warning(f"⚠️  Erreur YouTube générale: {e}")
+            raise
         
         return ressources
     
@@ -463,9 +700,6 @@ class SimpleCrawlerService:
         ressources = []
         
         try:
-            # Délai pour éviter le rate limiting
-            time.sleep(1)
-            
             # Medium bloque souvent les bots, donc on génère des résultats simulés
             # basés sur des patterns communs d'articles éducatifs
             articles_templates = [
@@ -497,9 +731,6 @@ class SimpleCrawlerService:
                 texte_complet = description
                 resume = description
                 
-                # Générer l'embedding du texte
-                embedding = self._generer_embedding(texte_complet)
-                
                 ressource = RessourceEducativeModel(
                     titre=template["titre"],
                     url=template["url"],
@@ -508,7 +739,6 @@ class SimpleCrawlerService:
                     auteur=template["auteur"],
                     texte=texte_complet,
                     resume=resume,
-                    embedding=embedding,
                     popularite=100 - (i * 10),  # Score décroissant
                     type_ressource='article',
                     mots_cles=[question],
@@ -521,37 +751,68 @@ class SimpleCrawlerService:
             
         except Exception as e:
             logger.warning(f"⚠️  Erreur Medium: {e}")
+            raise
         
         return ressources
     
+    async def _assurer_index_unicite(self, collection):
+        """Crée (une seule fois) l'index unique (url, source) utilisé par les upserts"""
+        if self._index_unicite_cree:
+            return
+        try:
+            await collection.create_index(
+                [('url', ASCENDING), ('source', ASCENDING)],
+                unique=True,
+                name='url_source_unique'
+            )
+            logger.info("🔑 Index unique (url, source) vérifié")
+        except Exception as e:
+            # Ex: doublons historiques à nettoyer ; les upserts restent fonctionnels
+            logger.warning(f"⚠️ Impossible de créer l'index unique (url, source): {e}")
+        self._index_unicite_cree = True
+    
     async def _sauvegarder_mongodb(self, ressources: List[RessourceEducativeModel], question: str, source: str) -> int:
-        """Sauvegarde les ressources dans MongoDB et retourne les IDs des nouvelles ressources"""
+        """
+        Sauvegarde les ressources dans MongoDB en un seul bulk_write d'upserts
+        et ajoute les nouvelles ressources à l'index FAISS
+        
+        Args:
+            ressources: Ressources collectées pour la source
+            question: Question d'origine
+            source: Nom de la source
+            
+        Returns:
+            Nombre de nouvelles ressources insérées
+        """
         if not ressources:
             return 0
         
         try:
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            collection = db[self.mongodb_collection]
-            
-            nb_sauvegardes = 0
-            nouveaux_ids = []
-            
-            for ressource in ressources:
-                doc = ressource.dict()
-                
-                # Vérifier si existe déjà
-                existing = collection.find_one({
-                    'url': doc['url'],
-                    'source': source
-                })
-                
-                if not existing:
-                    result = collection.insert_one(doc)
-                    nouveaux_ids.append(str(result.inserted_id))
-                    nb_sauvegardes += 1
+            collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
+            await self._assurer_index_unicite(collection)
+            
+            # $setOnInsert : une ressource déjà connue n'est jamais modifiée
+            operations = [
+                UpdateOne(
+                    {'url': doc['url'], 'source': source},
+                    {'$setOnInsert': doc},
+                    upsert=True
+                )
+                for doc in (ressource.dict() for ressource in ressources)
+            ]
             
-            client.close()
+            try:
+                result = await collection.bulk_write(operations, ordered=False)
+                upserts = result.upserted_ids.values()
+            except BulkWriteError as bwe:
+                # E11000 : une collecte concurrente a inséré la même URL entre-temps
+                erreurs = [e for e in bwe.details.get('writeErrors', []) if e.get('code') != 11000]
+                if erreurs:
+                    logger.warning(f"⚠️ {len(erreurs)} erreurs d'écriture MongoDB ({source}): {erreurs[0].get('errmsg')}")
+                upserts = [u['_id'] for u in bwe.details.get('upserted', [])]
+            
+            nouveaux_ids = [str(_id) for _id in upserts]
+            nb_sauvegardes = len(nouveaux_ids)
             
             # Mettre à jour l'index FAISS avec les nouvelles ressources
             if nouveaux_ids:
@@ -578,9 +839,7 @@ class SimpleCrawlerService:
     ) -> List[RessourceEducativeModel]:
         """Recherche des ressources dans la base MongoDB"""
         try:
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            collection = db[self.mongodb_collection]
+            collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
             
             # Construire le filtre
             filtre = {}
@@ -599,9 +858,7 @@ class SimpleCrawlerService:
                 filtre['langue'] = langue
             
             # Exécuter la recherche
-            resultats = list(collection.find(filtre).sort('popularite', -1).limit(limite))
-            
-            client.close()
+            resultats = await collection.find(filtre).sort('popularite', -1).limit(limite).to_list(length=None)
             
             # Convertir en modèles Pydantic
             ressources = []
@@ -625,7 +882,8 @@ class SimpleCrawlerService:
         requete: str,
         max_par_site: int = 15,
         sources: Optional[List[str]] = None,
-        langues: Optional[List[str]] = None
+        langues: Optional[List[str]] = None,
+        notifier: Optional[Callable[[str, Dict], None]] = None
     ) -> Dict:
         """
         Méthode asynchrone pour collecter des ressources (alias pour collecter_ressources)
@@ -636,6 +894,7 @@ class SimpleCrawlerService:
             max_par_site: Nombre maximum de résultats par site
             sources: Sources à utiliser
             langues: Langues pour Wikipedia
+            notifier: Callback optionnel de suivi de chaque tâche de collecte
             
         Returns:
             Dictionnaire avec les résultats de la collecte
@@ -644,17 +903,16 @@ class SimpleCrawlerService:
             question=requete,
             max_par_site=max_par_site,
             sources=sources,
-            langues=langues
+            langues=langues,
+            notifier=notifier
         )
     
     async def obtenir_statistiques(self) -> Dict:
         """Obtient des statistiques sur les ressources collectées"""
         try:
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            collection = db[self.mongodb_collection]
+            collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
             
-            total_ressources = collection.count_documents({})
+            total_ressources = await collection.count_documents({})
             
             # Stats par source
             pipeline = [
@@ -663,7 +921,7 @@ class SimpleCrawlerService:
                     "count": {"$sum": 1}
                 }}
             ]
-            stats_par_source = list(collection.aggregate(pipeline))
+            stats_par_source = await collection.aggregate(pipeline).to_list(length=None)
             
             # Stats par langue
             pipeline_langues = [
@@ -672,9 +930,7 @@ class SimpleCrawlerService:
                     "count": {"$sum": 1}
                 }}
             ]
-            stats_par_langue = list(collection.aggregate(pipeline_langues))
-            
-            client.close()
+            stats_par_langue = await collection.aggregate(pipeline_langues).to_list(length=None)
             
             return {
                 'total_ressources': total_ressources,
@@ -0,0 +1,164 @@
+"""
+Clients HTTP asynchrones partagés pour le crawler.
+Un pool de connexions persistant (keep-alive, HTTP/2 si disponible) est conservé
+par hôte afin que les appels réseau ne bloquent jamais la boucle d'événements.
+Chaque requête passe par le limiteur de débit de son hôte.
+"""
+
+import logging
+import os
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from src.services.rate_limiter import get_rate_limiter, lire_retry_after
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 nécessite le paquet optionnel 'h2' (installé avec httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_DISPONIBLE = True
+except ImportError:
+    HTTP2_DISPONIBLE = False
+
+
+# Un client (et donc un pool de connexions) par hôte
+_clients_par_hote: Dict[str, httpx.AsyncClient] = {}
+
+# Nouvelles tentatives après un 429/503 et attente maximale acceptée (Retry-After)
+MAX_TENTATIVES = int(os.getenv("RATE_LIMIT_MAX_TENTATIVES", "2"))
+ATTENTE_MAX_SECONDES = float(os.getenv("RATE_LIMIT_ATTENTE_MAX", "30"))
+
+
+def _creer_client(hote: str) -> httpx.AsyncClient:
+    """
+    Crée un client HTTP asynchrone dédié à un hôte
+
+    Args:
+        hote: Nom d'hôte (ex: fr.wikipedia.org)
+
+    Returns:
+        Client httpx configuré avec son propre pool de connexions
+    """
+    limites = httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNEXIONS_PAR_HOTE", "20")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_PAR_HOTE", "10")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRATION", "30"))
+    )
+    client = httpx.AsyncClient(
+        http2=HTTP2_DISPONIBLE,
+        limits=limites,
+        timeout=httpx.Timeout(15.0),
+        follow_redirects=True
+    )
+    logger.info(f"🌐 Pool HTTP créé pour {hote} (HTTP/2: {HTTP2_DISPONIBLE})")
+    return client
+
+
+def get_http_client(url: str) -> httpx.AsyncClient:
+    """
+    Obtenir le client HTTP partagé de l'hôte d'une URL
+
+    Args:
+        url: URL complète de la requête
+
+    Returns:
+        Client httpx réutilisé pour toutes les requêtes vers cet hôte
+    """
+    hote = urlsplit(url).netloc
+    client = _clients_par_hote.get(hote)
+    if client is None or client.is_closed:
+        client = _creer_client(hote)
+        _clients_par_hote[hote] = client
+    return client
+
+
+async def requete_get(
+    url: str,
+    params: Optional[Dict] = None,
+    headers: Optional[Dict] = None,
+    timeout: float = 15
+) -> httpx.Response:
+    """
+    Effectue une requête GET non bloquante via le pool et le limiteur de l'hôte.
+    Les en-têtes Retry-After et X-RateLimit-* mettent à jour le limiteur partagé ;
+    une réponse 429/503 est retentée si l'attente demandée reste raisonnable.
+
+    Args:
+        url: URL de la requête
+        params: Paramètres de la query string
+        headers: En-têtes HTTP
+        timeout: Délai maximal en secondes
+
+    Returns:
+        Réponse httpx
+    """
+    client = get_http_client(url)
+    limiteur = get_rate_limiter(urlsplit(url).netloc)
+
+    tentative = 0
+    while True:
+        await limiteur.acquerir()
+        response = await client.get(url, params=params, headers=headers, timeout=timeout)
+        attente = _appliquer_entetes_limitation(limiteur, response)
+
+        if attente is None or tentative >= MAX_TENTATIVES or attente > ATTENTE_MAX_SECONDES:
+            return response
+
+        # L'attente est assurée par la suspension du limiteur lors du prochain acquerir()
+        tentative += 1
+        logger.warning(
+            f"⏳ {limiteur.hote} a répondu {response.status_code}, "
+            f"nouvelle tentative {tentative}/{MAX_TENTATIVES} dans {attente:.1f}s"
+        )
+
+
+def _appliquer_entetes_limitation(limiteur, response: httpx.Response) -> Optional[float]:
+    """
+    Met à jour le limiteur à partir des en-têtes de limitation de la réponse
+
+    Args:
+        limiteur: TokenBucket de l'hôte
+        response: Réponse HTTP reçue
+
+    Returns:
+        Secondes à attendre avant de retenter si la requête a été refusée, sinon None
+    """
+    # Quota annoncé par GitHub (X-RateLimit-Remaining / X-RateLimit-Reset)
+    restant = response.headers.get("X-RateLimit-Remaining")
+    reinitialisation = response.headers.get("X-RateLimit-Reset")
+    if restant is not None and reinitialisation is not None:
+        try:
+            limiteur.appliquer_quota(int(restant), float(reinitialisation))
+        except ValueError:
+            pass
+
+    quota_epuise = response.status_code == 403 and restant == "0"
+    if response.status_code not in (429, 503) and not quota_epuise:
+        return None
+
+    attente = lire_retry_after(response.headers.get("Retry-After"))
+    if attente is None and quota_epuise:
+        try:
+            attente = max(0.0, float(reinitialisation) - time.time())
+        except (TypeError, ValueError):
+            attente = None
+    if attente is None:
+        attente = 1.0
+
+    limiteur.suspendre(attente)
+    return attente
+
+
+async def fermer_clients_http():
+    """Ferme tous les pools HTTP (appelé à l'arrêt de l'application)"""
+    for hote, client in list(_clients_par_hote.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"⚠️ Erreur fermeture client HTTP {hote}: {e}")
+    _clients_par_hote.clear()
+    logger.info("🔌 Pools HTTP fermés")
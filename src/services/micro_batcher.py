@@ -0,0 +1,181 @@
+"""
+Micro-batching dynamique des calculs de modèles.
+Les demandes qui arrivent à quelques millisecondes d'intervalle (requêtes
+concurrentes) sont regroupées en un seul appel au modèle, exécuté dans
+l'exécuteur de calcul ; chaque appelant reçoit ensuite son propre résultat.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.services.compute_executor import executer_calcul
+from src.services.model_registry import MODELE_EMBEDDING_PAR_DEFAUT, get_sentence_transformer
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Regroupe les demandes concurrentes en lots traités par un seul appel"""
+
+    def __init__(
+        self,
+        nom: str,
+        fonction_lot: Callable[[List[Any]], List[Any]],
+        taille_max_lot: int = 32,
+        attente_max_ms: float = 5.0,
+        cle_tri: Optional[Callable[[Any], Any]] = None
+    ):
+        """
+        Initialise le micro-batcher
+
+        Args:
+            nom: Nom du lot (métriques de l'exécuteur de calcul)
+            fonction_lot: Fonction synchrone traitant une liste d'éléments et
+                retournant un résultat par élément, dans le même ordre
+            taille_max_lot: Nombre maximal d'éléments par appel
+            attente_max_ms: Attente maximale d'un élément avant le départ de son lot
+            cle_tri: Clé optionnelle pour regrouper les éléments semblables dans
+                un même lot (ex: longueur, pour limiter le padding)
+        """
+        self.nom = nom
+        self.fonction_lot = fonction_lot
+        self.taille_max_lot = taille_max_lot
+        self.attente_max = attente_max_ms / 1000
+        self.cle_tri = cle_tri
+
+        self._en_attente: List[Tuple[Any, asyncio.Future]] = []
+        self._minuterie: Optional[asyncio.TimerHandle] = None
+        self._taches = set()
+
+        self.nb_elements = 0
+        self.nb_lots = 0
+        self.taille_lot_max_observee = 0
+
+    async def soumettre(self, element: Any) -> Any:
+        """
+        Soumet un élément et attend son résultat
+
+        Args:
+            element: Élément à traiter (texte, paire...)
+
+        Returns:
+            Résultat correspondant à l'élément
+        """
+        return (await self.soumettre_lot([element]))[0]
+
+    async def soumettre_lot(self, elements: List[Any]) -> List[Any]:
+        """
+        Soumet plusieurs éléments d'un même appelant ; ils peuvent être répartis
+        dans des lots partagés avec d'autres appelants
+
+        Args:
+            elements: Éléments à traiter
+
+        Returns:
+            Résultats dans l'ordre des éléments
+        """
+        if not elements:
+            return []
+
+        boucle = asyncio.get_running_loop()
+        futures = [boucle.create_future() for _ in elements]
+        self._en_attente.extend(zip(elements, futures))
+
+        if len(self._en_attente) >= self.taille_max_lot:
+            self._declencher()
+        elif self._minuterie is None:
+            self._minuterie = boucle.call_later(self.attente_max, self._declencher)
+
+        return list(await asyncio.gather(*futures))
+
+    def _declencher(self):
+        """Démarre le traitement de toutes les demandes en attente"""
+        if self._minuterie is not None:
+            self._minuterie.cancel()
+            self._minuterie = None
+        if not self._en_attente:
+            return
+
+        demandes, self._en_attente = self._en_attente, []
+        if self.cle_tri is not None:
+            demandes.sort(key=lambda demande: self.cle_tri(demande[0]))
+
+        for debut in range(0, len(demandes), self.taille_max_lot):
+            lot = demandes[debut:debut + self.taille_max_lot]
+            tache = asyncio.ensure_future(self._traiter_lot(lot))
+            self._taches.add(tache)
+            tache.add_done_callback(self._taches.discard)
+
+    async def _traiter_lot(self, lot: List[Tuple[Any, asyncio.Future]]):
+        """Exécute un lot dans l'exécuteur de calcul et distribue les résultats"""
+        elements = [element for element, _ in lot]
+        self.nb_lots += 1
+        self.nb_elements += len(elements)
+        self.taille_lot_max_observee = max(self.taille_lot_max_observee, len(elements))
+
+        try:
+            resultats = await executer_calcul(self.fonction_lot, elements, nom=self.nom)
+            for (_, future), resultat in zip(lot, resultats):
+                if not future.done():
+                    future.set_result(resultat)
+        except Exception as e:
+            logger.error(f"❌ Erreur lot {self.nom} ({len(elements)} éléments): {e}")
+            for _, future in lot:
+                if not future.done():
+                    future.set_exception(e)
+
+    def statistiques(self) -> Dict:
+        """Retourne les statistiques de regroupement"""
+        return {
+            "taille_max_lot": self.taille_max_lot,
+            "attente_max_ms": round(self.attente_max * 1000, 2),
+            "nb_lots": self.nb_lots,
+            "nb_elements": self.nb_elements,
+            "taille_lot_moyenne": round(self.nb_elements / self.nb_lots, 2) if self.nb_lots else 0,
+            "taille_lot_max_observee": self.taille_lot_max_observee,
+            "en_attente": len(self._en_attente)
+        }
+
+
+# Micro-batchers partagés du processus, indexés par nom
+_batchers: Dict[str, MicroBatcher] = {}
+
+
+def get_embedding_batcher(model_name: str = MODELE_EMBEDDING_PAR_DEFAUT) -> MicroBatcher:
+    """
+    Obtenir le micro-batcher d'embeddings de requêtes partagé pour un modèle
+
+    Args:
+        model_name: Nom du modèle sentence-transformers
+
+    Returns:
+        MicroBatcher produisant un vecteur numpy (non normalisé) par texte
+    """
+    nom = f"embedding:{model_name}"
+    batcher = _batchers.get(nom)
+    if batcher is None:
+        modele = get_sentence_transformer(model_name)
+        taille_max_lot = int(os.getenv("EMBEDDING_MICRO_BATCH_TAILLE", "32"))
+        batcher = MicroBatcher(
+            nom="embedding_requete",
+            fonction_lot=lambda textes: list(modele.encode(
+                textes, batch_size=len(textes), show_progress_bar=False
+            )),
+            taille_max_lot=taille_max_lot,
+            attente_max_ms=float(os.getenv("EMBEDDING_MICRO_BATCH_ATTENTE_MS", "5")),
+            cle_tri=len
+        )
+        _batchers[nom] = batcher
+    return batcher
+
+
+def enregistrer_batcher(nom: str, batcher: MicroBatcher):
+    """Référence un micro-batcher pour qu'il apparaisse dans les statistiques"""
+    _batchers[nom] = batcher
+
+
+def obtenir_statistiques_batchers() -> Dict:
+    """Retourne les statistiques de tous les micro-batchers du processus"""
+    return {nom: batcher.statistiques() for nom, batcher in _batchers.items()}
@@ -0,0 +1,86 @@
+"""
+Registre des modèles sentence-transformers partagé par tout le processus.
+Les services (crawler, requêtes utilisateur, NLP) empruntent la même instance
+au lieu de charger chacun leur copie des poids.
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import torch
+from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+
+# Modèle d'embedding utilisé par défaut dans toute l'application
+MODELE_EMBEDDING_PAR_DEFAUT = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# Modèles chargés, indexés par (nom du modèle, device)
+_modeles: Dict[Tuple[str, str], SentenceTransformer] = {}
+_verrou = threading.Lock()
+
+
+def _resoudre_device(device: Optional[str]) -> str:
+    """Détermine le device effectif (EMBEDDING_DEVICE, sinon cuda si disponible, sinon cpu)"""
+    if device:
+        return device
+    device = os.getenv("EMBEDDING_DEVICE")
+    if device:
+        return device
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def get_sentence_transformer(
+    model_name: str = MODELE_EMBEDDING_PAR_DEFAUT,
+    device: Optional[str] = None
+) -> SentenceTransformer:
+    """
+    Obtenir le modèle sentence-transformers partagé (chargé une seule fois par processus)
+
+    Args:
+        model_name: Nom du modèle HuggingFace
+        device: Device cible (cpu, cuda...), résolu automatiquement si None
+
+    Returns:
+        Instance partagée du modèle
+    """
+    cle = (model_name, _resoudre_device(device))
+
+    modele = _modeles.get(cle)
+    if modele is not None:
+        return modele
+
+    with _verrou:
+        # Un autre thread a pu charger le modèle pendant l'attente du verrou
+        modele = _modeles.get(cle)
+        if modele is None:
+            logger.info(f"📥 Chargement du modèle {model_name} sur {cle[1]}...")
+            modele = SentenceTransformer(model_name, device=cle[1])
+            _modeles[cle] = modele
+            logger.info(f"✅ Modèle {model_name} chargé ({modele.get_sentence_embedding_dimension()} dimensions)")
+    return modele
+
+
+def obtenir_empreinte_modeles() -> List[Dict]:
+    """
+    Retourne l'empreinte mémoire de chaque modèle chargé
+
+    Returns:
+        Liste de dictionnaires (modèle, device, nb de paramètres, taille en Mo)
+    """
+    empreintes = []
+    for (model_name, device), modele in list(_modeles.items()):
+        nb_parametres = sum(p.numel() for p in modele.parameters())
+        taille_octets = sum(p.numel() * p.element_size() for p in modele.parameters())
+        taille_octets += sum(b.numel() * b.element_size() for b in modele.buffers())
+        empreintes.append({
+            "modele": model_name,
+            "device": device,
+            "dimension": modele.get_sentence_embedding_dimension(),
+            "nb_parametres": nb_parametres,
+            "taille_mo": round(taille_octets / (1024 * 1024), 2)
+        })
+    return empreintes
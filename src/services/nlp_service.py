@@ -4,21 +4,67 @@ Ce service gère l'indexation des embeddings de ressources éducatives
 et permet la recherche sémantique basée sur les questions utilisateur.
 """
 
+import asyncio
+import hashlib
+import json
 import logging
-import pickle
 import os
+import shutil
+import struct
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, List, Dict, Optional, Tuple
 import numpy as np
 import faiss
-import pymongo
-from sentence_transformers import SentenceTransformer
+from bson import ObjectId
 
+from src.database import db
 from src.models.crawler_model import RessourceEducativeModel
+from src.services.model_registry import get_sentence_transformer
+from src.services.compute_executor import executer_calcul
+from src.services.micro_batcher import get_embedding_batcher
+
+try:
+    import fcntl  # Verrou inter-processus du journal (POSIX)
+except ImportError:
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
 
+# Types d'index FAISS disponibles (FAISS_INDEX_TYPE) : flat est exact, les autres approximatifs
+TYPES_INDEX = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Table de correspondance persistée : ID FAISS 64 bits -> ObjectId MongoDB (12 octets)
+DTYPE_TABLE_IDS = np.dtype([("id", "<i8"), ("oid", "u1", (12,))])
+
+# Journal des modifications : enregistrements (en-tête magie/taille/CRC32, puis corps)
+OP_AJOUT = b"A"         # Corps : ObjectIds puis embeddings float32
+OP_SUPPRESSION = b"S"   # Corps : ObjectIds
+ENTETE_DELTA = struct.Struct("<4sII")
+ENTETE_CORPS_DELTA = struct.Struct("<cI")
+MAGIE_DELTA = b"DLT1"
+
+
+def id_faiss(resource_id: str) -> int:
+    """
+    Calcule l'ID FAISS stable (64 bits, positif) d'une ressource
+    
+    Args:
+        resource_id: ID MongoDB (ObjectId en hexadécimal)
+        
+    Returns:
+        Entier dérivé de l'ObjectId par BLAKE2b (-1 est réservé par FAISS)
+    """
+    empreinte = hashlib.blake2b(ObjectId(resource_id).binary, digest_size=8).digest()
+    return int.from_bytes(empreinte, "little") & 0x7FFFFFFFFFFFFFFF
+
+
 class NLPService:
     """Service pour le traitement NLP et la recherche sémantique avec FAISS"""
     
@@ -39,32 +85,217 @@ class NLPService:
         # Créer le dossier pour l'index s'il n'existe pas
         Path(index_path).parent.mkdir(parents=True, exist_ok=True)
         
-        # Charger le modèle sentence-transformers
-        logger.info("📥 Chargement du modèle sentence-transformers pour NLP Service...")
-        self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-        self.embedding_dimension = 384  # Dimension du modèle all-MiniLM-L6-v2
+        # Modèle sentence-transformers partagé (registre du processus)
+        self.embedding_model = get_sentence_transformer()
+        self.embedding_dimension = self.embedding_model.get_sentence_embedding_dimension()  # 384 pour all-MiniLM-L6-v2
         logger.info(f"✅ Modèle NLP chargé ({self.embedding_dimension} dimensions)")
         
-        # Initialiser l'index FAISS
+        # Initialiser l'index FAISS (IndexIDMap2 : vecteurs indexés par ID stable)
         self.index = None
-        self.resource_ids = []  # Liste des IDs MongoDB correspondant aux vecteurs
+        self.ids_ressources: Dict[int, str] = {}  # ID FAISS -> ID MongoDB
+        
+        # Les recherches tournent dans l'exécuteur de calcul : le verrou garantit
+        # qu'elles voient un couple (index, ids_ressources) cohérent pendant une modification
+        self._verrou_index = threading.RLock()
+        
+        # Génération de l'index : incrémentée à chaque modification (ajout, reconstruction, chargement)
+        self.generation = 0
+        self.date_derniere_modification = None
+        
+        # Snapshots versionnés de l'index : <FAISS_INDEX_PATH>_snapshots/v000001/...
+        # Le pointeur COURANT désigne le snapshot en service pour tous les processus
+        self.dossier_snapshots = f"{index_path}_snapshots"
+        self.nb_snapshots_conserves = max(1, int(os.getenv("FAISS_SNAPSHOTS_CONSERVES", "5")))
+        self.snapshot_courant: Optional[str] = None  # Snapshot écrit ou lu en dernier par ce processus
+        self._verrou_sauvegarde = threading.RLock()
+        
+        # Persistance différée : les modifications sont ajoutées à un journal (deltas-<version>.log)
+        # et un snapshot complet n'est écrit qu'après N vecteurs modifiés ou T secondes
+        self.persistance_differee = os.getenv("FAISS_PERSISTANCE_DIFFEREE", "True") == "True"
+        self.snapshot_apres_n_modifications = int(os.getenv("FAISS_SNAPSHOT_APRES_N_MODIFICATIONS", "1000"))
+        self.snapshot_apres_secondes = float(os.getenv("FAISS_SNAPSHOT_APRES_SECONDES", "300"))
+        self._position_journal = 0  # Octets du journal déjà appliqués à l'index en mémoire
+        self._nb_modifications_journalisees = 0
+        self._tache_snapshot_differe: Optional[asyncio.Task] = None
         
-    def _creer_index_faiss(self) -> faiss.Index:
+        # Surveillance du disque : snapshots et journal publiés par les workers de crawl
+        # (autres processus) appliqués à intervalle régulier (0 = désactivée)
+        self.intervalle_rechargement = float(os.getenv("FAISS_RECHARGEMENT_INTERVALLE", "5"))
+        self._tache_rechargement: Optional[asyncio.Task] = None
+        
+        # Type d'index demandé et paramètres de construction/recherche
+        self.type_index_demande = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+        if self.type_index_demande not in TYPES_INDEX:
+            logger.warning(f"⚠️ FAISS_INDEX_TYPE inconnu '{self.type_index_demande}', utilisation de flat")
+            self.type_index_demande = "flat"
+        self.ivf_nlist = int(os.getenv("FAISS_IVF_NLIST", "0"))  # 0 = 4 * racine(nb vecteurs)
+        self.pq_m = int(os.getenv("FAISS_PQ_M", "48"))
+        self.pq_nbits = int(os.getenv("FAISS_PQ_NBITS", "8"))
+        self.hnsw_m = int(os.getenv("FAISS_HNSW_M", "32"))
+        self.hnsw_ef_construction = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200"))
+        self.nprobe = int(os.getenv("FAISS_NPROBE", "16"))
+        self.ef_search = int(os.getenv("FAISS_EF_SEARCH", "64"))
+        self.taille_max_entrainement = int(os.getenv("FAISS_ENTRAINEMENT_MAX", "100000"))
+        self.nb_requetes_rappel = int(os.getenv("FAISS_RAPPEL_NB_REQUETES", "200"))
+        # HNSW ne supporte pas la suppression : au-delà de cette proportion de vecteurs
+        # orphelins (ressources retirées), l'index est reconstruit depuis MongoDB
+        self.proportion_max_orphelins = float(os.getenv("FAISS_ORPHELINS_PROPORTION_MAX", "0.1"))
+        self._tache_reconstruction: Optional[asyncio.Task] = None
+        
+        # Rappel de l'index mesuré contre une recherche exacte lors de la dernière construction
+        self.rappel_index: Optional[Dict] = None
+        
+        # Chargement par projection mémoire (mmap) : les workers d'un même hôte partagent
+        # les listes inversées via le cache de pages ; copie en mémoire à la première écriture
+        self.index_mmap = os.getenv("FAISS_INDEX_MMAP", "False") == "True"
+        self.index_en_lecture_seule = False
+        
+    def _creer_index_faiss(self, embeddings: Optional[np.ndarray] = None) -> faiss.Index:
         """
-        Crée un nouvel index FAISS optimisé pour la recherche sémantique
+        Crée un nouvel index FAISS du type configuré (FAISS_INDEX_TYPE), dont les
+        vecteurs sont adressés par ID de ressource : les index IVF stockent les IDs
+        nativement, Flat et HNSW sont enveloppés dans un IndexIDMap2.
+        Les index IVF sont entraînés sur les embeddings fournis ; sans données
+        d'entraînement suffisantes, un index Flat (exact) est créé à la place.
+        Opération bloquante : à appeler dans l'exécuteur de calcul si entraînement.
         
+        Args:
+            embeddings: Embeddings normalisés servant à l'entraînement (IVF)
+            
         Returns:
-            Index FAISS configuré
+            Index FAISS configuré (produit scalaire = similarité cosine)
         """
-        # Utiliser IndexFlatIP pour la similarité cosine (Inner Product)
-        # Note: les embeddings de sentence-transformers sont normalisés
-        index = faiss.IndexFlatIP(self.embedding_dimension)
-        logger.info(f"✅ Index FAISS créé (dimension: {self.embedding_dimension})")
+        dimension = self.embedding_dimension
+        type_index = self.type_index_demande
+        nb_vecteurs = 0 if embeddings is None else len(embeddings)
+        
+        if type_index == "ivf_pq" and dimension % self.pq_m != 0:
+            logger.warning(f"⚠️ FAISS_PQ_M={self.pq_m} ne divise pas la dimension {dimension}, utilisation de ivf_flat")
+            type_index = "ivf_flat"
+        
+        if type_index in ("ivf_flat", "ivf_pq"):
+            # FAISS recommande au moins ~39 vecteurs d'entraînement par centroïde
+            nlist = min(self.ivf_nlist or int(4 * np.sqrt(nb_vecteurs)), nb_vecteurs // 39)
+            minimum = 2 ** self.pq_nbits if type_index == "ivf_pq" else 1
+            if nlist < 1 or nb_vecteurs < minimum:
+                logger.info(f"ℹ️ Pas assez d'embeddings ({nb_vecteurs}) pour entraîner un index {type_index}, index Flat utilisé")
+                type_index = "flat"
+        
+        if type_index == "flat":
+            index = faiss.IndexFlatIP(dimension)
+        elif type_index == "hnsw":
+            index = faiss.IndexHNSWFlat(dimension, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = self.hnsw_ef_construction
+        else:
+            quantizer = faiss.IndexFlatIP(dimension)
+            if type_index == "ivf_flat":
+                index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+            else:
+                index = faiss.IndexIVFPQ(
+                    quantizer, dimension, nlist, self.pq_m, self.pq_nbits, faiss.METRIC_INNER_PRODUCT
+                )
+            
+            # Entraîner sur un échantillon des embeddings stockés
+            echantillon = embeddings
+            if nb_vecteurs > self.taille_max_entrainement:
+                positions = np.random.choice(nb_vecteurs, self.taille_max_entrainement, replace=False)
+                echantillon = embeddings[positions]
+            index.train(echantillon)
+            logger.info(f"🎓 Index {type_index} entraîné ({len(echantillon)} vecteurs, nlist={nlist})")
+        
+        logger.info(f"✅ Index FAISS {type_index} créé (dimension: {dimension})")
+        if type_index in ("flat", "hnsw"):
+            index = faiss.IndexIDMap2(index)
         return index
     
-    def generer_embedding(self, texte: str) -> Optional[np.ndarray]:
+    @staticmethod
+    def _index_base(index: faiss.Index) -> faiss.Index:
+        """Retourne l'index sous-jacent d'un index à IDs (IndexIDMap/IndexIDMap2)"""
+        if isinstance(index, faiss.IndexIDMap):
+            return faiss.downcast_index(index.index)
+        return index
+    
+    @classmethod
+    def _supporte_suppression(cls, index: faiss.Index) -> bool:
+        """Indique si l'index peut retirer un vecteur (HNSW ne le peut pas)"""
+        return not isinstance(cls._index_base(index), faiss.IndexHNSW)
+    
+    @classmethod
+    def _type_index(cls, index: faiss.Index) -> str:
+        """Retourne le type (flat, ivf_flat, ivf_pq, hnsw) d'un index FAISS"""
+        index = cls._index_base(index)
+        if isinstance(index, faiss.IndexIVFPQ):
+            return "ivf_pq"
+        if isinstance(index, faiss.IndexIVFFlat):
+            return "ivf_flat"
+        if isinstance(index, faiss.IndexHNSWFlat):
+            return "hnsw"
+        return "flat"
+    
+    def _appliquer_parametres_recherche(
+        self,
+        index: faiss.Index,
+        top_k: int = 10,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ):
+        """
+        Règle nprobe (IVF) ou efSearch (HNSW) avant une recherche.
+        Pour l'index en service, à appeler sous le verrou de l'index.
+        """
+        index = self._index_base(index)
+        if isinstance(index, faiss.IndexIVF):
+            index.nprobe = nprobe or self.nprobe
+        elif isinstance(index, faiss.IndexHNSW):
+            # efSearch doit couvrir au moins les k résultats demandés
+            index.hnsw.efSearch = max(ef_search or self.ef_search, top_k)
+    
+    def _mesurer_rappel(self, index: faiss.Index, embeddings: np.ndarray, ids: np.ndarray, k: int = 10) -> Dict:
+        """
+        Mesure le rappel@k de l'index contre une recherche exacte (Flat),
+        en interrogeant l'index avec un échantillon des vecteurs indexés
+        
+        Args:
+            index: Index construit (pas encore en service)
+            embeddings: Embeddings normalisés indexés
+            ids: IDs FAISS des embeddings (même ordre)
+            k: Nombre de voisins comparés
+            
+        Returns:
+            Dictionnaire avec le rappel et les paramètres de la mesure
+        """
+        type_index = self._type_index(index)
+        nb_vecteurs = len(embeddings)
+        k = min(k, nb_vecteurs)
+        mesure = {
+            "k": k,
+            "nprobe": self.nprobe if type_index.startswith("ivf") else None,
+            "ef_search": self.ef_search if type_index == "hnsw" else None,
+            "date_mesure": datetime.now().isoformat()
+        }
+        
+        if type_index == "flat" or k == 0:
+            return {**mesure, "rappel": 1.0, "nb_requetes": 0}
+        
+        nb_requetes = min(self.nb_requetes_rappel, nb_vecteurs)
+        requetes = embeddings[np.random.choice(nb_vecteurs, nb_requetes, replace=False)]
+        
+        # Voisins exacts par force brute, sans copier les vecteurs dans un second index
+        _, positions_attendues = faiss.knn(requetes, embeddings, k, metric=faiss.METRIC_INNER_PRODUCT)
+        attendus = ids[positions_attendues]
+        
+        self._appliquer_parametres_recherche(index, k)
+        _, obtenus = index.search(requetes, k)
+        
+        trouves = sum(len(set(a) & set(o)) for a, o in zip(attendus, obtenus))
+        rappel = trouves / (nb_requetes * k)
+        logger.info(f"🎯 Rappel@{k} de l'index {type_index}: {rappel:.3f} ({nb_requetes} requêtes)")
+        return {**mesure, "rappel": round(rappel, 4), "nb_requetes": nb_requetes}
+    
+    async def generer_embedding(self, texte: str) -> Optional[np.ndarray]:
         """
-        Génère un embedding pour un texte donné
+        Génère un embedding pour un texte donné, regroupé avec les appels
+        concurrents par le micro-batcher d'embeddings
         
         Args:
             texte: Texte à vectoriser
@@ -76,22 +307,29 @@ class NLPService:
             return None
         
         try:
-            # Générer l'embedding
-            embedding = self.embedding_model.encode(
-                texte.strip(), 
-                normalize_embeddings=True,  # Normaliser pour la similarité cosine
-                show_progress_bar=False
-            )
-            return embedding.astype('float32')
+            # Encodage par lot partagé, hors de la boucle d'événements
+            embedding = await get_embedding_batcher().soumettre(texte.strip())
+            embedding = np.asarray(embedding, dtype='float32')
+
+            # Normaliser pour la similarité cosine
+            norme = np.linalg.norm(embedding)
+            return embedding / norme if norme > 0 else embedding
             
         except Exception as e:
             logger.error(f"❌ Erreur génération embedding: {e}")
             return None
     
+    def _incrementer_generation(self):
+        """Marque l'index comme modifié (nouvelle génération)"""
+        self.generation += 1
+        self.date_derniere_modification = datetime.now()
+    
     async def reconstruire_index_depuis_bd(self) -> Dict:
         """
         Reconstruit l'index FAISS à partir de tous les embeddings stockés dans MongoDB
-        Cette fonction est appelée au démarrage de l'application
+        Opération de maintenance : appelée au démarrage si aucun index n'est sauvegardé
+        ou explicitement via /api/nlp/reconstruire-index. Le workflow s'appuie
+        sur les mises à jour incrémentales (ajouter_ressources_a_index).
         
         Returns:
             Dictionnaire avec les statistiques de reconstruction
@@ -99,28 +337,26 @@ class NLPService:
         logger.info("🔄 Reconstruction de l'index FAISS depuis MongoDB...")
         
         try:
-            # Se connecter à MongoDB
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            collection = db[self.mongodb_collection]
+            # Collection MongoDB (client partagé)
+            collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
             
             # Récupérer toutes les ressources avec embeddings
-            ressources = list(collection.find(
+            ressources = await collection.find(
                 {"embedding": {"$exists": True, "$ne": None}},
                 {"_id": 1, "embedding": 1}
-            ))
-            
-            client.close()
+            ).to_list(length=None)
             
             if not ressources:
                 logger.warning("⚠️ Aucun embedding trouvé dans la base de données")
                 # Créer un index vide
-                self.index = self._creer_index_faiss()
-                self.resource_ids = []
-                self._sauvegarder_index()
+                self._remplacer_index(self._creer_index_faiss(), {})
+                self.rappel_index = None
+                self._incrementer_generation()
+                await executer_calcul(self._sauvegarder_index, nom="faiss_sauvegarde")
                 return {
                     "status": "success",
                     "nb_embeddings": 0,
+                    "generation": self.generation,
                     "message": "Index vide créé"
                 }
             
@@ -136,44 +372,54 @@ class NLPService:
             
             if not embeddings:
                 logger.warning("⚠️ Aucun embedding valide trouvé")
-                self.index = self._creer_index_faiss()
-                self.resource_ids = []
-                self._sauvegarder_index()
+                self._remplacer_index(self._creer_index_faiss(), {})
+                self.rappel_index = None
+                self._incrementer_generation()
+                await executer_calcul(self._sauvegarder_index, nom="faiss_sauvegarde")
                 return {
                     "status": "success",
                     "nb_embeddings": 0,
+                    "generation": self.generation,
                     "message": "Aucun embedding valide"
                 }
             
-            # Créer l'index FAISS
-            self.index = self._creer_index_faiss()
-            
             # Convertir en numpy array
             embeddings_array = np.array(embeddings, dtype='float32')
+            ids_array = np.array([id_faiss(rid) for rid in ids], dtype='int64')
             
             # Normaliser les embeddings pour la similarité cosine
             faiss.normalize_L2(embeddings_array)
             
-            # Ajouter les embeddings à l'index
-            self.index.add(embeddings_array)
-            self.resource_ids = ids
+            # Créer (et entraîner) le nouvel index à part : les recherches continuent sur l'ancien
+            index = await executer_calcul(self._creer_index_faiss, embeddings_array, nom="faiss_construction")
+            
+            # Ajouter les embeddings à l'index sous leurs IDs stables
+            await executer_calcul(index.add_with_ids, embeddings_array, ids_array, nom="faiss_construction")
+            
+            # Mesurer le rappel contre une recherche exacte avant la mise en service
+            self.rappel_index = await executer_calcul(
+                self._mesurer_rappel, index, embeddings_array, ids_array, nom="faiss_rappel"
+            )
+            self._remplacer_index(index, dict(zip(ids_array.tolist(), ids)))
+            self._incrementer_generation()
             
             # Sauvegarder l'index sur disque
-            self._sauvegarder_index()
+            await executer_calcul(self._sauvegarder_index, nom="faiss_sauvegarde")
             
-            logger.info(f"✅ Index FAISS reconstruit avec {len(embeddings)} embeddings")
+            logger.info(f"✅ Index FAISS reconstruit avec {len(embeddings)} embeddings (génération {self.generation})")
             
             return {
                 "status": "success",
                 "nb_embeddings": len(embeddings),
+                "generation": self.generation,
+                "type_index": self._type_index(index),
+                "rappel": self.rappel_index,
                 "message": f"Index reconstruit avec succès"
             }
             
         except Exception as e:
             logger.error(f"❌ Erreur reconstruction index: {e}")
-            # Créer un index vide en cas d'erreur
-            self.index = self._creer_index_faiss()
-            self.resource_ids = []
+            # L'index en service et le snapshot courant restent inchangés
             return {
                 "status": "error",
                 "nb_embeddings": 0,
@@ -201,88 +447,218 @@ class NLPService:
         logger.info(f"➕ Ajout de {len(resource_ids)} nouvelles ressources à l'index...")
         
         try:
-            # Se connecter à MongoDB
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            collection = db[self.mongodb_collection]
-            
             # Récupérer les embeddings des nouvelles ressources
-            from bson import ObjectId
-            object_ids = [ObjectId(rid) for rid in resource_ids]
-            
-            ressources = list(collection.find(
-                {
-                    "_id": {"$in": object_ids},
-                    "embedding": {"$exists": True, "$ne": None}
-                },
-                {"_id": 1, "embedding": 1}
-            ))
-            
-            client.close()
+            embeddings_array, ids = await self._charger_embeddings(resource_ids)
             
-            if not ressources:
+            if not ids:
                 return {
                     "status": "success",
                     "nb_ajoutes": 0,
                     "message": "Aucun embedding à ajouter"
                 }
             
-            # Extraire les embeddings
-            embeddings = []
-            ids = []
+            # Ajouter les embeddings à l'index (créé s'il n'existe pas ; un ID déjà indexé est remplacé)
+            non_remplaces = await executer_calcul(self._ajouter_vecteurs, embeddings_array, ids, nom="faiss_ajout")
+            if non_remplaces:
+                logger.warning(f"⚠️ {len(non_remplaces)} ressources déjà dans l'index HNSW conservées (remplacer-ressources pour les mettre à jour)")
+            self._incrementer_generation()
             
-            for ressource in ressources:
-                embedding = ressource.get("embedding")
-                if embedding and len(embedding) == self.embedding_dimension:
-                    embeddings.append(embedding)
-                    ids.append(str(ressource["_id"]))
+            # Persister la modification (journal + snapshot différé)
+            await self._persister_modification(OP_AJOUT, ids, embeddings_array)
             
-            if not embeddings:
+            logger.info(f"✅ {len(ids)} ressources ajoutées à l'index (total: {self.index.ntotal}, génération {self.generation})")
+            
+            return {
+                "status": "success",
+                "nb_ajoutes": len(ids),
+                "total_index": self.index.ntotal,
+                "generation": self.generation,
+                "message": "Ressources ajoutées avec succès"
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur ajout à l'index: {e}")
+            return {
+                "status": "error",
+                "nb_ajoutes": 0,
+                "message": str(e)
+            }
+    
+    async def supprimer_ressources_de_index(self, resource_ids: List[str]) -> Dict:
+        """
+        Retire des ressources (supprimées de MongoDB) de l'index FAISS
+        sans reconstruction complète
+        
+        Args:
+            resource_ids: Liste des IDs MongoDB des ressources à retirer
+            
+        Returns:
+            Dictionnaire avec les statistiques de suppression
+        """
+        if not resource_ids or self.index is None:
+            return {
+                "status": "success",
+                "nb_supprimes": 0,
+                "message": "Aucune ressource à retirer"
+            }
+        
+        try:
+            nb_supprimes = await executer_calcul(self._retirer_vecteurs, resource_ids, nom="faiss_suppression")
+            if nb_supprimes:
+                self._incrementer_generation()
+                await self._persister_modification(OP_SUPPRESSION, resource_ids)
+                self._verifier_orphelins()
+            
+            logger.info(f"🗑️ {nb_supprimes} ressources retirées de l'index (génération {self.generation})")
+            
+            return {
+                "status": "success",
+                "nb_supprimes": nb_supprimes,
+                "total_index": len(self.ids_ressources),
+                "generation": self.generation,
+                "message": "Ressources retirées avec succès"
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur suppression de l'index: {e}")
+            return {
+                "status": "error",
+                "nb_supprimes": 0,
+                "message": str(e)
+            }
+    
+    async def remplacer_ressources_dans_index(self, resource_ids: List[str]) -> Dict:
+        """
+        Met à jour les vecteurs de ressources modifiées : l'embedding actuel
+        remplace l'ancien, et les ressources sans embedding (ou supprimées)
+        sont retirées de l'index. Un index HNSW ne pouvant pas remplacer un
+        vecteur, il est alors reconstruit depuis MongoDB.
+        
+        Args:
+            resource_ids: Liste des IDs MongoDB des ressources modifiées
+            
+        Returns:
+            Dictionnaire avec les statistiques de remplacement
+        """
+        if not resource_ids:
+            return {
+                "status": "success",
+                "nb_remplaces": 0,
+                "nb_supprimes": 0,
+                "message": "Aucune ressource à remplacer"
+            }
+        
+        try:
+            if self.index is not None and not self._supporte_suppression(self.index) and any(
+                id_faiss(rid) in self.ids_ressources for rid in resource_ids
+            ):
+                logger.info("♻️ Remplacement impossible en place dans un index HNSW : reconstruction")
+                resultat = await self.reconstruire_index_depuis_bd()
                 return {
-                    "status": "success",
-                    "nb_ajoutes": 0,
-                    "message": "Aucun embedding valide"
+                    "status": resultat["status"],
+                    "nb_remplaces": resultat.get("nb_embeddings", 0) if resultat["status"] == "success" else 0,
+                    "nb_supprimes": 0,
+                    "total_index": len(self.ids_ressources),
+                    "generation": self.generation,
+                    "reconstruction": True,
+                    "message": resultat["message"]
                 }
             
-            # Créer l'index s'il n'existe pas
-            if self.index is None:
-                self.index = self._creer_index_faiss()
-                self.resource_ids = []
+            embeddings_array, ids = await self._charger_embeddings(resource_ids)
             
-            # Convertir en numpy array
-            embeddings_array = np.array(embeddings, dtype='float32')
+            # Ressources disparues ou sans embedding valide : retirées de l'index
+            ids_absents = list(set(resource_ids) - set(ids))
+            nb_supprimes = 0
+            if ids_absents and self.index is not None:
+                nb_supprimes = await executer_calcul(self._retirer_vecteurs, ids_absents, nom="faiss_suppression")
+                if nb_supprimes:
+                    await self._persister_modification(OP_SUPPRESSION, ids_absents)
             
-            # Normaliser les embeddings
-            faiss.normalize_L2(embeddings_array)
-            
-            # Ajouter les embeddings à l'index
-            self.index.add(embeddings_array)
-            self.resource_ids.extend(ids)
+            if ids:
+                await executer_calcul(self._ajouter_vecteurs, embeddings_array, ids, nom="faiss_ajout")
+                await self._persister_modification(OP_AJOUT, ids, embeddings_array)
             
-            # Sauvegarder l'index mis à jour
-            self._sauvegarder_index()
+            if ids or nb_supprimes:
+                self._incrementer_generation()
+            if nb_supprimes:
+                self._verifier_orphelins()
             
-            logger.info(f"✅ {len(embeddings)} ressources ajoutées à l'index (total: {self.index.ntotal})")
+            logger.info(f"♻️ {len(ids)} ressources remplacées, {nb_supprimes} retirées de l'index (génération {self.generation})")
             
             return {
                 "status": "success",
-                "nb_ajoutes": len(embeddings),
-                "total_index": self.index.ntotal,
-                "message": "Ressources ajoutées avec succès"
+                "nb_remplaces": len(ids),
+                "nb_supprimes": nb_supprimes,
+                "total_index": len(self.ids_ressources),
+                "generation": self.generation,
+                "message": "Ressources remplacées avec succès"
             }
             
         except Exception as e:
-            logger.error(f"❌ Erreur ajout à l'index: {e}")
+            logger.error(f"❌ Erreur remplacement dans l'index: {e}")
             return {
                 "status": "error",
-                "nb_ajoutes": 0,
+                "nb_remplaces": 0,
+                "nb_supprimes": 0,
                 "message": str(e)
             }
     
+    def _verifier_orphelins(self):
+        """
+        Planifie une reconstruction de l'index en tâche de fond lorsque les vecteurs
+        orphelins (HNSW) dépassent FAISS_ORPHELINS_PROPORTION_MAX des vecteurs indexés
+        """
+        if self.index is None or self._supporte_suppression(self.index):
+            return
+        nb_orphelins = max(0, self.index.ntotal - len(self.ids_ressources))
+        if nb_orphelins <= self.proportion_max_orphelins * max(1, len(self.ids_ressources)):
+            return
+        if self._tache_reconstruction is not None and not self._tache_reconstruction.done():
+            return
+        logger.info(f"🧹 {nb_orphelins} vecteurs orphelins dans l'index HNSW : reconstruction planifiée")
+        self._tache_reconstruction = asyncio.create_task(self.reconstruire_index_depuis_bd())
+    
+    async def _charger_embeddings(self, resource_ids: Iterable[str]) -> Tuple[Optional[np.ndarray], List[str]]:
+        """
+        Récupère et normalise les embeddings valides de ressources MongoDB
+        
+        Args:
+            resource_ids: IDs MongoDB des ressources
+            
+        Returns:
+            Tuple (embeddings normalisés ou None, IDs correspondants)
+        """
+        collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
+        ressources = await collection.find(
+            {
+                "_id": {"$in": [ObjectId(rid) for rid in resource_ids]},
+                "embedding": {"$exists": True, "$ne": None}
+            },
+            {"_id": 1, "embedding": 1}
+        ).to_list(length=None)
+        
+        embeddings = []
+        ids = []
+        for ressource in ressources:
+            embedding = ressource.get("embedding")
+            if embedding and len(embedding) == self.embedding_dimension:
+                embeddings.append(embedding)
+                ids.append(str(ressource["_id"]))
+        
+        if not embeddings:
+            return None, []
+        
+        # Normaliser les embeddings pour la similarité cosine
+        embeddings_array = np.array(embeddings, dtype='float32')
+        faiss.normalize_L2(embeddings_array)
+        return embeddings_array, ids
+    
     async def recherche_semantique(
         self, 
         question: str, 
-        top_k: int = 10
+        top_k: int = 10,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None
     ) -> List[Tuple[str, float]]:
         """
         Effectue une recherche sémantique dans l'index FAISS
@@ -290,6 +666,8 @@ class NLPService:
         Args:
             question: Question de l'utilisateur
             top_k: Nombre de résultats à retourner
+            nprobe: Nombre de listes IVF explorées (défaut FAISS_NPROBE)
+            ef_search: Largeur de recherche HNSW (défaut FAISS_EF_SEARCH)
             
         Returns:
             Liste de tuples (resource_id, score_similarite)
@@ -303,7 +681,7 @@ class NLPService:
         
         try:
             # Générer l'embedding de la question
-            question_embedding = self.generer_embedding(question)
+            question_embedding = await self.generer_embedding(question)
             
             if question_embedding is None:
                 return []
@@ -314,16 +692,10 @@ class NLPService:
             # Normaliser pour la similarité cosine
             faiss.normalize_L2(query_vector)
             
-            # Recherche des k plus proches voisins
-            k = min(top_k, self.index.ntotal)
-            distances, indices = self.index.search(query_vector, k)
-            
-            # Construire les résultats
-            resultats = []
-            for idx, score in zip(indices[0], distances[0]):
-                if idx < len(self.resource_ids):
-                    resource_id = self.resource_ids[idx]
-                    resultats.append((resource_id, float(score)))
+            # Recherche des k plus proches voisins (dans l'exécuteur de calcul)
+            resultats = await executer_calcul(
+                self._rechercher_dans_index, query_vector, top_k, nprobe, ef_search, nom="faiss_recherche"
+            )
             
             logger.info(f"🔍 Recherche sémantique: {len(resultats)} résultats trouvés")
             return resultats
@@ -332,10 +704,137 @@ class NLPService:
             logger.error(f"❌ Erreur recherche sémantique: {e}")
             return []
     
+    def _rechercher_dans_index(
+        self,
+        query_vector: np.ndarray,
+        top_k: int,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Recherche FAISS synchrone, exécutée sous le verrou de l'index
+        
+        Args:
+            query_vector: Vecteur de la question normalisé (1 x dimension)
+            top_k: Nombre de résultats à retourner
+            nprobe: Nombre de listes IVF explorées
+            ef_search: Largeur de recherche HNSW
+            
+        Returns:
+            Liste de tuples (resource_id, score_similarite)
+        """
+        with self._verrou_index:
+            # Vecteurs orphelins (HNSW ne supporte pas la suppression) : élargir k pour les compenser
+            nb_orphelins = max(0, self.index.ntotal - len(self.ids_ressources))
+            k = min(top_k + nb_orphelins, self.index.ntotal)
+            self._appliquer_parametres_recherche(self.index, k, nprobe, ef_search)
+            distances, indices = self.index.search(query_vector, k)
+            
+            # Construire les résultats (IDs retirés ignorés, une seule fois par ressource)
+            resultats = []
+            vus = set()
+            for id_vecteur, score in zip(indices[0], distances[0]):
+                resource_id = self.ids_ressources.get(int(id_vecteur))
+                if resource_id is not None and resource_id not in vus:
+                    vus.add(resource_id)
+                    resultats.append((resource_id, float(score)))
+            return resultats[:top_k]
+    
+    def _remplacer_index(self, index: faiss.Index, ids_ressources: Dict[int, str], lecture_seule: bool = False):
+        """Remplace atomiquement l'index et sa table d'IDs"""
+        with self._verrou_index:
+            self.index = index
+            self.ids_ressources = ids_ressources
+            self.index_en_lecture_seule = lecture_seule
+    
+    def _ajouter_vecteurs(self, embeddings_array: np.ndarray, ids: List[str]) -> List[str]:
+        """
+        Ajoute (ou remplace) des vecteurs sous leurs IDs stables, sous le verrou.
+        Un index sans suppression (HNSW) ne peut pas remplacer un vecteur : les IDs
+        déjà indexés y sont ignorés plutôt que dupliqués sous le même ID.
+        
+        Returns:
+            IDs déjà indexés qui n'ont pas pu être remplacés (HNSW)
+        """
+        with self._verrou_index:
+            if self.index is None:
+                self.index = self._creer_index_faiss()
+                self.ids_ressources = {}
+            self._assurer_index_modifiable()
+            
+            existants = [rid for rid in ids if id_faiss(rid) in self.ids_ressources]
+            non_remplaces = []
+            if existants and not self._supporte_suppression(self.index):
+                non_remplaces = existants
+                conserves = [i for i, rid in enumerate(ids) if id_faiss(rid) not in self.ids_ressources]
+                embeddings_array = embeddings_array[conserves]
+                ids = [ids[i] for i in conserves]
+            elif existants:
+                # Un ID déjà indexé est remplacé : retirer l'ancien vecteur avant l'ajout
+                self._retirer_vecteurs(existants)
+            
+            if ids:
+                ids_array = np.array([id_faiss(rid) for rid in ids], dtype='int64')
+                self.index.add_with_ids(embeddings_array, ids_array)
+                self.ids_ressources.update(zip(ids_array.tolist(), ids))
+            return non_remplaces
+    
+    def _assurer_index_modifiable(self):
+        """
+        Copie en mémoire les listes inversées d'un index projeté en lecture seule
+        avant sa première modification (à appeler sous le verrou). La copie part
+        de l'état en service, cohérent avec la table d'IDs, et non du fichier
+        qui a pu être remplacé depuis par un autre processus.
+        """
+        if not self.index_en_lecture_seule:
+            return
+        
+        ivf = faiss.extract_index_ivf(self.index)
+        listes_projetees = ivf.invlists
+        listes = faiss.ArrayInvertedLists(listes_projetees.nlist, listes_projetees.code_size)
+        for numero_liste in range(listes_projetees.nlist):
+            taille = listes_projetees.list_size(numero_liste)
+            if taille:
+                listes.add_entries(
+                    numero_liste,
+                    taille,
+                    listes_projetees.get_ids(numero_liste),
+                    listes_projetees.get_codes(numero_liste)
+                )
+        
+        # L'index devient propriétaire des nouvelles listes (la projection est libérée)
+        ivf.replace_invlists(listes, True)
+        listes.this.disown()
+        self.index_en_lecture_seule = False
+        logger.info(f"📝 Index mmap copié en mémoire avant modification ({self.index.ntotal} vecteurs)")
+    
+    def _retirer_vecteurs(self, ids: List[str]) -> int:
+        """
+        Retire des vecteurs par ID de ressource, sous le verrou
+        
+        Returns:
+            Nombre de ressources retirées de la table d'IDs
+        """
+        ids_array = np.array([id_faiss(rid) for rid in ids], dtype='int64')
+        with self._verrou_index:
+            self._assurer_index_modifiable()
+            if self._supporte_suppression(self.index):
+                self.index.remove_ids(ids_array)
+            # Sinon (HNSW) le vecteur reste orphelin, ignoré à la recherche (absent de la table)
+            # jusqu'à la reconstruction déclenchée par _verifier_orphelins
+            
+            nb_retires = 0
+            for id_vecteur in ids_array.tolist():
+                if self.ids_ressources.pop(id_vecteur, None) is not None:
+                    nb_retires += 1
+            return nb_retires
+    
     async def recherche_et_recuperer_ressources(
         self,
         question: str,
-        top_k: int = 10
+        top_k: int = 10,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None
     ) -> List[Dict]:
         """
         Effectue une recherche sémantique et récupère les ressources complètes
@@ -343,28 +842,25 @@ class NLPService:
         Args:
             question: Question de l'utilisateur
             top_k: Nombre de résultats à retourner
+            nprobe: Nombre de listes IVF explorées (index IVF)
+            ef_search: Largeur de recherche HNSW (index HNSW)
             
         Returns:
             Liste de dictionnaires avec les ressources et leurs scores
         """
         # Recherche sémantique
-        resultats_recherche = await self.recherche_semantique(question, top_k)
+        resultats_recherche = await self.recherche_semantique(question, top_k, nprobe, ef_search)
         
         if not resultats_recherche:
             return []
         
         try:
             # Récupérer les ressources depuis MongoDB
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            collection = db[self.mongodb_collection]
+            collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
             
-            from bson import ObjectId
             resource_ids = [ObjectId(rid) for rid, _ in resultats_recherche]
             
-            ressources = list(collection.find({"_id": {"$in": resource_ids}}))
-            
-            client.close()
+            ressources = await collection.find({"_id": {"$in": resource_ids}}).to_list(length=None)
             
             # Créer un dictionnaire pour un accès rapide
             ressources_dict = {str(r["_id"]): r for r in ressources}
@@ -410,51 +906,681 @@ class NLPService:
         
         return resultats
     
-    def _sauvegarder_index(self):
-        """Sauvegarde l'index FAISS et les IDs sur disque"""
-        try:
-            if self.index is not None:
-                # Sauvegarder l'index FAISS
-                faiss.write_index(self.index, f"{self.index_path}.index")
+    def _table_ids(self) -> np.ndarray:
+        """Table ID FAISS -> ObjectId (binaire, 20 octets par ressource), à construire sous le verrou"""
+        table = np.empty(len(self.ids_ressources), dtype=DTYPE_TABLE_IDS)
+        table["id"] = list(self.ids_ressources.keys())
+        table["oid"] = np.frombuffer(
+            b"".join(ObjectId(rid).binary for rid in self.ids_ressources.values()), dtype='u1'
+        ).reshape(-1, 12)
+        return table
+    
+    def _sauvegarder_index(self, si_a_jour: bool = False) -> bool:
+        """
+        Sauvegarde l'index FAISS et les IDs dans un nouveau snapshot versionné.
+        Les publications sont sérialisées entre processus par le verrou de publication :
+        le pointeur COURANT est relu sous ce verrou et le journal du snapshot en service
+        est rejoué avant l'écriture, pour ne jamais publier un index plus ancien que
+        celui d'un autre processus. Seule la sérialisation en mémoire se fait sous le
+        verrou de l'index : l'écriture sur disque (fsync compris) ne bloque pas les recherches.
+        Opération bloquante : à appeler dans l'exécuteur de calcul.
+        
+        Args:
+            si_a_jour: Si un autre processus a publié un snapshot plus récent, le charger
+                au lieu de publier (il intègre déjà le journal de ce processus). Sinon
+                (reconstruction), tout le journal de ce snapshot est rejoué puis l'index publié.
+        
+        Returns:
+            True si un snapshot a été publié
+        """
+        with self._verrou_sauvegarde:
+            try:
+                with self._verrou_publication():
+                    pointeur = self._lire_pointeur()
+                    if pointeur is not None and pointeur != self.snapshot_courant:
+                        if si_a_jour:
+                            logger.info(f"🔁 Snapshot {pointeur} publié par un autre processus, chargement au lieu de la sauvegarde")
+                            if not self.charger_index():
+                                raise RuntimeError(f"Impossible de charger le snapshot {pointeur}")
+                            return False
+                        # Index reconstruit : ses modifications journalisées sont toutes à rejouer
+                        self._position_journal = 0
+                    
+                    journal = None
+                    try:
+                        # Journal du snapshot en service : verrouillé jusqu'à la publication pour
+                        # qu'aucun processus n'y ajoute une modification que le nouveau snapshot ignorerait
+                        if pointeur is not None:
+                            journal = open(self._chemin_journal(pointeur), 'ab+')
+                            self._verrouiller_fichier(journal, exclusif=True)
+                            self._rattraper_journal(journal, tronquer=True)
+                        
+                        with self._verrou_index:
+                            if self.index is None:
+                                return False
+                            donnees_index = faiss.serialize_index(self.index)
+                            table = self._table_ids()
+                            manifeste = {
+                                "date_creation": datetime.now().isoformat(),
+                                "generation": self.generation,
+                                "type_index": self._type_index(self.index),
+                                "nb_vecteurs": int(self.index.ntotal),
+                                "nb_ids": len(table),
+                                "dimension": self.embedding_dimension,
+                                "rappel": self.rappel_index
+                            }
+                        
+                        version = self._ecrire_snapshot(donnees_index, table, manifeste)
+                        self.snapshot_courant = version
+                        self._position_journal = 0
+                        self._nb_modifications_journalisees = 0
+                        
+                        # Le journal de l'ancien snapshot est intégré au nouveau
+                        if journal is not None:
+                            os.remove(journal.name)
+                    finally:
+                        if journal is not None:
+                            self._verrouiller_fichier(journal, deverrouiller=True)
+                            journal.close()
+                    
+                    self._purger_snapshots()
+                
+                # Fichiers d'avant les snapshots : remplacés par le premier snapshot
+                for extension in (".index", ".ids.npy", ".meta.json", ".ids"):
+                    if os.path.exists(f"{self.index_path}{extension}"):
+                        os.remove(f"{self.index_path}{extension}")
+                logger.info(f"💾 Snapshot {version} de l'index FAISS sauvegardé ({manifeste['nb_vecteurs']} vecteurs)")
+                return True
                 
-                # Sauvegarder les IDs des ressources
-                with open(f"{self.index_path}.ids", 'wb') as f:
-                    pickle.dump(self.resource_ids, f)
+            except Exception as e:
+                logger.error(f"❌ Erreur sauvegarde index: {e}")
+                return False
+    
+    @contextmanager
+    def _verrou_publication(self):
+        """Verrou inter-processus (flock) sérialisant la publication des snapshots et du pointeur"""
+        os.makedirs(self.dossier_snapshots, exist_ok=True)
+        with open(os.path.join(self.dossier_snapshots, "PUBLICATION.lock"), 'ab') as verrou:
+            self._verrouiller_fichier(verrou, exclusif=True)
+            try:
+                yield
+            finally:
+                self._verrouiller_fichier(verrou, deverrouiller=True)
+    
+    # ------------------------------------------------------------------
+    # Journal des modifications (persistance différée)
+    # ------------------------------------------------------------------
+    
+    def _chemin_journal(self, version: str) -> str:
+        """Chemin du journal des modifications appliquées par-dessus un snapshot"""
+        return os.path.join(self.dossier_snapshots, f"deltas-{version}.log")
+    
+    @staticmethod
+    def _verrouiller_fichier(fichier, exclusif: bool = False, deverrouiller: bool = False):
+        """Verrou inter-processus (flock) sur un fichier ; sans effet hors POSIX"""
+        if fcntl is None:
+            return
+        if deverrouiller:
+            operation = fcntl.LOCK_UN
+        else:
+            operation = fcntl.LOCK_EX if exclusif else fcntl.LOCK_SH
+        fcntl.flock(fichier.fileno(), operation)
+    
+    @staticmethod
+    def _encoder_delta(operation: bytes, ids: List[str], embeddings: Optional[np.ndarray] = None) -> bytes:
+        """Encode une modification en enregistrement du journal"""
+        corps = ENTETE_CORPS_DELTA.pack(operation, len(ids)) + b"".join(ObjectId(rid).binary for rid in ids)
+        if embeddings is not None:
+            corps += np.ascontiguousarray(embeddings, dtype='float32').tobytes()
+        return ENTETE_DELTA.pack(MAGIE_DELTA, len(corps), zlib.crc32(corps)) + corps
+    
+    def _decoder_deltas(self, donnees: bytes) -> Tuple[List[Tuple[bytes, List[str], Optional[np.ndarray]]], int]:
+        """
+        Décode les enregistrements complets d'un extrait du journal
+        
+        Args:
+            donnees: Octets lus à partir d'une frontière d'enregistrement
+            
+        Returns:
+            Tuple (modifications (opération, IDs, embeddings), octets valides lus).
+            La lecture s'arrête au premier enregistrement incomplet ou corrompu.
+        """
+        deltas = []
+        position = 0
+        while position + ENTETE_DELTA.size <= len(donnees):
+            magie, taille, crc = ENTETE_DELTA.unpack_from(donnees, position)
+            debut_corps = position + ENTETE_DELTA.size
+            corps = donnees[debut_corps:debut_corps + taille]
+            if magie != MAGIE_DELTA or len(corps) < taille or zlib.crc32(corps) != crc:
+                break
+            
+            operation, nb_ids = ENTETE_CORPS_DELTA.unpack_from(corps)
+            debut_ids = ENTETE_CORPS_DELTA.size
+            ids = [corps[debut_ids + 12 * i:debut_ids + 12 * (i + 1)].hex() for i in range(nb_ids)]
+            embeddings = None
+            if operation == OP_AJOUT:
+                embeddings = np.frombuffer(
+                    corps, dtype='float32', offset=debut_ids + 12 * nb_ids
+                ).reshape(nb_ids, self.embedding_dimension).copy()
+            
+            deltas.append((operation, ids, embeddings))
+            position = debut_corps + taille
+        return deltas, position
+    
+    def _appliquer_deltas(self, deltas: List[Tuple[bytes, List[str], Optional[np.ndarray]]]):
+        """Rejoue des modifications sur l'index en mémoire (idempotent : ajout = remplacement)"""
+        for operation, ids, embeddings in deltas:
+            if operation == OP_AJOUT:
+                self._ajouter_vecteurs(embeddings, ids)
+            elif self.index is not None:
+                self._retirer_vecteurs(ids)
+    
+    def _rattraper_journal(self, fichier, tronquer: bool = False) -> int:
+        """
+        Applique les enregistrements du journal non encore vus par ce processus
+        (le fichier doit être verrouillé par l'appelant)
+        
+        Args:
+            fichier: Journal ouvert en lecture
+            tronquer: Supprimer une fin d'enregistrement incomplète (arrêt brutal d'un écrivain)
+            
+        Returns:
+            Nombre de modifications appliquées
+        """
+        fichier.seek(self._position_journal)
+        donnees = fichier.read()
+        deltas, longueur_valide = self._decoder_deltas(donnees)
+        self._appliquer_deltas(deltas)
+        
+        if tronquer and longueur_valide < len(donnees):
+            logger.warning(f"⚠️ Fin du journal {os.path.basename(fichier.name)} incomplète, ignorée")
+            fichier.truncate(self._position_journal + longueur_valide)
+        
+        self._position_journal += longueur_valide
+        self._nb_modifications_journalisees += sum(len(ids) for _, ids, _ in deltas)
+        return len(deltas)
+    
+    def _rejouer_journal(self) -> int:
+        """Rejoue le journal du snapshot en service depuis la position courante"""
+        chemin = self._chemin_journal(self.snapshot_courant)
+        if not os.path.exists(chemin):
+            return 0
+        with open(chemin, 'rb') as fichier:
+            self._verrouiller_fichier(fichier)
+            try:
+                return self._rattraper_journal(fichier)
+            finally:
+                self._verrouiller_fichier(fichier, deverrouiller=True)
+    
+    def _journaliser(self, operation: bytes, ids: List[str], embeddings: Optional[np.ndarray] = None):
+        """
+        Ajoute une modification (déjà appliquée en mémoire) au journal du snapshot
+        en service, avec fsync. Opération bloquante : exécuteur de calcul.
+        
+        Args:
+            operation: OP_AJOUT ou OP_SUPPRESSION
+            ids: IDs MongoDB concernés
+            embeddings: Embeddings normalisés (ajout uniquement)
+        """
+        enregistrement = self._encoder_delta(operation, ids, embeddings)
+        with self._verrou_sauvegarde:
+            while True:
+                if self.snapshot_courant is None:
+                    # Aucun snapshot de base (index neuf ou ancien format) : snapshot complet,
+                    # sauf si un autre processus vient d'en publier un (chargé à la place)
+                    if self._sauvegarder_index(si_a_jour=True):
+                        return
+                    if self.snapshot_courant is None:
+                        raise RuntimeError("Impossible de sauvegarder l'index")
+                    self._appliquer_deltas([(operation, ids, embeddings)])
+                    continue
                 
-                logger.info(f"💾 Index FAISS sauvegardé ({self.index.ntotal} vecteurs)")
+                with open(self._chemin_journal(self.snapshot_courant), 'ab+') as journal:
+                    self._verrouiller_fichier(journal, exclusif=True)
+                    try:
+                        if self._lire_pointeur() == self.snapshot_courant:
+                            # Modifications journalisées entre-temps par d'autres processus
+                            self._rattraper_journal(journal, tronquer=True)
+                            journal.write(enregistrement)
+                            journal.flush()
+                            os.fsync(journal.fileno())
+                            self._position_journal = journal.tell()
+                            self._nb_modifications_journalisees += len(ids)
+                            return
+                    finally:
+                        self._verrouiller_fichier(journal, deverrouiller=True)
                 
+                # Un autre processus a publié un snapshot (qui intègre l'ancien journal) :
+                # le charger, réappliquer la modification puis la journaliser sur ce snapshot
+                if not self.charger_index():
+                    raise RuntimeError("Impossible de charger le nouveau snapshot de l'index")
+                self._appliquer_deltas([(operation, ids, embeddings)])
+    
+    def _publier_snapshot_differe(self):
+        """
+        Écrit le snapshot des modifications journalisées ; si un autre processus en a
+        publié un plus récent (vérifié sous le verrou de publication), celui-ci intègre
+        déjà notre journal et il est simplement chargé
+        """
+        with self._verrou_sauvegarde:
+            if self._nb_modifications_journalisees == 0:
+                return
+            self._sauvegarder_index(si_a_jour=True)
+    
+    async def _persister_modification(
+        self,
+        operation: bytes,
+        ids: List[str],
+        embeddings: Optional[np.ndarray] = None
+    ):
+        """
+        Persiste une modification de l'index : ajout au journal, puis snapshot complet
+        après FAISS_SNAPSHOT_APRES_N_MODIFICATIONS vecteurs ou FAISS_SNAPSHOT_APRES_SECONDES.
+        Sans persistance différée, le snapshot est publié aussitôt ; la modification passe
+        tout de même par le journal, qui la reporte sur un snapshot publié entre-temps
+        
+        Args:
+            operation: OP_AJOUT ou OP_SUPPRESSION
+            ids: IDs MongoDB concernés
+            embeddings: Embeddings normalisés (ajout uniquement)
+        """
+        await executer_calcul(self._journaliser, operation, ids, embeddings, nom="faiss_journal")
+        
+        if not self.persistance_differee or (
+            self._nb_modifications_journalisees >= self.snapshot_apres_n_modifications
+        ):
+            await executer_calcul(self._publier_snapshot_differe, nom="faiss_sauvegarde")
+        elif self._nb_modifications_journalisees and (
+            self._tache_snapshot_differe is None or self._tache_snapshot_differe.done()
+        ):
+            self._tache_snapshot_differe = asyncio.create_task(self._snapshot_apres_delai())
+    
+    async def _snapshot_apres_delai(self):
+        """Écrit le snapshot différé à l'échéance du délai"""
+        await asyncio.sleep(self.snapshot_apres_secondes)
+        try:
+            await executer_calcul(self._publier_snapshot_differe, nom="faiss_sauvegarde")
         except Exception as e:
-            logger.error(f"❌ Erreur sauvegarde index: {e}")
+            logger.error(f"❌ Erreur snapshot différé de l'index: {e}")
+    
+    def demarrer_surveillance_disque(self):
+        """
+        Démarre la tâche qui recharge périodiquement l'index publié par d'autres processus,
+        pour que toutes les routes (et pas seulement le workflow) servent un index à jour
+        """
+        if self.intervalle_rechargement <= 0 or (
+            self._tache_rechargement is not None and not self._tache_rechargement.done()
+        ):
+            return
+        self._tache_rechargement = asyncio.create_task(self._surveiller_disque())
+        logger.info(f"👀 Surveillance de l'index FAISS sur disque (toutes les {self.intervalle_rechargement:.0f}s)")
+    
+    async def _surveiller_disque(self):
+        """Boucle de rechargement : une erreur est journalisée sans arrêter la surveillance"""
+        while True:
+            await asyncio.sleep(self.intervalle_rechargement)
+            try:
+                await executer_calcul(self.recharger_si_modifie_sur_disque, nom="faiss_rechargement")
+            except Exception as e:
+                logger.error(f"❌ Erreur rechargement de l'index FAISS: {e}")
+    
+    async def arreter_surveillance_disque(self):
+        """Arrête la tâche de rechargement périodique"""
+        if self._tache_rechargement is not None:
+            self._tache_rechargement.cancel()
+            await asyncio.gather(self._tache_rechargement, return_exceptions=True)
+            self._tache_rechargement = None
+    
+    async def persister_index_en_attente(self):
+        """Écrit un snapshot des modifications journalisées (appelé à l'arrêt du processus)"""
+        if self._tache_snapshot_differe is not None and not self._tache_snapshot_differe.done():
+            self._tache_snapshot_differe.cancel()
+        if self._nb_modifications_journalisees:
+            await executer_calcul(self._publier_snapshot_differe, nom="faiss_sauvegarde")
+    
+    @staticmethod
+    def _ecrire_fichier_synchronise(chemin: str, ecrire):
+        """Écrit un fichier puis force son contenu sur disque (fsync)"""
+        with open(chemin, 'wb') as f:
+            ecrire(f)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    @staticmethod
+    def _synchroniser_dossier(chemin: str):
+        """Force sur disque les entrées d'un dossier (création, renommage)"""
+        fd = os.open(chemin, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def _versions_snapshots(self) -> List[str]:
+        """Versions des snapshots complets présents sur disque, de la plus ancienne à la plus récente"""
+        if not os.path.isdir(self.dossier_snapshots):
+            return []
+        return sorted(
+            nom for nom in os.listdir(self.dossier_snapshots)
+            if nom.startswith("v") and os.path.isfile(os.path.join(self.dossier_snapshots, nom, "manifest.json"))
+        )
+    
+    def _ecrire_snapshot(self, donnees_index: np.ndarray, table: np.ndarray, manifeste: Dict) -> str:
+        """
+        Écrit un snapshot de façon atomique : fichiers écrits et synchronisés dans un
+        dossier temporaire, renommé en version définitive, puis pointeur COURANT remplacé.
+        Un arrêt brutal laisse au pire un dossier temporaire ignoré au chargement.
+        
+        Args:
+            donnees_index: Index sérialisé (faiss.serialize_index)
+            table: Table des IDs
+            manifeste: Description du snapshot
+            
+        Returns:
+            Version du snapshot écrit (ex: v000042)
+        """
+        os.makedirs(self.dossier_snapshots, exist_ok=True)
+        dossier_temporaire = os.path.join(self.dossier_snapshots, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(dossier_temporaire)
+        
+        try:
+            self._ecrire_fichier_synchronise(
+                os.path.join(dossier_temporaire, "index.faiss"), donnees_index.tofile
+            )
+            self._ecrire_fichier_synchronise(
+                os.path.join(dossier_temporaire, "ids.npy"), lambda f: np.save(f, table)
+            )
+            
+            # Le manifeste est écrit en dernier : sa présence marque un snapshot complet
+            self._ecrire_fichier_synchronise(
+                os.path.join(dossier_temporaire, "manifest.json"),
+                lambda f: f.write(json.dumps(manifeste, indent=2).encode("utf-8"))
+            )
+            self._synchroniser_dossier(dossier_temporaire)
+            
+            # Numéro suivant ; un autre processus peut prendre le même entre-temps (renommage refusé)
+            while True:
+                versions = self._versions_snapshots()
+                numero = int(versions[-1][1:]) + 1 if versions else 1
+                version = f"v{numero:06d}"
+                try:
+                    os.rename(dossier_temporaire, os.path.join(self.dossier_snapshots, version))
+                    break
+                except OSError:
+                    if not os.path.exists(os.path.join(self.dossier_snapshots, version)):
+                        raise
+        except Exception:
+            shutil.rmtree(dossier_temporaire, ignore_errors=True)
+            raise
+        
+        self._ecrire_pointeur(version)
+        return version
+    
+    def _ecrire_pointeur(self, version: str):
+        """Remplace atomiquement le pointeur vers le snapshot en service"""
+        pointeur = os.path.join(self.dossier_snapshots, "COURANT")
+        self._ecrire_fichier_synchronise(f"{pointeur}.tmp", lambda f: f.write(version.encode("utf-8")))
+        os.replace(f"{pointeur}.tmp", pointeur)
+        self._synchroniser_dossier(self.dossier_snapshots)
+    
+    def _lire_pointeur(self) -> Optional[str]:
+        """Version du snapshot en service d'après le pointeur COURANT (None si absent)"""
+        try:
+            with open(os.path.join(self.dossier_snapshots, "COURANT")) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+    
+    def _purger_snapshots(self):
+        """Supprime les snapshots au-delà des FAISS_SNAPSHOTS_CONSERVES plus récents"""
+        versions = self._versions_snapshots()
+        courant = self._lire_pointeur()
+        for version in versions[:-self.nb_snapshots_conserves]:
+            if version != courant:
+                # Les processus qui projettent encore ces fichiers (mmap) gardent leur inode
+                shutil.rmtree(os.path.join(self.dossier_snapshots, version), ignore_errors=True)
+        
+        for nom in os.listdir(self.dossier_snapshots):
+            chemin = os.path.join(self.dossier_snapshots, nom)
+            # Dossiers temporaires abandonnés par un arrêt brutal (plus d'une heure)
+            if nom.startswith(".tmp-") and time.time() - os.path.getmtime(chemin) > 3600:
+                shutil.rmtree(chemin, ignore_errors=True)
+            # Journaux d'anciens snapshots (intégrés au snapshot suivant)
+            elif nom.startswith("deltas-") and nom != f"deltas-{courant}.log":
+                os.remove(chemin)
+    
+    def _charger_snapshot(self, version: str) -> bool:
+        """
+        Charge un snapshot et le met en service par échange de référence
+        
+        Args:
+            version: Version du snapshot
+            
+        Returns:
+            True si le snapshot est complet et cohérent avec son manifeste
+        """
+        dossier = os.path.join(self.dossier_snapshots, version)
+        with open(os.path.join(dossier, "manifest.json")) as f:
+            manifeste = json.load(f)
+        
+        index, lecture_seule = self._lire_index(os.path.join(dossier, "index.faiss"))
+        table = np.load(os.path.join(dossier, "ids.npy"))
+        if index.ntotal != manifeste["nb_vecteurs"] or len(table) != manifeste["nb_ids"]:
+            logger.error(f"❌ Snapshot {version} incohérent avec son manifeste")
+            return False
+        
+        ids_ressources = {
+            int(id_vecteur): oid.tobytes().hex()
+            for id_vecteur, oid in zip(table["id"], table["oid"])
+        }
+        
+        self.rappel_index = manifeste.get("rappel")
+        with self._verrou_sauvegarde:
+            self._remplacer_index(index, ids_ressources, lecture_seule)
+            self.snapshot_courant = version
+            self._position_journal = 0
+            self._nb_modifications_journalisees = 0
+            
+            # Reprise : rejouer les modifications journalisées depuis ce snapshot
+            nb_deltas = self._rejouer_journal()
+        self._incrementer_generation()
+        
+        logger.info(
+            f"✅ Index FAISS chargé depuis le snapshot {version} ({self.index.ntotal} vecteurs"
+            f"{', mmap' if self.index_en_lecture_seule else ''}, {nb_deltas} modifications rejouées)"
+        )
+        return True
     
     def charger_index(self) -> bool:
         """
-        Charge l'index FAISS depuis le disque
+        Charge l'index FAISS depuis le snapshot en service (pointeur COURANT).
+        Si ce snapshot est illisible, les snapshots précédents sont essayés.
+        
+        Returns:
+            True si le chargement a réussi, False sinon
+        """
+        courant = self._lire_pointeur()
+        if courant is None:
+            return self._charger_ancien_format()
+        
+        versions = [v for v in self._versions_snapshots() if v <= courant]
+        for version in reversed(versions):
+            try:
+                if self._charger_snapshot(version):
+                    if version != courant:
+                        logger.warning(f"⚠️ Snapshot {courant} inutilisable, retour au snapshot {version}")
+                    return True
+            except Exception as e:
+                logger.error(f"❌ Erreur chargement snapshot {version}: {e}")
+        
+        logger.error("❌ Aucun snapshot de l'index FAISS utilisable")
+        return False
+    
+    def _charger_ancien_format(self) -> bool:
+        """
+        Charge un index sauvegardé avant les snapshots versionnés (fichiers
+        .index/.ids.npy à côté de FAISS_INDEX_PATH) ; la prochaine sauvegarde
+        le migre vers un snapshot
         
         Returns:
             True si le chargement a réussi, False sinon
         """
         try:
             index_file = f"{self.index_path}.index"
-            ids_file = f"{self.index_path}.ids"
+            ids_file = f"{self.index_path}.ids.npy"
             
             if not os.path.exists(index_file) or not os.path.exists(ids_file):
-                logger.info("ℹ️ Aucun index sauvegardé trouvé")
+                if os.path.exists(f"{self.index_path}.ids"):
+                    # Index positionnel avec liste d'IDs picklée : reconstruction avec IDs stables
+                    logger.info("ℹ️ Index sauvegardé à l'ancien format (IDs positionnels), reconstruction nécessaire")
+                else:
+                    logger.info("ℹ️ Aucun index sauvegardé trouvé")
                 return False
             
-            # Charger l'index FAISS
-            self.index = faiss.read_index(index_file)
+            index, lecture_seule = self._lire_index(index_file)
+            table = np.load(ids_file)
+            ids_ressources = {
+                int(id_vecteur): oid.tobytes().hex()
+                for id_vecteur, oid in zip(table["id"], table["oid"])
+            }
+            
+            meta_file = f"{self.index_path}.meta.json"
+            if os.path.exists(meta_file):
+                with open(meta_file) as f:
+                    self.rappel_index = json.load(f).get("rappel")
             
-            # Charger les IDs
-            with open(ids_file, 'rb') as f:
-                self.resource_ids = pickle.load(f)
+            self._remplacer_index(index, ids_ressources, lecture_seule)
+            self._incrementer_generation()
             
-            logger.info(f"✅ Index FAISS chargé ({self.index.ntotal} vecteurs)")
+            logger.info(f"✅ Index FAISS chargé ({self.index.ntotal} vecteurs, format sans snapshot)")
             return True
             
         except Exception as e:
             logger.error(f"❌ Erreur chargement index: {e}")
             return False
     
+    def lister_snapshots(self) -> List[Dict]:
+        """
+        Liste les snapshots conservés sur disque
+        
+        Returns:
+            Manifestes des snapshots (du plus récent au plus ancien), avec le snapshot en service marqué
+        """
+        courant = self._lire_pointeur()
+        snapshots = []
+        for version in reversed(self._versions_snapshots()):
+            try:
+                with open(os.path.join(self.dossier_snapshots, version, "manifest.json")) as f:
+                    manifeste = json.load(f)
+            except (OSError, ValueError):
+                continue
+            snapshots.append({
+                "version": version,
+                "en_service": version == courant,
+                **manifeste
+            })
+        return snapshots
+    
+    async def restaurer_snapshot(self, version: Optional[str] = None) -> Dict:
+        """
+        Revient à un snapshot précédent : il est chargé puis désigné comme
+        snapshot en service (les autres processus le rechargent à leur tour)
+        
+        Args:
+            version: Version à restaurer (défaut : celle qui précède le snapshot en service)
+            
+        Returns:
+            Dictionnaire avec le résultat de la restauration
+        """
+        versions = self._versions_snapshots()
+        courant = self._lire_pointeur()
+        
+        if version is None:
+            precedentes = [v for v in versions if courant is not None and v < courant]
+            if not precedentes:
+                return {"status": "error", "message": "Aucun snapshot précédent à restaurer"}
+            version = precedentes[-1]
+        elif version not in versions:
+            return {"status": "error", "message": f"Snapshot {version} introuvable"}
+        
+        try:
+            if not await executer_calcul(self._restaurer_snapshot, version, nom="faiss_chargement"):
+                return {"status": "error", "message": f"Snapshot {version} incohérent"}
+        except Exception as e:
+            logger.error(f"❌ Erreur restauration snapshot {version}: {e}")
+            return {"status": "error", "message": str(e)}
+        
+        logger.info(f"⏪ Index FAISS restauré au snapshot {version} (précédemment {courant})")
+        return {
+            "status": "success",
+            "version": version,
+            "version_precedente": courant,
+            "nb_vecteurs": self.index.ntotal,
+            "generation": self.generation
+        }
+    
+    def _restaurer_snapshot(self, version: str) -> bool:
+        """Charge un snapshot puis le désigne en service, sous le verrou de publication"""
+        with self._verrou_sauvegarde, self._verrou_publication():
+            if not self._charger_snapshot(version):
+                return False
+            self._ecrire_pointeur(version)
+            return True
+    
+    def _lire_index(self, index_file: str) -> Tuple[faiss.Index, bool]:
+        """
+        Lit un index FAISS, par projection mémoire (IO_FLAG_MMAP) si activée.
+        FAISS ne projette que les listes inversées des index IVF : les index
+        Flat et HNSW sont lus entièrement en mémoire.
+        
+        Args:
+            index_file: Chemin du fichier d'index
+            
+        Returns:
+            Tuple (index, True si projeté en lecture seule)
+        """
+        if self.index_mmap:
+            try:
+                index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP)
+                if isinstance(self._index_base(index), faiss.IndexIVF):
+                    return index, True
+                logger.info(f"ℹ️ mmap non supporté pour un index {self._type_index(index)}, chargement complet")
+                return index, False
+            except RuntimeError as e:
+                logger.warning(f"⚠️ Projection mémoire de l'index impossible, chargement complet: {e}")
+        return faiss.read_index(index_file), False
+    
+    def recharger_si_modifie_sur_disque(self) -> bool:
+        """
+        Recharge l'index si un autre processus (ex: worker de crawl) a publié un
+        snapshot depuis la dernière lecture ou écriture de ce processus, ou
+        applique les modifications qu'il a ajoutées au journal du snapshot en service
+        
+        Returns:
+            True si l'index a été rechargé
+        """
+        courant = self._lire_pointeur()
+        if courant is None:
+            return False
+        
+        if courant != self.snapshot_courant:
+            logger.info(f"🔁 Nouveau snapshot {courant} de l'index FAISS sur disque, rechargement...")
+            return self.charger_index()
+        
+        # Même snapshot : appliquer les modifications journalisées par d'autres processus
+        try:
+            taille_journal = os.path.getsize(self._chemin_journal(courant))
+        except OSError:
+            return False
+        if taille_journal <= self._position_journal:
+            return False
+        
+        with self._verrou_sauvegarde:
+            nb_deltas = self._rejouer_journal()
+        if nb_deltas:
+            self._incrementer_generation()
+            logger.info(f"🔁 {nb_deltas} modifications du journal appliquées à l'index (génération {self.generation})")
+        return nb_deltas > 0
+    
     def obtenir_statistiques_index(self) -> Dict:
         """
         Retourne les statistiques de l'index FAISS
@@ -466,15 +1592,28 @@ class NLPService:
             return {
                 "index_existe": False,
                 "nb_vecteurs": 0,
-                "dimension": self.embedding_dimension
+                "dimension": self.embedding_dimension,
+                "generation": self.generation
             }
         
         return {
             "index_existe": True,
             "nb_vecteurs": self.index.ntotal,
             "dimension": self.embedding_dimension,
-            "type_index": "IndexFlatIP (Inner Product)",
-            "nb_resource_ids": len(self.resource_ids)
+            "type_index": self._type_index(self.index),
+            "type_index_demande": self.type_index_demande,
+            "metrique": "inner_product",
+            "nprobe": self.nprobe,
+            "ef_search": self.ef_search,
+            "rappel": self.rappel_index,
+            "nb_resource_ids": len(self.ids_ressources),
+            "nb_vecteurs_orphelins": max(0, self.index.ntotal - len(self.ids_ressources)),
+            "mmap": self.index_en_lecture_seule,
+            "snapshot": self.snapshot_courant,
+            "persistance_differee": self.persistance_differee,
+            "modifications_journalisees": self._nb_modifications_journalisees,
+            "generation": self.generation,
+            "date_derniere_modification": self.date_derniere_modification.isoformat() if self.date_derniere_modification else None
         }
 
 
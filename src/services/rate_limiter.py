@@ -0,0 +1,177 @@
+"""
+Limiteur de débit par hôte (token bucket) partagé par toutes les collectes.
+Chaque hôte (fr.wikipedia.org, en.wikipedia.org, api.github.com, www.googleapis.com...)
+possède son propre seau de jetons, configurable par variables d'environnement,
+et ajusté dynamiquement à partir des en-têtes Retry-After et X-RateLimit-*.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Profils par défaut (débit en requêtes/seconde, rafale en nombre de requêtes)
+# GitHub Search API non authentifiée : 10 requêtes par minute
+PROFILS_PAR_DEFAUT: Dict[str, Tuple[float, int]] = {
+    "wikipedia": (5.0, 10),
+    "github": (10 / 60, 10),
+    "youtube": (5.0, 10),
+    "defaut": (2.0, 5),
+}
+
+
+class TokenBucket:
+    """Seau de jetons asynchrone pour un hôte donné"""
+
+    def __init__(self, hote: str, debit: float, rafale: int):
+        """
+        Initialise le seau de jetons
+
+        Args:
+            hote: Hôte limité
+            debit: Nombre de jetons régénérés par seconde
+            rafale: Nombre maximal de jetons accumulables
+        """
+        self.hote = hote
+        self.debit = debit
+        self.rafale = rafale
+        self.jetons = float(rafale)
+        self.dernier_remplissage = time.monotonic()
+        self.suspendu_jusqua = 0.0  # Horloge monotone
+        self._verrou = asyncio.Lock()
+
+    def _remplir(self, maintenant: float):
+        """Régénère les jetons écoulés depuis le dernier remplissage"""
+        ecoule = maintenant - self.dernier_remplissage
+        self.jetons = min(self.rafale, self.jetons + ecoule * self.debit)
+        self.dernier_remplissage = maintenant
+
+    async def acquerir(self):
+        """Attend (sans bloquer la boucle) qu'un jeton soit disponible puis le consomme"""
+        # Le verrou garantit un ordre FIFO entre les collectes concurrentes
+        async with self._verrou:
+            while True:
+                maintenant = time.monotonic()
+
+                if maintenant < self.suspendu_jusqua:
+                    await asyncio.sleep(self.suspendu_jusqua - maintenant)
+                    continue
+
+                self._remplir(maintenant)
+                if self.jetons >= 1:
+                    self.jetons -= 1
+                    return
+
+                await asyncio.sleep((1 - self.jetons) / self.debit)
+
+    def suspendre(self, secondes: float):
+        """
+        Suspend l'hôte pendant une durée donnée (Retry-After, quota épuisé)
+
+        Args:
+            secondes: Durée de suspension
+        """
+        if secondes <= 0:
+            return
+        fin = time.monotonic() + secondes
+        if fin > self.suspendu_jusqua:
+            self.suspendu_jusqua = fin
+            self.jetons = 0
+            logger.warning(f"⏸️  {self.hote} suspendu pendant {secondes:.1f}s")
+
+    def appliquer_quota(self, restant: int, reinitialisation_epoch: float):
+        """
+        Aligne le seau sur le quota annoncé par le serveur (en-têtes X-RateLimit-*)
+
+        Args:
+            restant: Nombre de requêtes restantes dans la fenêtre
+            reinitialisation_epoch: Timestamp Unix de réinitialisation de la fenêtre
+        """
+        if restant <= 0:
+            self.suspendre(reinitialisation_epoch - time.time())
+        else:
+            self.jetons = min(self.jetons, float(restant))
+
+    def statistiques(self) -> Dict:
+        """Retourne l'état courant du seau"""
+        return {
+            "hote": self.hote,
+            "debit": self.debit,
+            "rafale": self.rafale,
+            "jetons": round(self.jetons, 2),
+            "suspendu_secondes": round(max(0.0, self.suspendu_jusqua - time.monotonic()), 1)
+        }
+
+
+def _profil_hote(hote: str) -> str:
+    """Associe un hôte à son profil de limitation"""
+    if hote.endswith("wikipedia.org"):
+        return "wikipedia"
+    if hote == "api.github.com":
+        return "github"
+    if hote.endswith("googleapis.com"):
+        return "youtube"
+    return "defaut"
+
+
+def _configuration_profil(profil: str) -> Tuple[float, int]:
+    """Lit le débit et la rafale d'un profil (RATE_LIMIT_<PROFIL>_DEBIT / _RAFALE)"""
+    debit_defaut, rafale_defaut = PROFILS_PAR_DEFAUT[profil]
+    prefixe = f"RATE_LIMIT_{profil.upper()}"
+    debit = float(os.getenv(f"{prefixe}_DEBIT", debit_defaut))
+    rafale = int(os.getenv(f"{prefixe}_RAFALE", rafale_defaut))
+    return debit, rafale
+
+
+# Un seau par hôte, partagé par toutes les collectes du processus
+_seaux_par_hote: Dict[str, TokenBucket] = {}
+
+
+def get_rate_limiter(hote: str) -> TokenBucket:
+    """
+    Obtenir le limiteur partagé d'un hôte
+
+    Args:
+        hote: Nom d'hôte (ex: fr.wikipedia.org)
+
+    Returns:
+        TokenBucket de l'hôte
+    """
+    seau = _seaux_par_hote.get(hote)
+    if seau is None:
+        debit, rafale = _configuration_profil(_profil_hote(hote))
+        seau = TokenBucket(hote, debit, rafale)
+        _seaux_par_hote[hote] = seau
+    return seau
+
+
+def lire_retry_after(valeur: Optional[str]) -> Optional[float]:
+    """
+    Convertit un en-tête Retry-After (secondes ou date HTTP) en secondes
+
+    Args:
+        valeur: Valeur brute de l'en-tête
+
+    Returns:
+        Nombre de secondes à attendre ou None
+    """
+    if not valeur:
+        return None
+    try:
+        return max(0.0, float(valeur))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valeur).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def obtenir_statistiques_limiteurs() -> Dict:
+    """Retourne l'état de tous les limiteurs actifs"""
+    return {hote: seau.statistiques() for hote, seau in _seaux_par_hote.items()}
@@ -3,6 +3,8 @@ Service de Re-ranking avec Cross-Encoder pour affiner le classement des résulta
 Ce service utilise un modèle BERT cross-encoder qui peut être fine-tuné sur les feedbacks utilisateurs.
 """
 
+import asyncio
+import hashlib
 import logging
 import pickle
 import os
@@ -10,11 +12,14 @@ import time
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 import numpy as np
-import pymongo
 from datetime import datetime
+from bson import ObjectId
 from sentence_transformers import CrossEncoder
 import torch
 
+from src.database import db
+from src.services.compute_executor import executer_calcul
+from src.services.micro_batcher import MicroBatcher, enregistrer_batcher
 from src.models.reranking_model import (
     UserFeedbackModel,
     TrainingPairModel,
@@ -54,29 +59,79 @@ class RerankingService:
         # Créer le dossier pour le modèle s'il n'existe pas
         Path(model_path).mkdir(parents=True, exist_ok=True)
         
+        # Surveillance du dossier du modèle fine-tuné (rechargement uniquement si modifié)
+        self.cross_encoder = None
+        self.signature_modele = None
+        self.intervalle_verification_modele = float(os.getenv("CROSS_ENCODER_VERIFICATION_SECONDES", "30"))
+        self._derniere_verification_modele = time.monotonic()
+        self._rechargement_en_cours = False
+        
+        # Micro-batching du scoring entre requêtes concurrentes (un batcher par modèle chargé)
+        self.taille_lot_cross_encoder = int(os.getenv("CROSS_ENCODER_MICRO_BATCH_TAILLE", "32"))
+        self.attente_lot_cross_encoder_ms = float(os.getenv("CROSS_ENCODER_MICRO_BATCH_ATTENTE_MS", "10"))
+        self.batcher_cross_encoder = None
+        
+        # Écriture différée (write-behind) des inférences
+        self.inference_write_behind = os.getenv("INFERENCE_WRITE_BEHIND", "False") == "True"
+        self._ecritures_en_attente = set()
+        
         # Charger le cross-encoder
         self._charger_modele()
+    
+    def _calculer_signature_modele(self) -> Tuple[Optional[str], float]:
+        """
+        Calcule une signature du dossier du modèle fine-tuné à partir
+        du nom, de la taille et de la date de modification de chaque fichier
+        
+        Returns:
+            Tuple (signature ou None si aucun modèle fine-tuné, date de la dernière modification)
+        """
+        if not os.path.exists(os.path.join(self.model_path, "config.json")):
+            return None, 0.0
+        
+        empreinte = hashlib.sha1()
+        derniere_modification = 0.0
+        for racine, _, fichiers in os.walk(self.model_path):
+            for nom in sorted(fichiers):
+                chemin = os.path.join(racine, nom)
+                stat = os.stat(chemin)
+                empreinte.update(f"{os.path.relpath(chemin, self.model_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+                derniere_modification = max(derniere_modification, stat.st_mtime)
+        return empreinte.hexdigest(), derniere_modification
         
     def _charger_modele(self):
-        """Charge le modèle cross-encoder (fine-tuné ou de base)"""
+        """
+        Charge le modèle cross-encoder (fine-tuné ou de base).
+        Le nouveau modèle est entièrement construit avant de remplacer l'ancien
+        (échange atomique de référence) : les requêtes en cours ne sont pas affectées.
+        """
         try:
-            # Vérifier si un modèle fine-tuné existe
-            config_file = os.path.join(self.model_path, "config.json")
+            signature, _ = self._calculer_signature_modele()
             
-            if os.path.exists(config_file):
+            if signature is not None:
                 # Charger le modèle fine-tuné
                 logger.info(f"📥 Chargement du modèle fine-tuné depuis {self.model_path}...")
-                self.cross_encoder = CrossEncoder(self.model_path)
+                nouveau_modele = CrossEncoder(self.model_path)
                 logger.info("✅ Modèle fine-tuné chargé avec succès")
             else:
                 # Charger le modèle de base depuis HuggingFace
                 logger.info(f"📥 Aucun modèle fine-tuné trouvé dans {self.model_path}")
                 logger.info(f"📥 Chargement du modèle de base {self.base_model_name}...")
-                self.cross_encoder = CrossEncoder(self.base_model_name)
+                nouveau_modele = CrossEncoder(self.base_model_name)
                 logger.info("✅ Modèle de base chargé avec succès")
                 logger.info("💡 Pour utiliser un modèle fine-tuné, exécutez le notebook: notebooks/fine_tune_cross_encoder.ipynb")
+            
+            # Le batcher est lié au modèle : les lots en cours sur l'ancien modèle se terminent normalement
+            self.batcher_cross_encoder = self._creer_batcher(nouveau_modele)
+            self.cross_encoder = nouveau_modele
+            self.signature_modele = signature
                 
         except Exception as e:
+            if self.cross_encoder is not None:
+                # Un modèle est déjà en service : le conserver plutôt que de passer en mode dégradé
+                logger.error(f"❌ Erreur rechargement modèle, conservation du modèle courant: {e}")
+                return
+
             logger.error(f"❌ Erreur chargement modèle: {e}")
             logger.warning("⚠️  Le modèle cross-encoder n'a pas pu être chargé.")
             logger.warning("⚠️  Le service fonctionnera en mode dégradé (sans re-ranking).")
@@ -87,6 +142,63 @@ class RerankingService:
             logger.warning("    4. Consulter TROUBLESHOOTING.md pour plus de solutions")
             self.cross_encoder = None  # Mode dégradé
     
+    def _creer_batcher(self, modele: CrossEncoder) -> MicroBatcher:
+        """
+        Crée le micro-batcher de scoring d'un modèle cross-encoder.
+        Les paires des requêtes concurrentes sont regroupées en lots de taille fixe,
+        triées par longueur (approximation du nombre de tokens) pour limiter le padding.
+        
+        Args:
+            modele: Cross-encoder chargé
+            
+        Returns:
+            MicroBatcher produisant un score par paire (question, document)
+        """
+        taille_lot = self.taille_lot_cross_encoder
+        batcher = MicroBatcher(
+            nom="cross_encoder",
+            fonction_lot=lambda paires: [
+                float(score) for score in modele.predict(paires, batch_size=taille_lot, show_progress_bar=False)
+            ],
+            taille_max_lot=taille_lot,
+            attente_max_ms=self.attente_lot_cross_encoder_ms,
+            cle_tri=lambda paire: len(paire[0]) + len(paire[1])
+        )
+        enregistrer_batcher("cross_encoder", batcher)
+        return batcher
+    
+    async def _verifier_mise_a_jour_modele(self):
+        """
+        Recharge le cross-encoder uniquement si le dossier du modèle fine-tuné a changé.
+        La vérification (stat des fichiers) est limitée à une fois par intervalle
+        et le rechargement s'effectue dans un thread, sans bloquer les requêtes.
+        """
+        maintenant = time.monotonic()
+        if self._rechargement_en_cours or maintenant - self._derniere_verification_modele < self.intervalle_verification_modele:
+            return
+        self._derniere_verification_modele = maintenant
+        
+        try:
+            signature, derniere_modification = self._calculer_signature_modele()
+        except OSError as e:
+            # Fichiers en cours de remplacement : nouvelle tentative au prochain intervalle
+            logger.warning(f"⚠️  Lecture du dossier du modèle impossible: {e}")
+            return
+        if signature == self.signature_modele:
+            return
+        
+        # Attendre que l'écriture du nouveau modèle soit terminée (dossier stable)
+        if signature is not None and time.time() - derniere_modification < 5:
+            logger.info("⏳ Modèle fine-tuné en cours d'écriture, rechargement différé")
+            return
+        
+        logger.info("🔄 Modification du modèle fine-tuné détectée, rechargement...")
+        self._rechargement_en_cours = True
+        try:
+            await executer_calcul(self._charger_modele, nom="rechargement_cross_encoder")
+        finally:
+            self._rechargement_en_cours = False
+    
     async def reranker_resultats(
         self,
         question: str,
@@ -107,6 +219,8 @@ class RerankingService:
         if not resultats_faiss:
             return []
         
+        await self._verifier_mise_a_jour_modele()
+        
         # Mode dégradé : si le modèle n'est pas chargé, retourner les résultats FAISS sans re-ranking
         if self.cross_encoder is None:
             logger.warning("⚠️  Cross-encoder non disponible, retour des résultats FAISS sans re-ranking")
@@ -121,8 +235,9 @@ class RerankingService:
         
         try:
             logger.info(f"🔄 Re-ranking de {len(resultats_faiss)} résultats avec cross-encoder...")
-
-            self._charger_modele()
+            
+            # Référence locale : un rechargement concurrent n'affecte pas ce scoring
+            batcher = self.batcher_cross_encoder
             
             # Préparer les paires (question, document)
             paires = []
@@ -131,8 +246,8 @@ class RerankingService:
                 doc_text = self._creer_texte_document(res)
                 paires.append([question, doc_text])
             
-            # Prédire les scores avec le cross-encoder
-            scores = self.cross_encoder.predict(paires, show_progress_bar=False)
+            # Prédire les scores avec le cross-encoder (lots partagés avec les requêtes concurrentes)
+            scores = await batcher.soumettre_lot(paires)
             
             # Ajouter les scores aux résultats
             for i, res in enumerate(resultats_faiss):
@@ -243,9 +358,7 @@ class RerankingService:
             Dictionnaire avec le statut
         """
         try:
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            inference_col = db[self.inference_collection]
+            inference_col = db.get_collection(self.inference_collection, self.mongodb_db)
             
             # Créer l'inférence
             inference = {
@@ -262,9 +375,7 @@ class RerankingService:
             }
             
             # Sauvegarder dans MongoDB
-            result = inference_col.insert_one(inference)
-            
-            client.close()
+            result = await inference_col.insert_one(inference)
             
             logger.debug(f"💾 Inférence sauvegardée: rank {rank} pour requête {user_query_id}")
             
@@ -280,6 +391,99 @@ class RerankingService:
                 "message": str(e)
             }
     
+    async def sauvegarder_inferences(
+        self,
+        user_query_id: str,
+        inferences: List[Dict],
+        session_id: Optional[str] = None,
+        write_behind: Optional[bool] = None
+    ) -> Dict:
+        """
+        Sauvegarde toutes les inférences d'une requête en un seul insert_many.
+        Les ObjectId sont générés côté client : les inference_id sont donc connus
+        avant l'acquittement de l'écriture.
+        
+        Args:
+            user_query_id: ID de la requête utilisateur
+            inferences: Liste de dictionnaires (resource_id, faiss_score,
+                reranking_score, final_score, rank), dans l'ordre du classement
+            session_id: ID de session optionnel
+            write_behind: Ne pas attendre l'écriture (défaut: INFERENCE_WRITE_BEHIND)
+            
+        Returns:
+            Dictionnaire avec le statut et la liste des inference_id (même ordre)
+        """
+        if not inferences:
+            return {"status": "success", "inference_ids": []}
+        
+        if write_behind is None:
+            write_behind = self.inference_write_behind
+        
+        date_inference = datetime.now()
+        documents = [
+            {
+                "_id": ObjectId(),
+                "user_query_id": user_query_id,
+                "resource_id": inference.get("resource_id"),
+                "faiss_score": inference.get("faiss_score"),
+                "reranking_score": inference.get("reranking_score"),
+                "final_score": inference.get("final_score"),
+                "rank": inference.get("rank"),
+                "feedback": None,  # Initialement à null
+                "date_inference": date_inference,
+                "session_id": session_id,
+                "metadata": {}
+            }
+            for inference in inferences
+        ]
+        inference_ids = [str(doc["_id"]) for doc in documents]
+        
+        if write_behind:
+            # La réponse HTTP part sans attendre l'acquittement MongoDB
+            tache = asyncio.create_task(self._inserer_inferences(documents, user_query_id))
+            self._ecritures_en_attente.add(tache)
+            tache.add_done_callback(self._ecritures_en_attente.discard)
+            return {
+                "status": "success",
+                "inference_ids": inference_ids,
+                "write_behind": True
+            }
+        
+        try:
+            await self._inserer_inferences(documents, user_query_id, lever_erreur=True)
+            return {
+                "status": "success",
+                "inference_ids": inference_ids,
+                "write_behind": False
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+    
+    async def _inserer_inferences(
+        self,
+        documents: List[Dict],
+        user_query_id: str,
+        lever_erreur: bool = False
+    ):
+        """Insère un lot d'inférences (insert_many non ordonné)"""
+        try:
+            inference_col = db.get_collection(self.inference_collection, self.mongodb_db)
+            await inference_col.insert_many(documents, ordered=False)
+            logger.debug(f"💾 {len(documents)} inférences sauvegardées pour requête {user_query_id}")
+        except Exception as e:
+            logger.error(f"❌ Erreur sauvegarde des inférences ({len(documents)}) pour requête {user_query_id}: {e}")
+            if lever_erreur:
+                raise
+    
+    async def attendre_ecritures_en_attente(self):
+        """Attend la fin des écritures d'inférences différées (appelé à l'arrêt)"""
+        if self._ecritures_en_attente:
+            logger.info(f"⏳ Attente de {len(self._ecritures_en_attente)} écritures d'inférences différées...")
+            await asyncio.gather(*self._ecritures_en_attente, return_exceptions=True)
+    
     async def sauvegarder_feedback(
         self,
         inference_id: str,
@@ -298,23 +502,20 @@ class RerankingService:
         try:
             from bson import ObjectId
             
-            # Se connecter à MongoDB
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            inference_col = db[self.inference_collection]
+            # Collection MongoDB (client partagé)
+            inference_col = db.get_collection(self.inference_collection, self.mongodb_db)
             
             # Vérifier que l'inférence existe
-            inference = inference_col.find_one({"_id": ObjectId(inference_id)})
+            inference = await inference_col.find_one({"_id": ObjectId(inference_id)})
             
             if not inference:
-                client.close()
                 return {
                     "status": "error",
                     "message": f"Inférence {inference_id} introuvable"
                 }
             
             # Mettre à jour le feedback dans l'inférence
-            result = inference_col.update_one(
+            result = await inference_col.update_one(
                 {"_id": ObjectId(inference_id)},
                 {
                     "$set": {
@@ -336,9 +537,7 @@ class RerankingService:
             #     "date_feedback": datetime.now(),
             #     "metadata": {}
             # }
-            # feedback_result = feedback_col.insert_one(feedback_doc)
-            
-            client.close()
+            # feedback_result = await feedback_col.insert_one(feedback_doc)
             
             if result.modified_count > 0:
                 logger.info(f"💾 Feedback '{feedback_type}' sauvegardé pour inférence {inference_id}")
@@ -369,16 +568,12 @@ class RerankingService:
             Liste de paires (query, document, label)
         """
         try:
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            feedback_col = db[self.feedback_collection]
+            feedback_col = db.get_collection(self.feedback_collection, self.mongodb_db)
             
             # Récupérer tous les feedbacks avec like/dislike
-            feedbacks = list(feedback_col.find({
+            feedbacks = await feedback_col.find({
                 "feedback_type": {"$in": ["like", "dislike"]}
-            }))
-            
-            client.close()
+            }).to_list(length=None)
             
             # Créer les paires d'entraînement
             training_pairs = []
@@ -447,16 +642,12 @@ class RerankingService:
             Statistiques des feedbacks
         """
         try:
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            feedback_col = db[self.feedback_collection]
+            feedback_col = db.get_collection(self.feedback_collection, self.mongodb_db)
             
             # Compter les feedbacks
-            total = feedback_col.count_documents({})
-            likes = feedback_col.count_documents({"feedback_type": "like"})
-            dislikes = feedback_col.count_documents({"feedback_type": "dislike"})
-            
-            client.close()
+            total = await feedback_col.count_documents({})
+            likes = await feedback_col.count_documents({"feedback_type": "like"})
+            dislikes = await feedback_col.count_documents({"feedback_type": "dislike"})
             
             # Charger les métadonnées du modèle
             metadata_path = os.path.join(self.model_path, "metadata.pkl")
@@ -491,7 +682,7 @@ class RerankingService:
                 nb_training_pairs=0
             )
     
-    def predict_score(self, query: str, document: str) -> float:
+    async def predict_score(self, query: str, document: str) -> float:
         """
         Prédit le score de pertinence pour une paire (query, document)
         
@@ -503,8 +694,7 @@ class RerankingService:
             Score de pertinence
         """
         try:
-            score = self.cross_encoder.predict([[query, document]])[0]
-            return float(score)
+            return await self.batcher_cross_encoder.soumettre([query, document])
         except Exception as e:
             logger.error(f"❌ Erreur prédiction: {e}")
             return 0.0
@@ -520,16 +710,12 @@ class RerankingService:
             Liste des inférences avec leurs scores et feedbacks
         """
         try:
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            inference_col = db[self.inference_collection]
+            inference_col = db.get_collection(self.inference_collection, self.mongodb_db)
             
             # Récupérer toutes les inférences pour cette requête
-            inferences = list(inference_col.find(
+            inferences = await inference_col.find(
                 {"user_query_id": user_query_id}
-            ).sort("rank", 1))  # Trier par rang croissant
-            
-            client.close()
+            ).sort("rank", 1).to_list(length=None)  # Trier par rang croissant
             
             # Convertir les ObjectId en string
             for inf in inferences:
@@ -573,3 +759,9 @@ def get_reranking_service(
             model_path
         )
     return _reranking_service_instance
+
+
+async def attendre_ecritures_inferences():
+    """Attend les écritures d'inférences différées si le service a été instancié"""
+    if _reranking_service_instance is not None:
+        await _reranking_service_instance.attendre_ecritures_en_attente()
@@ -4,12 +4,12 @@ Utilise le même modèle que le crawler pour générer les embeddings des questi
 """
 
 import logging
-import pymongo
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
-from sentence_transformers import SentenceTransformer
 
+from src.database import db
 from src.models.user_query_model import UserQueryModel, UserQueryResponseModel
+from src.services.micro_batcher import get_embedding_batcher
 
 logger = logging.getLogger(__name__)
 
@@ -22,26 +22,6 @@ class UserQueryServiceSimple:
         self.mongodb_url = mongodb_url
         self.mongodb_db = mongodb_db
         self.mongodb_collection = "users_queries"
-        
-        # Charger le modèle sentence-transformers (même que le crawler)
-        logger.info("📥 Chargement du modèle sentence-transformers pour les questions...")
-        self.embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-        logger.info("✅ Modèle sentence-transformers chargé (384 dimensions)")
-        
-        # Vérifier la connexion MongoDB
-        self._verifier_connexion_mongo()
-        
-    def _verifier_connexion_mongo(self):
-        """Vérifie que la connexion MongoDB est disponible"""
-        try:
-            client = pymongo.MongoClient(self.mongodb_url, serverSelectionTimeoutMS=5000)
-            client.server_info()
-            client.close()
-            logger.info("✅ Connexion MongoDB vérifiée pour UserQueryService")
-        except Exception as e:
-            error_msg = f"❌ Impossible de se connecter à MongoDB: {e}"
-            logger.error(error_msg)
-            raise ConnectionError(error_msg)
     
     def _detecter_langue_simple(self, text: str) -> Optional[str]:
         """Détection de langue basique"""
@@ -68,7 +48,7 @@ class UserQueryServiceSimple:
             logger.warning(f"⚠️ Erreur détection langue: {e}")
             return 'unknown'
     
-    def _generer_embedding(self, question: str) -> Optional[List[float]]:
+    async def _generer_embedding(self, question: str) -> Optional[List[float]]:
         """
         Génère un embedding de 384 dimensions avec sentence-transformers/all-MiniLM-L6-v2.
         Utilise le même modèle que le crawler pour cohérence.
@@ -77,8 +57,8 @@ class UserQueryServiceSimple:
             return None
             
         try:
-            # Générer l'embedding avec le modèle sentence-transformers
-            embedding = self.embedding_model.encode(question.strip(), show_progress_bar=False)
+            # Générer l'embedding via le micro-batcher partagé (un encode par lot de questions)
+            embedding = await get_embedding_batcher().soumettre(question.strip())
             
             # Convertir numpy array en liste Python
             embedding_list = embedding.tolist()
@@ -99,7 +79,7 @@ class UserQueryServiceSimple:
             langue_detectee = self._detecter_langue_simple(question)
             
             # Générer l'embedding avec sentence-transformers
-            embedding = self._generer_embedding(question)
+            embedding = await self._generer_embedding(question)
             
             # Créer le modèle de requête
             user_query = UserQueryModel(
@@ -110,21 +90,18 @@ class UserQueryServiceSimple:
             )
             
             # Sauvegarder dans MongoDB
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            collection = db[self.mongodb_collection]
+            collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
             
             # Vérifier si la question existe déjà récemment (même question dans les 24h)
             depuis_24h = datetime.now() - timedelta(hours=24)
             
-            existing = collection.find_one({
+            existing = await collection.find_one({
                 'question': question,
                 'date_creation': {'$gte': depuis_24h}
             })
             
             if existing:
                 # Retourner l'existante
-                client.close()
                 return UserQueryResponseModel(
                     id=str(existing['_id']),
                     question=existing['question'],
@@ -134,8 +111,7 @@ class UserQueryServiceSimple:
                 )
             
             # Insérer la nouvelle requête
-            result = collection.insert_one(user_query.dict())
-            client.close()
+            result = await collection.insert_one(user_query.dict())
             
             logger.info(f"💾 Requête sauvegardée: '{question}' (ID: {result.inserted_id})")
             
@@ -174,19 +150,16 @@ class UserQueryServiceSimple:
     async def obtenir_requetes_recentes(self, limite: int = 50) -> List[Dict]:
         """Obtient les requêtes utilisateur récentes"""
         try:
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            collection = db[self.mongodb_collection]
+            collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
             
             # Récupérer les requêtes récentes
-            requetes = list(
+            requetes = await (
                 collection.find({}, {'embedding': 0})  # Exclure les embeddings (trop volumineux)
                 .sort('date_creation', -1)
                 .limit(limite)
+                .to_list(length=None)
             )
             
-            client.close()
-            
             # Convertir ObjectId en string
             for requete in requetes:
                 requete['_id'] = str(requete['_id'])
@@ -201,12 +174,10 @@ class UserQueryServiceSimple:
     async def obtenir_statistiques_requetes(self) -> Dict:
         """Obtient les statistiques sur les requêtes utilisateur"""
         try:
-            client = pymongo.MongoClient(self.mongodb_url)
-            db = client[self.mongodb_db]
-            collection = db[self.mongodb_collection]
+            collection = db.get_collection(self.mongodb_collection, self.mongodb_db)
             
             # Total des requêtes
-            total_requetes = collection.count_documents({})
+            total_requetes = await collection.count_documents({})
             
             # Requêtes par langue
             pipeline_langues = [
@@ -216,7 +187,7 @@ class UserQueryServiceSimple:
                 }},
                 {"$sort": {"count": -1}}
             ]
-            stats_langues = list(collection.aggregate(pipeline_langues))
+            stats_langues = await collection.aggregate(pipeline_langues).to_list(length=None)
             
             # Requêtes par jour (7 derniers jours)
             depuis_7j = datetime.now() - timedelta(days=7)
@@ -229,12 +200,10 @@ class UserQueryServiceSimple:
                 }},
                 {"$sort": {"_id": 1}}
             ]
-            stats_par_jour = list(collection.aggregate(pipeline_par_jour))
+            stats_par_jour = await collection.aggregate(pipeline_par_jour).to_list(length=None)
             
             # Requêtes avec embedding
-            requetes_avec_embedding = collection.count_documents({"embedding": {"$ne": None}})
-            
-            client.close()
+            requetes_avec_embedding = await collection.count_documents({"embedding": {"$ne": None}})
             
             return {
                 'total_requetes': total_requetes,
@@ -3,23 +3,59 @@ Service pour le workflow global de traitement des requêtes utilisateur.
 Orchestre le crawling, la recherche sémantique et le re-ranking.
 """
 
+import asyncio
+import hashlib
 import logging
+import os
 import time
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from typing import Callable, List, Dict, Optional, Tuple
 from datetime import datetime
 
 from src.services.crawler_service import get_simple_crawler_service
 from src.services.user_query_service import get_user_query_service_simple
 from src.services.nlp_service import get_nlp_service
 from src.services.reranking_service import get_reranking_service
+from src.services.crawl_job_service import get_crawl_job_service, STATUT_EN_ATTENTE, STATUT_ERREUR, STATUT_TERMINE
+from src.services.compute_executor import executer_calcul
+from src.utils import normaliser_question
 from src.models.workflow_model import (
     WorkflowRequestModel,
     WorkflowResponseModel,
-    RessourceResultatModel
+    RessourceResultatModel,
+    CouvertureIndexModel,
+    CrawlArrierePlanModel
 )
 
 logger = logging.getLogger(__name__)
 
+# Callback de suivi du workflow : (type d'événement, données sérialisables en JSON)
+Notificateur = Callable[[str, Dict], None]
+
+
+def _emettre(notifier: Optional[Notificateur], evenement: str, donnees: Dict):
+    """Transmet un événement au callback de suivi sans jamais interrompre le workflow"""
+    if notifier is None:
+        return
+    try:
+        notifier(evenement, donnees)
+    except Exception as e:
+        logger.warning(f"⚠️ Erreur émission de l'événement {evenement}: {e}")
+
+
+def _resumer_resultat(resultat: Dict) -> Dict:
+    """Version compacte (sérialisable) d'un résultat FAISS ou re-ranké pour les événements"""
+    resume = {
+        "id": str(resultat.get("_id", resultat.get("id", ""))),
+        "titre": resultat.get("titre"),
+        "url": resultat.get("url"),
+        "source": resultat.get("source")
+    }
+    for cle in ("faiss_score", "reranking_score", "final_score"):
+        if resultat.get(cle) is not None:
+            resume[cle] = float(resultat[cle])
+    return resume
+
 
 class WorkflowService:
     """Service pour orchestrer le workflow complet de traitement"""
@@ -50,19 +86,479 @@ class WorkflowService:
         self.nlp_service = get_nlp_service(mongodb_url, mongodb_db, index_path)
         self.reranking_service = get_reranking_service(mongodb_url, mongodb_db)
         
+        # Single-flight : calculs en cours indexés par question normalisée et paramètres
+        self.single_flight = os.getenv("WORKFLOW_SINGLE_FLIGHT", "True") == "True"
+        # Chaque vol : {"tache", "evenements" (historique), "abonnes" (callbacks de suivi)}
+        self._calculs_en_cours: Dict[str, Dict] = {}
+        
+        # Mode search-first : seuils de couverture de l'index en dessous desquels on crawle
+        self.mode_crawl_par_defaut = os.getenv("WORKFLOW_MODE_CRAWL", "toujours")
+        self.seuil_score_max = float(os.getenv("WORKFLOW_SEUIL_SCORE_MAX", "0.6"))
+        self.seuil_score_pertinent = float(os.getenv("WORKFLOW_SEUIL_SCORE_PERTINENT", "0.45"))
+        self.min_resultats_pertinents = int(os.getenv("WORKFLOW_MIN_RESULTATS_PERTINENTS", "5"))
+        
+        # Mode stale-while-revalidate : crawls lancés en arrière-plan, indexés par id_crawl
+        self._crawls_arriere_plan: "OrderedDict[str, Dict]" = OrderedDict()
+        self._taches_arriere_plan = set()
+        self.max_crawls_memorises = int(os.getenv("WORKFLOW_MAX_CRAWLS_MEMORISES", "500"))
+        
+        # Crawls (dans la requête ou en arrière-plan) confiés à la file de jobs (workers séparés)
+        self.crawl_via_jobs = os.getenv("WORKFLOW_CRAWL_VIA_JOBS", "True") == "True"
+        self.crawl_job_service = get_crawl_job_service(mongodb_url, mongodb_db)
+        
         logger.info("✅ Services du workflow initialisés")
     
+    def _cle_calcul(self, request: WorkflowRequestModel) -> str:
+        """
+        Clé de mutualisation : question normalisée et paramètres qui influencent le résultat
+        
+        Args:
+            request: Paramètres de la requête
+            
+        Returns:
+            Clé identique pour deux requêtes produisant le même calcul
+        """
+        return "|".join([
+            normaliser_question(request.question),
+            request.mode_crawl or self.mode_crawl_par_defaut,
+            ",".join(sorted(request.sources or [])),
+            ",".join(sorted(request.langues or [])),
+            str(request.max_par_site),
+            str(request.top_k_faiss),
+            str(request.top_k_final)
+        ])
+    
+    async def _obtenir_calcul_partage(
+        self,
+        request: WorkflowRequestModel,
+        notifier: Optional[Notificateur] = None
+    ) -> Tuple[Dict, bool]:
+        """
+        Single-flight : les requêtes identiques simultanées attendent le même calcul
+        (crawling, index, recherche FAISS, re-ranking) au lieu de le relancer chacune.
+        Les événements du calcul sont diffusés à tous les appelants ; un appelant
+        qui rejoint un calcul en cours reçoit d'abord l'historique des événements.
+        
+        Args:
+            request: Paramètres de la requête
+            notifier: Callback de suivi optionnel de l'appelant
+            
+        Returns:
+            Tuple (résultat du calcul, True si le calcul était déjà en cours pour une autre requête)
+        """
+        if not self.single_flight:
+            return await self._calculer_resultats(request, notifier), False
+        
+        cle = self._cle_calcul(request)
+        vol = self._calculs_en_cours.get(cle)
+        calcul_partage = vol is not None
+        
+        if vol is None:
+            vol = {"evenements": [], "abonnes": [notifier] if notifier else []}
+            vol["tache"] = asyncio.create_task(
+                self._calculer_resultats(request, lambda evenement, donnees: self._diffuser(vol, evenement, donnees))
+            )
+            self._calculs_en_cours[cle] = vol
+            vol["tache"].add_done_callback(lambda _: self._calculs_en_cours.pop(cle, None))
+        else:
+            logger.info(f"🤝 Calcul déjà en cours pour '{request.question}', résultat mutualisé")
+            if notifier is not None:
+                for evenement, donnees in vol["evenements"]:
+                    _emettre(notifier, evenement, donnees)
+                vol["abonnes"].append(notifier)
+        
+        # shield : l'annulation d'un appelant (client déconnecté) n'interrompt pas les autres
+        return await asyncio.shield(vol["tache"]), calcul_partage
+    
+    def _diffuser(self, vol: Dict, evenement: str, donnees: Dict):
+        """Mémorise un événement du calcul partagé et le transmet à tous ses abonnés"""
+        vol["evenements"].append((evenement, donnees))
+        for abonne in list(vol["abonnes"]):
+            _emettre(abonne, evenement, donnees)
+    
+    async def _etape_crawl(
+        self,
+        request: WorkflowRequestModel,
+        erreurs: List[str],
+        notifier: Optional[Notificateur] = None
+    ) -> Tuple[float, int, List[str]]:
+        """
+        Étape 2 : crawling des sources demandées (l'index FAISS est mis à jour
+        de façon incrémentale par le crawler). Avec WORKFLOW_CRAWL_VIA_JOBS, le crawl
+        est enfilé dans la file de jobs et l'étape attend que les workers le terminent.
+        
+        Returns:
+            Tuple (durée, nombre de ressources crawlées, sources crawlées)
+        """
+        logger.info("🕷️  ÉTAPE 2/6: Lancement du crawling...")
+        temps_debut_crawl = time.time()
+        
+        try:
+            if self.crawl_via_jobs:
+                resultats_crawl = await self._crawler_via_job(request)
+            else:
+                resultats_crawl = await self.crawler_service.rechercher_ressources_async(
+                    requete=request.question,
+                    max_par_site=request.max_par_site,
+                    sources=request.sources,
+                    langues=request.langues,
+                    notifier=notifier
+                )
+            
+            duree_crawl = time.time() - temps_debut_crawl
+            total_crawle = resultats_crawl.get("total_collecte", 0)
+            sources_crawlees = resultats_crawl.get("sources_utilisees", [])
+            
+            logger.info(f"✅ Crawling terminé: {total_crawle} ressources en {duree_crawl:.2f}s")
+            
+            # Ajouter les erreurs du crawling
+            if resultats_crawl.get("erreurs"):
+                erreurs.extend(resultats_crawl["erreurs"])
+            
+            return duree_crawl, total_crawle, sources_crawlees
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur crawling: {e}")
+            erreurs.append(f"Erreur crawling: {str(e)}")
+            return 0, 0, []
+    
+    async def _crawler_via_job(self, request: WorkflowRequestModel) -> Dict:
+        """
+        Enfile le crawl dans la file de jobs et attend sa fin (CRAWL_JOBS_ATTENTE_MAX)
+        
+        Returns:
+            Résumé de la collecte du job (total_collecte, sources_utilisees, erreurs)
+        """
+        job = await self.crawl_job_service.soumettre(
+            question=request.question,
+            max_par_site=request.max_par_site,
+            sources=request.sources,
+            langues=request.langues
+        )
+        job = await self.crawl_job_service.attendre(job["id"])
+        
+        if job["statut"] == STATUT_ERREUR:
+            raise RuntimeError(f"job {job['id']} en erreur: {job['erreur']}")
+        if job["statut"] != STATUT_TERMINE:
+            raise TimeoutError(f"job {job['id']} toujours {job['statut']} après {self.crawl_job_service.attente_max:.0f}s")
+        return job["resultat"]
+    
+    async def _etape_verification_index(self, erreurs: List[str]) -> Optional[int]:
+        """
+        Étape 3 : vérifie que l'index FAISS est chargé.
+        Les nouvelles ressources sont ajoutées de façon incrémentale par le crawler
+        (ajouter_ressources_a_index) ; la reconstruction complète reste une
+        opération de maintenance (/api/nlp/reconstruire-index).
+        
+        Returns:
+            Génération courante de l'index, ou None en cas d'erreur
+        """
+        logger.info("🔄 ÉTAPE 3/6: Vérification de l'index FAISS...")
+        
+        try:
+            # Les workers de crawl (processus séparés) sauvegardent l'index sur disque ;
+            # lecture et rejeu du journal sont bloquants : exécuteur de calcul
+            await executer_calcul(self.nlp_service.recharger_si_modifie_sur_disque, nom="faiss_rechargement")
+            if self.nlp_service.index is None and not await executer_calcul(
+                self.nlp_service.charger_index, nom="faiss_rechargement"
+            ):
+                await self.nlp_service.reconstruire_index_depuis_bd()
+            generation_index = self.nlp_service.generation
+            logger.info(f"✅ Index FAISS à jour: génération {generation_index} ({self.nlp_service.index.ntotal} vecteurs)")
+            return generation_index
+        except Exception as e:
+            logger.error(f"❌ Erreur vérification index: {e}")
+            erreurs.append(f"Erreur vérification index: {str(e)}")
+            return None
+    
+    async def _etape_recherche(
+        self,
+        request: WorkflowRequestModel,
+        erreurs: List[str],
+        notifier: Optional[Notificateur] = None
+    ) -> Tuple[List[Dict], float]:
+        """
+        Étape 4 : recherche sémantique avec FAISS
+        
+        Returns:
+            Tuple (résultats FAISS, durée)
+        """
+        logger.info("🔍 ÉTAPE 4/6: Recherche sémantique avec FAISS...")
+        temps_debut_recherche = time.time()
+        
+        try:
+            resultats_faiss = await self.nlp_service.rechercher_ressources_similaires(
+                question=request.question,
+                top_k=request.top_k_faiss
+            )
+            
+            duree_recherche = time.time() - temps_debut_recherche
+            logger.info(f"✅ Recherche FAISS: {len(resultats_faiss)} résultats en {duree_recherche:.2f}s")
+            _emettre(notifier, "candidats_faiss", {
+                "nb_resultats": len(resultats_faiss),
+                "candidats": [_resumer_resultat(r) for r in resultats_faiss[:request.top_k_final]]
+            })
+            return resultats_faiss, duree_recherche
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur recherche FAISS: {e}")
+            erreurs.append(f"Erreur recherche FAISS: {str(e)}")
+            return [], 0
+    
+    def _evaluer_couverture(self, resultats_faiss: List[Dict]) -> Dict:
+        """
+        Évalue si l'index couvre suffisamment la question pour se passer du crawling
+        
+        Args:
+            resultats_faiss: Résultats de la recherche FAISS (triés par score décroissant)
+            
+        Returns:
+            Dictionnaire (crawl_necessaire, raison, score_max, nb_resultats_pertinents, seuils)
+        """
+        scores = [r.get("faiss_score", 0.0) for r in resultats_faiss]
+        score_max = max(scores) if scores else None
+        nb_pertinents = sum(1 for score in scores if score >= self.seuil_score_pertinent)
+        
+        if score_max is None or score_max < self.seuil_score_max:
+            raison = "score_max_insuffisant"
+        elif nb_pertinents < self.min_resultats_pertinents:
+            raison = "resultats_pertinents_insuffisants"
+        else:
+            raison = "couverture_suffisante"
+        
+        return {
+            "crawl_necessaire": raison != "couverture_suffisante",
+            "raison": raison,
+            "score_max": round(score_max, 4) if score_max is not None else None,
+            "nb_resultats_pertinents": nb_pertinents,
+            "seuil_score_max": self.seuil_score_max,
+            "seuil_score_pertinent": self.seuil_score_pertinent,
+            "min_resultats_pertinents": self.min_resultats_pertinents
+        }
+    
+    @staticmethod
+    def _etat_depuis_job(job: Dict) -> Dict:
+        """Traduit un job de la file de crawling en état de crawl en arrière-plan"""
+        resultat = job.get("resultat") or {}
+        erreurs = list(resultat.get("erreurs", []))
+        if job.get("erreur"):
+            erreurs.append(job["erreur"])
+        return {
+            "id_crawl": job["id"],
+            "question": job["question"],
+            "statut": "planifie" if job["statut"] == STATUT_EN_ATTENTE else job["statut"],
+            "date_debut": job["date_creation"],
+            "date_fin": job.get("date_fin"),
+            "total_crawle": resultat.get("total_collecte", 0),
+            "generation_index": None,
+            "erreurs": erreurs
+        }
+    
+    async def _planifier_crawl_arriere_plan(self, request: WorkflowRequestModel) -> Dict:
+        """
+        Planifie le crawling de la question en tâche de fond (un seul crawl en cours
+        par question normalisée et paramètres de collecte). Avec WORKFLOW_CRAWL_VIA_JOBS,
+        le crawl est enfilé dans la file de jobs persistée et traité par les workers.
+        
+        Args:
+            request: Paramètres de la requête
+            
+        Returns:
+            État du crawl en arrière-plan (id_crawl, statut...)
+        """
+        if self.crawl_via_jobs:
+            job = await self.crawl_job_service.soumettre(
+                question=request.question,
+                max_par_site=request.max_par_site,
+                sources=request.sources,
+                langues=request.langues
+            )
+            return self._etat_depuis_job(job)
+        
+        cle = "|".join([
+            normaliser_question(request.question),
+            ",".join(sorted(request.sources or [])),
+            ",".join(sorted(request.langues or [])),
+            str(request.max_par_site)
+        ])
+        id_crawl = hashlib.sha1(cle.encode("utf-8")).hexdigest()[:24]
+        
+        etat = self._crawls_arriere_plan.get(id_crawl)
+        if etat is not None and etat["statut"] in ("planifie", "en_cours"):
+            return etat
+        
+        etat = {
+            "id_crawl": id_crawl,
+            "question": request.question,
+            "statut": "planifie",
+            "date_debut": datetime.now(),
+            "date_fin": None,
+            "total_crawle": 0,
+            "generation_index": None,
+            "erreurs": []
+        }
+        self._crawls_arriere_plan[id_crawl] = etat
+        self._crawls_arriere_plan.move_to_end(id_crawl)
+        while len(self._crawls_arriere_plan) > self.max_crawls_memorises:
+            self._crawls_arriere_plan.popitem(last=False)
+        
+        tache = asyncio.create_task(self._executer_crawl_arriere_plan(etat, request))
+        self._taches_arriere_plan.add(tache)
+        tache.add_done_callback(self._taches_arriere_plan.discard)
+        
+        logger.info(f"🕰️  Crawl planifié en arrière-plan pour '{request.question}' (id: {id_crawl})")
+        return etat
+    
+    async def _executer_crawl_arriere_plan(self, etat: Dict, request: WorkflowRequestModel):
+        """Exécute un crawl en arrière-plan ; l'index est mis à jour par le crawler"""
+        etat["statut"] = "en_cours"
+        erreurs = []
+        try:
+            _, total_crawle, _ = await self._etape_crawl(request, erreurs)
+            etat["total_crawle"] = total_crawle
+            etat["statut"] = "termine"
+        except Exception as e:
+            erreurs.append(f"Erreur crawl en arrière-plan: {str(e)}")
+            etat["statut"] = "erreur"
+        
+        etat["erreurs"] = erreurs
+        etat["date_fin"] = datetime.now()
+        if self.nlp_service.index is not None:
+            etat["generation_index"] = self.nlp_service.generation
+        logger.info(f"✅ Crawl en arrière-plan {etat['id_crawl']} {etat['statut']}: {etat['total_crawle']} ressources")
+    
+    async def obtenir_crawl_arriere_plan(self, id_crawl: str) -> Optional[Dict]:
+        """
+        Retourne l'état d'un crawl lancé en arrière-plan
+        
+        Args:
+            id_crawl: Identifiant retourné par le workflow
+            
+        Returns:
+            État du crawl ou None s'il est inconnu
+        """
+        etat = self._crawls_arriere_plan.get(id_crawl)
+        if etat is None and self.crawl_via_jobs:
+            job = await self.crawl_job_service.obtenir(id_crawl)
+            etat = self._etat_depuis_job(job) if job else None
+        if etat is None:
+            return None
+        return {**etat, "generation_index_courante": self.nlp_service.generation}
+    
+    async def _calculer_resultats(
+        self,
+        request: WorkflowRequestModel,
+        notifier: Optional[Notificateur] = None
+    ) -> Dict:
+        """
+        Étapes 2 à 5 du workflow, sans état propre à l'appelant.
+        Le résultat est partagé en lecture seule entre les requêtes mutualisées.
+        
+        En mode 'si_necessaire', la recherche FAISS est faite d'abord et le crawling
+        n'est lancé que si la couverture de l'index est insuffisante.
+        En mode 'arriere_plan', les résultats viennent de l'index existant et le
+        crawling est planifié en tâche de fond pour les requêtes suivantes.
+        
+        Args:
+            request: Paramètres de la requête
+            notifier: Callback de suivi optionnel (événements par étape)
+            
+        Returns:
+            Dictionnaire des résultats re-rankés, compteurs, durées, couverture et erreurs
+        """
+        erreurs = []
+        mode_crawl = request.mode_crawl or self.mode_crawl_par_defaut
+        duree_crawl, total_crawle, sources_crawlees = 0, 0, []
+        duree_recherche = 0
+        couverture = None
+        crawl_arriere_plan = None
+        
+        if mode_crawl == "arriere_plan":
+            # Stale-while-revalidate : réponse immédiate depuis l'index existant
+            generation_index = await self._etape_verification_index(erreurs)
+            resultats_faiss, duree_recherche = await self._etape_recherche(request, erreurs, notifier)
+            crawl_arriere_plan = dict(await self._planifier_crawl_arriere_plan(request))
+            _emettre(notifier, "crawl_arriere_plan", {
+                "id_crawl": crawl_arriere_plan["id_crawl"],
+                "statut": crawl_arriere_plan["statut"]
+            })
+        elif mode_crawl == "si_necessaire":
+            # Recherche d'abord : l'index couvre-t-il déjà la question ?
+            generation_index = await self._etape_verification_index(erreurs)
+            resultats_faiss, duree_recherche = await self._etape_recherche(request, erreurs, notifier)
+            couverture = self._evaluer_couverture(resultats_faiss)
+            _emettre(notifier, "couverture", couverture)
+            
+            if couverture["crawl_necessaire"]:
+                logger.info(f"📉 Couverture insuffisante ({couverture['raison']}), crawling lancé")
+                duree_crawl, total_crawle, sources_crawlees = await self._etape_crawl(request, erreurs, notifier)
+                if self.nlp_service.index is not None:
+                    generation_index = self.nlp_service.generation
+                resultats_faiss, duree_nouvelle_recherche = await self._etape_recherche(request, erreurs, notifier)
+                duree_recherche += duree_nouvelle_recherche
+            else:
+                logger.info(f"📈 Couverture suffisante (score max {couverture['score_max']}), crawling ignoré")
+        else:
+            duree_crawl, total_crawle, sources_crawlees = await self._etape_crawl(request, erreurs, notifier)
+            generation_index = await self._etape_verification_index(erreurs)
+            resultats_faiss, duree_recherche = await self._etape_recherche(request, erreurs, notifier)
+        
+        # ============================================================
+        # ÉTAPE 5: Re-ranking avec cross-encoder
+        # ============================================================
+        logger.info("🎯 ÉTAPE 5/6: Re-ranking avec cross-encoder...")
+        temps_debut_reranking = time.time()
+        
+        try:
+            resultats_rerankes = await self.reranking_service.reranker_resultats(
+                question=request.question,
+                resultats_faiss=resultats_faiss,
+                top_k=request.top_k_final
+            )
+            
+            duree_reranking = time.time() - temps_debut_reranking
+            logger.info(f"✅ Re-ranking terminé: {len(resultats_rerankes)} résultats en {duree_reranking:.2f}s")
+            _emettre(notifier, "resultats_rerankes", {
+                "resultats": [_resumer_resultat(r) for r in resultats_rerankes]
+            })
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur re-ranking: {e}")
+            erreurs.append(f"Erreur re-ranking: {str(e)}")
+            resultats_rerankes = resultats_faiss[:request.top_k_final]
+            duree_reranking = 0
+        
+        return {
+            "mode_crawl": mode_crawl,
+            "couverture": couverture,
+            "crawl_arriere_plan": crawl_arriere_plan,
+            "total_crawle": total_crawle,
+            "sources_crawlees": sources_crawlees,
+            "duree_crawl": duree_crawl,
+            "generation_index": generation_index,
+            "total_resultats_faiss": len(resultats_faiss),
+            "duree_recherche": duree_recherche,
+            "resultats_rerankes": resultats_rerankes,
+            "duree_reranking": duree_reranking,
+            "erreurs": erreurs
+        }
+    
     async def traiter_requete_complete(
         self,
-        request: WorkflowRequestModel
+        request: WorkflowRequestModel,
+        notifier: Optional[Notificateur] = None
     ) -> WorkflowResponseModel:
         """
         Traite une requête utilisateur de bout en bout
         
         Workflow:
         1. Sauvegarder la question de l'utilisateur
-        2. Lancer le crawling sur les sources demandées
-        3. Reconstruire l'index FAISS avec les nouvelles données
+        2. Lancer le crawling sur les sources demandées (index FAISS mis à jour
+           de façon incrémentale avec les nouvelles ressources) ; en mode
+           'si_necessaire', seulement si la recherche FAISS préalable montre
+           une couverture insuffisante ; en mode 'arriere_plan', en tâche de fond
+           après la réponse
+        3. Vérifier que l'index FAISS est à jour (génération courante)
         4. Effectuer la recherche sémantique avec FAISS
         5. Re-ranker les résultats avec le cross-encoder
         6. Sauvegarder les inférences
@@ -70,6 +566,9 @@ class WorkflowService:
         
         Args:
             request: Paramètres de la requête
+            notifier: Callback optionnel recevant un événement à chaque étape
+                (requete_sauvegardee, source_collectee, candidats_faiss,
+                resultats_rerankes, inferences_sauvegardees)
             
         Returns:
             Résultats du workflow complet
@@ -97,95 +596,14 @@ class WorkflowService:
                 erreurs.append(f"Erreur sauvegarde question: {str(e)}")
                 id_requete = "non_sauvegarde"
             
-            # ============================================================
-            # ÉTAPE 2: Lancer le crawling
-            # ============================================================
-            logger.info("🕷️  ÉTAPE 2/6: Lancement du crawling...")
-            temps_debut_crawl = time.time()
-            
-            try:
-                resultats_crawl = await self.crawler_service.rechercher_ressources_async(
-                    requete=request.question,
-                    max_par_site=request.max_par_site,
-                    sources=request.sources,
-                    langues=request.langues
-                )
-                
-                duree_crawl = time.time() - temps_debut_crawl
-                total_crawle = resultats_crawl.get("total_collecte", 0)
-                sources_crawlees = resultats_crawl.get("sources_utilisees", [])
-                
-                logger.info(f"✅ Crawling terminé: {total_crawle} ressources en {duree_crawl:.2f}s")
-                
-                # Ajouter les erreurs du crawling
-                if resultats_crawl.get("erreurs"):
-                    erreurs.extend(resultats_crawl["erreurs"])
-                
-            except Exception as e:
-                logger.error(f"❌ Erreur crawling: {e}")
-                erreurs.append(f"Erreur crawling: {str(e)}")
-                duree_crawl = 0
-                total_crawle = 0
-                sources_crawlees = []
+            _emettre(notifier, "requete_sauvegardee", {"id_requete": id_requete, "question": request.question})
             
             # ============================================================
-            # ÉTAPE 3: Reconstruire l'index FAISS
+            # ÉTAPES 2 à 5: calcul partagé entre les requêtes identiques simultanées
             # ============================================================
-            logger.info("🔄 ÉTAPE 3/6: Reconstruction de l'index FAISS...")
-            temps_debut_index = time.time()
-            
-            try:
-                resultat_index = await self.nlp_service.reconstruire_index_depuis_bd()
-                logger.info(f"✅ Index FAISS reconstruit: {resultat_index.get('total_vecteurs', 0)} vecteurs")
-            except Exception as e:
-                logger.error(f"❌ Erreur reconstruction index: {e}")
-                erreurs.append(f"Erreur reconstruction index: {str(e)}")
-            
-            # ============================================================
-            # ÉTAPE 4: Recherche sémantique avec FAISS
-            # ============================================================
-            logger.info("🔍 ÉTAPE 4/6: Recherche sémantique avec FAISS...")
-            temps_debut_recherche = time.time()
-            
-            try:
-                resultats_faiss = await self.nlp_service.rechercher_ressources_similaires(
-                    question=request.question,
-                    top_k=request.top_k_faiss
-                )
-                
-                duree_recherche = time.time() - temps_debut_recherche
-                total_resultats_faiss = len(resultats_faiss)
-                
-                logger.info(f"✅ Recherche FAISS: {total_resultats_faiss} résultats en {duree_recherche:.2f}s")
-                
-            except Exception as e:
-                logger.error(f"❌ Erreur recherche FAISS: {e}")
-                erreurs.append(f"Erreur recherche FAISS: {str(e)}")
-                resultats_faiss = []
-                duree_recherche = 0
-                total_resultats_faiss = 0
-            
-            # ============================================================
-            # ÉTAPE 5: Re-ranking avec cross-encoder
-            # ============================================================
-            logger.info("🎯 ÉTAPE 5/6: Re-ranking avec cross-encoder...")
-            temps_debut_reranking = time.time()
-            
-            try:
-                resultats_rerankes = await self.reranking_service.reranker_resultats(
-                    question=request.question,
-                    resultats_faiss=resultats_faiss,
-                    top_k=request.top_k_final
-                )
-                
-                duree_reranking = time.time() - temps_debut_reranking
-                logger.info(f"✅ Re-ranking terminé: {len(resultats_rerankes)} résultats en {duree_reranking:.2f}s")
-                
-            except Exception as e:
-                logger.error(f"❌ Erreur re-ranking: {e}")
-                erreurs.append(f"Erreur re-ranking: {str(e)}")
-                resultats_rerankes = resultats_faiss[:request.top_k_final]
-                duree_reranking = 0
+            calcul, calcul_partage = await self._obtenir_calcul_partage(request, notifier)
+            erreurs.extend(calcul["erreurs"])
+            resultats_rerankes = calcul["resultats_rerankes"]
             
             # ============================================================
             # ÉTAPE 6: Sauvegarder les inférences et formater les résultats
@@ -194,25 +612,33 @@ class WorkflowService:
             
             resultats_finaux = []
             
+            # Récupérer les scores (le reranking service utilise 'faiss_score' et 'reranking_score')
+            inferences = []
             for idx, resultat in enumerate(resultats_rerankes):
-                try:
-                    # Récupérer les scores (le reranking service utilise 'faiss_score' et 'reranking_score')
-                    score_faiss = resultat.get("faiss_score", 0.0)
-                    score_reranking = resultat.get("reranking_score", 0.0)
+                score_faiss = resultat.get("faiss_score", 0.0)
+                inferences.append({
+                    "resource_id": str(resultat.get("_id", resultat.get("id", ""))),
+                    "faiss_score": score_faiss,
+                    "reranking_score": resultat.get("reranking_score", 0.0),
                     # Le score final est déjà calculé par le service de reranking
-                    score_final = resultat.get("final_score", score_faiss)
-                    
-                    # Sauvegarder l'inférence dans MongoDB
-                    inference_result = await self.reranking_service.sauvegarder_inference(
-                        user_query_id=id_requete,
-                        resource_id=str(resultat.get("_id", resultat.get("id", ""))),
-                        faiss_score=score_faiss,
-                        reranking_score=score_reranking,
-                        final_score=score_final,
-                        rank=idx + 1
-                    )
-                    
-                    id_inference = inference_result.get("inference_id", "unknown")
+                    "final_score": resultat.get("final_score", score_faiss),
+                    "rank": idx + 1
+                })
+            
+            # Sauvegarder toutes les inférences en un seul aller-retour MongoDB
+            inference_result = await self.reranking_service.sauvegarder_inferences(
+                user_query_id=id_requete,
+                inferences=inferences
+            )
+            inference_ids = inference_result.get("inference_ids", [])
+            if inference_result.get("status") != "success":
+                logger.error(f"❌ Erreur sauvegarde des inférences: {inference_result.get('message')}")
+                erreurs.append(f"Erreur sauvegarde inférences: {inference_result.get('message')}")
+            _emettre(notifier, "inferences_sauvegardees", {"id_requete": id_requete, "inference_ids": inference_ids})
+            
+            for idx, (resultat, inference) in enumerate(zip(resultats_rerankes, inferences)):
+                try:
+                    id_inference = inference_ids[idx] if idx < len(inference_ids) else "unknown"
                     
                     # Formater le résultat
                     ressource_formatee = RessourceResultatModel(
@@ -221,9 +647,9 @@ class WorkflowService:
                         auteur=resultat.get("auteur"),
                         date=resultat.get("date"),
                         resume=resultat.get("resume"),
-                        score_faiss=score_faiss,
-                        score_reranking=score_reranking,
-                        score_final=score_final,
+                        score_faiss=inference["faiss_score"],
+                        score_reranking=inference["reranking_score"],
+                        score_final=inference["final_score"],
                         mots_cles=resultat.get("mots_cles", []),
                         source=resultat.get("source", "inconnu"),
                         id_inference=id_inference
@@ -232,8 +658,8 @@ class WorkflowService:
                     resultats_finaux.append(ressource_formatee)
                     
                 except Exception as e:
-                    logger.error(f"❌ Erreur sauvegarde inférence pour résultat {idx}: {e}")
-                    erreurs.append(f"Erreur sauvegarde inférence: {str(e)}")
+                    logger.error(f"❌ Erreur formatage du résultat {idx}: {e}")
+                    erreurs.append(f"Erreur formatage résultat: {str(e)}")
             
             # ============================================================
             # Préparer la réponse finale
@@ -246,15 +672,20 @@ class WorkflowService:
             reponse = WorkflowResponseModel(
                 question=request.question,
                 id_requete=id_requete,
-                total_crawle=total_crawle,
-                total_resultats_faiss=total_resultats_faiss,
+                total_crawle=calcul["total_crawle"],
+                total_resultats_faiss=calcul["total_resultats_faiss"],
                 total_resultats_final=len(resultats_finaux),
-                duree_crawl_secondes=round(duree_crawl, 2),
-                duree_recherche_secondes=round(duree_recherche, 3),
-                duree_reranking_secondes=round(duree_reranking, 2),
+                duree_crawl_secondes=round(calcul["duree_crawl"], 2),
+                duree_recherche_secondes=round(calcul["duree_recherche"], 3),
+                duree_reranking_secondes=round(calcul["duree_reranking"], 2),
                 duree_totale_secondes=round(duree_totale, 2),
                 resultats=resultats_finaux,
-                sources_crawlees=sources_crawlees,
+                sources_crawlees=calcul["sources_crawlees"],
+                generation_index=calcul["generation_index"],
+                calcul_partage=calcul_partage,
+                mode_crawl=calcul["mode_crawl"],
+                couverture=CouvertureIndexModel(**calcul["couverture"]) if calcul["couverture"] else None,
+                crawl_arriere_plan=CrawlArrierePlanModel(**calcul["crawl_arriere_plan"]) if calcul["crawl_arriere_plan"] else None,
                 erreurs=erreurs if erreurs else None
             )
             
@@ -8,6 +8,7 @@ from bson import ObjectId
 from typing import Optional, Dict, Any
 from bs4 import BeautifulSoup
 import re
+import unicodedata
 
 
 def object_id_to_str(obj_id: ObjectId) -> str:
@@ -218,3 +219,24 @@ def tronquer_texte(texte: str, max_length: int = 5000) -> str:
         texte_tronque = texte_tronque[:dernier_espace]
     
     return texte_tronque + "..."
+
+
+def normaliser_question(question: str) -> str:
+    """
+    Normalise une question pour servir de clé de cache
+    (casse, espaces et ponctuation finale ignorés)
+    
+    Args:
+        question: Question brute de l'utilisateur
+        
+    Returns:
+        Question normalisée
+    """
+    if not question:
+        return ""
+    
+    question = unicodedata.normalize('NFKC', question).casefold()
+    question = re.sub(r'\s+', ' ', question).strip()
+    
+    # Ignorer la ponctuation finale (?, !, ., …)
+    return question.rstrip(' ?!.…')
@@ -0,0 +1,75 @@
+"""
+Tests du cache de collecte : clé (question normalisée, source, langue, max) et durée de vie des entrées.
+MongoDB est rendu indisponible : seul le niveau mémoire (LRU) est sollicité.
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("bs4")
+
+from src.services import crawl_cache_service as module_cache
+from src.services.crawl_cache_service import CrawlCacheService, TTL_PAR_DEFAUT
+
+
+def mongodb_indisponible(*args, **kwargs):
+    raise ConnectionError("MongoDB indisponible")
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setenv("CRAWL_CACHE_ACTIF", "True")
+    monkeypatch.setenv("CRAWL_CACHE_LRU_TAILLE", "2")
+    monkeypatch.setenv("CRAWL_CACHE_TTL_NEGATIF", "60")
+    monkeypatch.setattr(module_cache.db, "get_collection", mongodb_indisponible)
+    return CrawlCacheService("test")
+
+
+def test_cle_ignore_casse_et_espaces():
+    cle = CrawlCacheService.cle_cache("Machine   Learning", "wikipedia", "fr", 15)
+
+    assert cle == CrawlCacheService.cle_cache("  machine learning ", "wikipedia", "fr", 15)
+    assert cle != CrawlCacheService.cle_cache("machine learning", "wikipedia", "en", 15)
+    assert cle != CrawlCacheService.cle_cache("machine learning", "youtube", "fr", 15)
+    assert cle != CrawlCacheService.cle_cache("machine learning", "wikipedia", "fr", 10)
+    assert CrawlCacheService.cle_cache("python", "github", None, 15) == CrawlCacheService.cle_cache("python", "github", "", 15)
+
+
+def test_ttl_par_source_et_negatif(cache):
+    assert cache._ttl_entree("wikipedia", ["id"]) == TTL_PAR_DEFAUT["wikipedia"]
+    assert cache._ttl_entree("youtube", ["id"]) == TTL_PAR_DEFAUT["youtube"]
+    assert cache._ttl_entree("inconnue", ["id"]) == cache.ttl_defaut
+    assert cache._ttl_entree("wikipedia", []) == 60
+
+
+def test_enregistrer_puis_obtenir_depuis_la_memoire(cache):
+    asyncio.run(cache.enregistrer("Python", "github", None, 15, ["a", "b"]))
+
+    assert asyncio.run(cache.obtenir("python", "github", None, 15)) == ["a", "b"]
+    assert cache.nb_succes_memoire == 1
+    assert asyncio.run(cache.obtenir("python", "wikipedia", "fr", 15)) is None
+    assert cache.nb_echecs == 1
+
+
+def test_entree_negative_expire_plus_tot(cache):
+    asyncio.run(cache.enregistrer("rien", "github", None, 15, []))
+    asyncio.run(cache.enregistrer("python", "github", None, 15, ["a"]))
+
+    cle_vide = cache.cle_cache("rien", "github", None, 15)
+    cle_pleine = cache.cle_cache("python", "github", None, 15)
+    duree_vide = (cache._lru[cle_vide][1] - datetime.now()).total_seconds()
+    duree_pleine = (cache._lru[cle_pleine][1] - datetime.now()).total_seconds()
+
+    assert 0 < duree_vide <= 60
+    assert duree_pleine > TTL_PAR_DEFAUT["github"] - 60
+
+
+def test_lru_evince_la_plus_ancienne_entree(cache):
+    for question in ("a", "b", "c"):
+        asyncio.run(cache.enregistrer(question, "github", None, 15, [question]))
+
+    assert len(cache._lru) == 2
+    assert cache.cle_cache("a", "github", None, 15) not in cache._lru
@@ -0,0 +1,125 @@
+"""
+Tests de l'exécution d'un job de crawling : succès, nouvelle tentative et échec définitif.
+Le crawler et la collection MongoDB sont remplacés par des doubles en mémoire.
+"""
+
+import asyncio
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("bs4")
+
+from bson import ObjectId
+
+from src.services.crawl_job_service import (
+    CrawlJobService,
+    STATUT_EN_ATTENTE,
+    STATUT_ERREUR,
+    STATUT_TERMINE
+)
+
+
+class CollectionFactice:
+    """Enregistre les mises à jour appliquées aux jobs"""
+
+    def __init__(self):
+        self.mises_a_jour = []
+
+    async def update_one(self, filtre, mise_a_jour):
+        self.mises_a_jour.append((filtre, mise_a_jour))
+
+
+class CrawlerFactice:
+    """Retourne un résultat de collecte fixé"""
+
+    def __init__(self, resultats):
+        self.resultats = resultats
+
+    async def collecter_ressources(self, **kwargs):
+        kwargs["notifier"]("collecte_planifiee", {"taches": [{"source": "github", "langue": None}]})
+        return self.resultats
+
+
+@pytest.fixture
+def executer(monkeypatch):
+    """Exécute un job contre un crawler factice et retourne la mise à jour finale du job"""
+    monkeypatch.setenv("CRAWL_JOBS_MAX_TENTATIVES", "3")
+
+    def lancer(resultats, tentatives=1):
+        collection = CollectionFactice()
+        service = CrawlJobService("mongodb://localhost:27017", "test")
+        monkeypatch.setattr(service, "_collection", lambda: collection)
+        module_crawler = types.ModuleType("src.services.crawler_service")
+        module_crawler.get_simple_crawler_service = lambda *args: CrawlerFactice(resultats)
+        monkeypatch.setitem(sys.modules, "src.services.crawler_service", module_crawler)
+
+        job = {
+            "_id": ObjectId(),
+            "question": "python",
+            "max_par_site": 5,
+            "sources": ["github"],
+            "langues": None,
+            "tentatives": tentatives
+        }
+        asyncio.run(service._executer_job(job, "worker-test"))
+        filtre, mise_a_jour = collection.mises_a_jour[-1]
+        assert filtre == {"_id": job["_id"], "worker_id": "worker-test"}
+        return mise_a_jour["$set"]
+
+    return lancer
+
+
+def test_job_termine_avec_des_ressources(executer):
+    mise_a_jour = executer({"total_collecte": 3, "erreurs": ["Erreur avec youtube (fr): quota"]})
+
+    assert mise_a_jour["statut"] == STATUT_TERMINE
+    assert mise_a_jour["erreur"] is None
+    assert mise_a_jour["resultat"]["total_collecte"] == 3
+
+
+def test_job_remis_en_attente_si_toutes_les_sources_echouent(executer):
+    mise_a_jour = executer({"total_collecte": 0, "erreurs": ["Erreur avec github: 403 rate limit"]}, tentatives=1)
+
+    assert mise_a_jour["statut"] == STATUT_EN_ATTENTE
+    assert "403 rate limit" in mise_a_jour["erreur"]
+    assert mise_a_jour["bail_expire_le"] is None
+
+
+def test_job_en_erreur_apres_la_derniere_tentative(executer):
+    mise_a_jour = executer({"total_collecte": 0, "erreurs": ["Erreur avec github: délai de 20s dépassé"]}, tentatives=3)
+
+    assert mise_a_jour["statut"] == STATUT_ERREUR
+
+
+def test_collecte_vide_sans_erreur_terminee(executer):
+    mise_a_jour = executer({"total_collecte": 0, "erreurs": []})
+
+    assert mise_a_jour["statut"] == STATUT_TERMINE
+
+
+def test_attendre_jusqu_a_la_fin_du_job(monkeypatch):
+    service = CrawlJobService("mongodb://localhost:27017", "test")
+    service.intervalle_scrutation = 0
+    etats = iter(["en_attente", "en_cours", STATUT_TERMINE])
+
+    async def obtenir(job_id):
+        return {"id": job_id, "statut": next(etats)}
+
+    monkeypatch.setattr(service, "obtenir", obtenir)
+
+    assert asyncio.run(service.attendre("job"))["statut"] == STATUT_TERMINE
+
+
+def test_attendre_rend_la_main_apres_le_delai(monkeypatch):
+    service = CrawlJobService("mongodb://localhost:27017", "test")
+    service.intervalle_scrutation = 0
+
+    async def obtenir(job_id):
+        return {"id": job_id, "statut": "en_cours"}
+
+    monkeypatch.setattr(service, "obtenir", obtenir)
+
+    assert asyncio.run(service.attendre("job", delai_max=0))["statut"] == "en_cours"
@@ -0,0 +1,265 @@
+"""
+Tests de l'index FAISS : IDs stables, journal des modifications et snapshots versionnés.
+Le modèle sentence-transformers est remplacé par un modèle factice (dimension 8).
+"""
+
+import asyncio
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+faiss = pytest.importorskip("faiss")
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("motor")
+
+from bson import ObjectId
+
+from src.services import nlp_service as module_nlp
+from src.services.nlp_service import NLPService, OP_AJOUT, OP_SUPPRESSION, id_faiss
+
+DIMENSION = 8
+
+
+class ModeleFactice:
+    """Remplace le modèle d'embeddings : seule la dimension est utilisée par l'index"""
+
+    def get_sentence_embedding_dimension(self):
+        return DIMENSION
+
+
+@pytest.fixture
+def creer_service(tmp_path, monkeypatch):
+    """Fabrique de services partageant le même dossier d'index (un service = un processus)"""
+    monkeypatch.setenv("FAISS_INDEX_TYPE", "flat")
+    monkeypatch.setenv("FAISS_INDEX_MMAP", "False")
+    monkeypatch.setattr(module_nlp, "get_sentence_transformer", lambda *args, **kwargs: ModeleFactice())
+
+    def creer(**attributs):
+        service = NLPService("mongodb://localhost:27017", "test", index_path=str(tmp_path / "faiss_index"))
+        for nom, valeur in attributs.items():
+            setattr(service, nom, valeur)
+        return service
+
+    return creer
+
+
+def vecteurs(nb, graine=0):
+    """Embeddings aléatoires normalisés"""
+    embeddings = np.random.default_rng(graine).random((nb, DIMENSION), dtype=np.float32)
+    faiss.normalize_L2(embeddings)
+    return embeddings
+
+
+def nouveaux_ids(nb):
+    return [str(ObjectId()) for _ in range(nb)]
+
+
+def test_id_faiss_stable_et_positif():
+    resource_id = str(ObjectId())
+
+    assert id_faiss(resource_id) == id_faiss(resource_id)
+    assert 0 <= id_faiss(resource_id) < 2 ** 63
+    assert len({id_faiss(rid) for rid in nouveaux_ids(1000)}) == 1000
+
+
+def test_ajout_remplace_un_id_existant(creer_service):
+    service = creer_service()
+    ids = nouveaux_ids(3)
+    service._ajouter_vecteurs(vecteurs(3), ids)
+
+    remplacement = vecteurs(1, graine=1)
+    service._ajouter_vecteurs(remplacement, [ids[0]])
+
+    assert service.index.ntotal == 3
+    assert service.ids_ressources == {id_faiss(rid): rid for rid in ids}
+    resultats = service._rechercher_dans_index(remplacement, top_k=1)
+    assert resultats[0][0] == ids[0]
+    assert resultats[0][1] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_suppression_retire_vecteur_et_id(creer_service):
+    service = creer_service()
+    ids = nouveaux_ids(3)
+    embeddings = vecteurs(3)
+    service._ajouter_vecteurs(embeddings, ids)
+
+    assert service._retirer_vecteurs([ids[1], str(ObjectId())]) == 1
+
+    assert service.index.ntotal == 2
+    assert id_faiss(ids[1]) not in service.ids_ressources
+    resultats = service._rechercher_dans_index(embeddings[1:2], top_k=3)
+    assert ids[1] not in [resource_id for resource_id, _ in resultats]
+
+
+def test_journal_encodage_decodage(creer_service):
+    service = creer_service()
+    ids = nouveaux_ids(2)
+    embeddings = vecteurs(2)
+    donnees = (
+        service._encoder_delta(OP_AJOUT, ids, embeddings)
+        + service._encoder_delta(OP_SUPPRESSION, ids[:1])
+    )
+
+    deltas, longueur = service._decoder_deltas(donnees)
+
+    assert longueur == len(donnees)
+    assert [(operation, rids) for operation, rids, _ in deltas] == [(OP_AJOUT, ids), (OP_SUPPRESSION, ids[:1])]
+    np.testing.assert_array_equal(deltas[0][2], embeddings)
+    assert deltas[1][2] is None
+
+
+def test_journal_ignore_fin_incomplete_ou_corrompue(creer_service):
+    service = creer_service()
+    premier = service._encoder_delta(OP_SUPPRESSION, nouveaux_ids(1))
+    second = service._encoder_delta(OP_AJOUT, nouveaux_ids(1), vecteurs(1))
+
+    deltas, longueur = service._decoder_deltas(premier + second[:-3])
+    assert len(deltas) == 1 and longueur == len(premier)
+
+    corrompu = bytearray(second)
+    corrompu[-1] ^= 0xFF
+    deltas, longueur = service._decoder_deltas(premier + bytes(corrompu))
+    assert len(deltas) == 1 and longueur == len(premier)
+
+
+def test_snapshot_puis_rejeu_du_journal(creer_service):
+    ecrivain = creer_service()
+    ids = nouveaux_ids(4)
+    ecrivain._ajouter_vecteurs(vecteurs(4), ids)
+    assert ecrivain._sauvegarder_index()
+    assert ecrivain._lire_pointeur() == ecrivain.snapshot_courant == "v000001"
+
+    lecteur = creer_service()
+    assert lecteur.charger_index()
+    assert lecteur.ids_ressources == ecrivain.ids_ressources
+
+    # Modifications journalisées par l'écrivain, sans nouveau snapshot
+    ajout = nouveaux_ids(1)
+    embeddings_ajout = vecteurs(1, graine=2)
+    ecrivain._ajouter_vecteurs(embeddings_ajout, ajout)
+    ecrivain._journaliser(OP_AJOUT, ajout, embeddings_ajout)
+    ecrivain._retirer_vecteurs(ids[:1])
+    ecrivain._journaliser(OP_SUPPRESSION, ids[:1])
+    assert ecrivain._lire_pointeur() == "v000001"
+
+    # Le lecteur applique uniquement la partie du journal qu'il n'a pas encore vue
+    assert lecteur.recharger_si_modifie_sur_disque()
+    assert lecteur._position_journal == ecrivain._position_journal
+    assert not lecteur.recharger_si_modifie_sur_disque()
+    assert lecteur.ids_ressources == ecrivain.ids_ressources
+    assert lecteur.index.ntotal == ecrivain.index.ntotal == 4
+
+    # Reprise après redémarrage : snapshot + journal complet
+    redemarre = creer_service()
+    assert redemarre.charger_index()
+    assert redemarre.ids_ressources == ecrivain.ids_ressources
+
+
+def test_publication_differee_charge_un_snapshot_plus_recent(creer_service):
+    premier = creer_service()
+    premier._ajouter_vecteurs(vecteurs(2), nouveaux_ids(2))
+    assert premier._sauvegarder_index()
+    second = creer_service()
+    assert second.charger_index()
+
+    ajout_premier = nouveaux_ids(1)
+    premier._ajouter_vecteurs(vecteurs(1, graine=3), ajout_premier)
+    premier._journaliser(OP_AJOUT, ajout_premier, vecteurs(1, graine=3))
+
+    # Le second publie un snapshot qui intègre le journal du premier
+    ajout_second = nouveaux_ids(1)
+    second._ajouter_vecteurs(vecteurs(1, graine=4), ajout_second)
+    second._journaliser(OP_AJOUT, ajout_second, vecteurs(1, graine=4))
+    second._publier_snapshot_differe()
+    assert second._lire_pointeur() == "v000002"
+
+    # Le premier ne doit pas écraser ce snapshot avec son index plus ancien
+    premier._publier_snapshot_differe()
+    assert premier._lire_pointeur() == premier.snapshot_courant == "v000002"
+    assert premier._versions_snapshots() == ["v000001", "v000002"]
+    assert set(premier.ids_ressources.values()) >= set(ajout_premier + ajout_second)
+
+
+def test_restaurer_snapshot_precedent(creer_service):
+    service = creer_service()
+    service._ajouter_vecteurs(vecteurs(2), nouveaux_ids(2))
+    assert service._sauvegarder_index()
+    ids_v1 = dict(service.ids_ressources)
+    service._ajouter_vecteurs(vecteurs(3, graine=5), nouveaux_ids(3))
+    assert service._sauvegarder_index()
+
+    resultat = asyncio.run(service.restaurer_snapshot())
+
+    assert resultat["status"] == "success"
+    assert resultat["version"] == "v000001"
+    assert resultat["version_precedente"] == "v000002"
+    assert service._lire_pointeur() == service.snapshot_courant == "v000001"
+    assert service.ids_ressources == ids_v1
+    assert service.index.ntotal == 2
+
+    assert asyncio.run(service.restaurer_snapshot("v000042"))["status"] == "error"
+
+
+def test_purge_conserve_les_derniers_snapshots(creer_service):
+    service = creer_service(nb_snapshots_conserves=2)
+    for graine in range(4):
+        service._ajouter_vecteurs(vecteurs(1, graine=graine), nouveaux_ids(1))
+        assert service._sauvegarder_index()
+
+    journal_abandonne = service._chemin_journal("v000001")
+    open(journal_abandonne, "wb").close()
+    service._purger_snapshots()
+
+    assert service._versions_snapshots() == ["v000003", "v000004"]
+    assert not os.path.exists(journal_abandonne)
+    assert service._lire_pointeur() == "v000004"
+
+
+def test_hnsw_remplacement_sans_vecteur_duplique(creer_service, monkeypatch):
+    service = creer_service(type_index_demande="hnsw")
+    ids = nouveaux_ids(3)
+    service._ajouter_vecteurs(vecteurs(3), ids)
+    assert service._type_index(service.index) == "hnsw"
+
+    # L'ancien vecteur ne peut pas être retiré : pas de second vecteur sous le même ID
+    assert service._ajouter_vecteurs(vecteurs(1, graine=7), ids[:1]) == ids[:1]
+    assert service.index.ntotal == 3
+
+    reconstructions = []
+
+    async def reconstruire():
+        reconstructions.append(True)
+        return {"status": "success", "nb_embeddings": 3, "message": "Index reconstruit avec succès"}
+
+    monkeypatch.setattr(service, "reconstruire_index_depuis_bd", reconstruire)
+    resultat = asyncio.run(service.remplacer_ressources_dans_index(ids[:1]))
+
+    assert resultat["status"] == "success"
+    assert resultat["reconstruction"] is True
+    assert reconstructions == [True]
+
+
+def test_hnsw_orphelins_declenchent_une_reconstruction(creer_service, monkeypatch):
+    service = creer_service(type_index_demande="hnsw", proportion_max_orphelins=0.1)
+    ids = nouveaux_ids(3)
+    embeddings = vecteurs(3)
+    service._ajouter_vecteurs(embeddings, ids)
+
+    reconstructions = []
+
+    async def reconstruire():
+        reconstructions.append(True)
+        return {"status": "success", "nb_embeddings": 2, "message": "Index reconstruit avec succès"}
+
+    monkeypatch.setattr(service, "reconstruire_index_depuis_bd", reconstruire)
+
+    async def supprimer():
+        resultat = await service.supprimer_ressources_de_index(ids[:1])
+        await service._tache_reconstruction
+        return resultat
+
+    assert asyncio.run(supprimer())["nb_supprimes"] == 1
+    assert service.index.ntotal == 3
+    assert ids[0] not in [rid for rid, _ in service._rechercher_dans_index(embeddings[:1], top_k=3)]
+    assert reconstructions == [True]
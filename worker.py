@@ -0,0 +1,61 @@
+"""
+Processus worker de crawling : traite les jobs de la file MongoDB (crawl_jobs)
+indépendamment des workers de l'API, ce qui permet de dimensionner séparément
+la capacité de crawling et la capacité de l'API.
+
+Lancement : python worker.py
+"""
+
+import asyncio
+import logging
+import os
+import signal
+
+from dotenv import load_dotenv
+
+# Charger les variables d'environnement avant d'importer les services
+load_dotenv()
+
+from src.database import db
+from src.services.crawl_job_service import get_crawl_job_service
+from src.services.http_client import fermer_clients_http
+from src.services.nlp_service import get_nlp_service
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Démarre le pool de workers et attend un signal d'arrêt"""
+    await db.connect_db()
+    
+    mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+    mongodb_db = os.getenv("MONGODB_DB_NAME", "eduranker_db")
+    index_path = os.getenv("FAISS_INDEX_PATH", "data/faiss_index")
+    
+    # Les ressources collectées sont ajoutées à l'index FAISS partagé (sur disque)
+    nlp_service = get_nlp_service(mongodb_url, mongodb_db, index_path)
+    if not nlp_service.charger_index():
+        await nlp_service.reconstruire_index_depuis_bd()
+    
+    crawl_job_service = get_crawl_job_service(mongodb_url, mongodb_db)
+    crawl_job_service.demarrer_workers(int(os.getenv("CRAWL_JOBS_WORKERS", "4")))
+    
+    arret = asyncio.Event()
+    boucle = asyncio.get_running_loop()
+    for signal_arret in (signal.SIGINT, signal.SIGTERM):
+        boucle.add_signal_handler(signal_arret, arret.set)
+    
+    await arret.wait()
+    
+    logger.info("🛑 Arrêt des workers de crawling...")
+    await crawl_job_service.arreter_workers()
+    await nlp_service.persister_index_en_attente()
+    await fermer_clients_http()
+    await db.close_db()
+    logger.info("👋 Worker arrêté")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())